@@ -18,6 +18,8 @@ import bpy
 from bpy.types import Operator, Panel
 from bpy.props import BoolProperty, StringProperty
 
+import bl_geometry_fingerprint as geometry_fingerprint
+
 # ---------- IMPORT OPERATOR ----------
 
 class IMPORT_OT_fbx_maya(bpy.types.Operator):
@@ -82,6 +84,12 @@ class EXPORT_OT_fbx_maya(bpy.types.Operator):
     use_empty: BoolProperty(name="Empty", default=True)
     use_camera: BoolProperty(name="Camera", default=False)
     use_light: BoolProperty(name="Light", default=False)
+    instance_duplicates: BoolProperty(
+        name="Instance Duplicate Geometry",
+        description="Write each unique mesh once and export exact copies (same geometry, UVs, "
+                    "normals, attributes and materials) as instances of it",
+        default=False,
+    )
 
     def invoke(self, context, event):
         selected_objects = context.selected_objects
@@ -104,17 +112,7 @@ class EXPORT_OT_fbx_maya(bpy.types.Operator):
         return {'RUNNING_MODAL'}
 
     def execute(self, context):
-        bpy.ops.export_scene.fbx(
-            filepath=self.filepath,
-            use_selection=True,
-            global_scale=0.01,
-            apply_unit_scale=True,
-            use_space_transform=True,
-            apply_scale_options='FBX_SCALE_ALL',
-            bake_space_transform=True,
-            axis_forward='X',
-            axis_up='Y'
-        )
+        export_fbx_maya(self.filepath, use_selection=True, instance_duplicates=self.instance_duplicates)
         return {'FINISHED'}
 
     def draw(self, context):
@@ -131,6 +129,9 @@ class EXPORT_OT_fbx_maya(bpy.types.Operator):
         layout.prop(self, "use_camera")
         layout.prop(self, "use_light")
 
+        layout.separator()
+        layout.prop(self, "instance_duplicates")
+
 # ---------- UI PANEL ----------
 
 class VIEW3D_PT_fbx_maya_panel(Panel):
@@ -147,27 +148,32 @@ class VIEW3D_PT_fbx_maya_panel(Panel):
 		
 # ---------- UTILITY FUNCTIONS ----------
 
-def export_fbx_maya(filepath, use_selection=True):
+def export_fbx_maya(filepath, use_selection=True, instance_duplicates=False):
     """
     Export selected objects to FBX with Maya-compatible settings.
 
     Args:
         filepath (str): Destination path for the exported FBX.
         use_selection (bool): If True, export only selected objects. Otherwise, export all.
+        instance_duplicates (bool): If True, objects whose mesh is an exact copy of another
+            exported object (same geometry, UVs, normals, attributes and materials) share its mesh during the
+            export, so the FBX stores that geometry once and Maya imports them as instances.
     """
     import bpy
 
-    bpy.ops.export_scene.fbx(
-        filepath=filepath,
-        use_selection=use_selection,
-        global_scale=0.01,
-        apply_unit_scale=True,
-        use_space_transform=True,
-        apply_scale_options='FBX_SCALE_ALL',
-        bake_space_transform=True,
-        axis_forward='X',
-        axis_up='Y'
-    )
+    objects = bpy.context.selected_objects if use_selection else bpy.context.scene.objects
+    with geometry_fingerprint.shared_geometry(objects if instance_duplicates else []):
+        bpy.ops.export_scene.fbx(
+            filepath=filepath,
+            use_selection=use_selection,
+            global_scale=0.01,
+            apply_unit_scale=True,
+            use_space_transform=True,
+            apply_scale_options='FBX_SCALE_ALL',
+            bake_space_transform=True,
+            axis_forward='X',
+            axis_up='Y'
+        )
 
 # ---------- REGISTER ----------
 
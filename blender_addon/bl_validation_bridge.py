@@ -6,18 +6,38 @@ bl_info = {
     "version": (2, 4, 0),
     "blender": (4, 0, 0),
     "location": "View3D > Sidebar > Validation",
-    "description": "Validate models for WAUR pipeline using Maya Standalone backend",
+    "description": "Validate models for WAUR pipeline natively or using Maya Standalone backend",
     "category": "3D View"
 }
 
 import bpy
 import os
+import sys
 import subprocess
 import tempfile
 import json
+import queue
+import threading
 
 # Importamos la función de exportación centralizada
 from bl_fbx_io_maya import export_fbx_maya
+import bl_validation_cache as validation_cache
+import bl_native_checks as native_checks
+import bl_mesh_container as mesh_container
+
+# Perfil de ma_model_profiler usado por el backend de Maya
+VALIDATION_PROFILE = "full"
+
+# El backend de Maya recibe la geometria en un .wmesh (sin import FBX) en lugar de un FBX
+USE_MESH_CONTAINER = True
+
+# Scripts de Maya; ma_validation_history (Python puro) se importa desde aqui
+MAYA_SCRIPTS_DIR = os.path.expanduser("~/Documents/maya/2018/scripts")
+
+# Prefijo de las lineas que ma_validate_fbx emite con el resultado de cada check
+STREAM_PREFIX = "@@CHECK "
+
+_cancel_requested = False
 
 # Property Group para un item de validación
 class ValidationResultItem(bpy.types.PropertyGroup):
@@ -25,76 +45,327 @@ class ValidationResultItem(bpy.types.PropertyGroup):
     check: bpy.props.StringProperty()
     message: bpy.props.StringProperty()
 
+def export_objects_for_validation(context, objects, filepath):
+    """Exports only `objects` to FBX, restoring the user's selection afterwards."""
+    previous = list(context.selected_objects)
+    active = context.view_layer.objects.active
+    for obj in previous:
+        obj.select_set(False)
+    for obj in objects:
+        obj.select_set(True)
+    try:
+        export_fbx_maya(filepath=filepath, use_selection=True)
+    finally:
+        for obj in objects:
+            obj.select_set(False)
+        for obj in previous:
+            obj.select_set(True)
+        context.view_layer.objects.active = active
+
+
+def record_history(results, backend):
+    """Stores a finished validation in the shared history (ma_validation_history), keyed by the .blend file."""
+    if MAYA_SCRIPTS_DIR not in sys.path:
+        sys.path.append(MAYA_SCRIPTS_DIR)
+    try:
+        import ma_validation_history as validation_history
+    except ImportError:
+        print("[Validation] History not recorded: ma_validation_history not found in", MAYA_SCRIPTS_DIR)
+        return
+    asset = os.path.splitext(bpy.path.basename(bpy.data.filepath))[0] or "untitled"
+    validation_history.record_run(asset, results, profile=VALIDATION_PROFILE, backend=backend)
+
+
+def set_result(scene, check, info):
+    """Adds or updates the result item of one check."""
+    item = next((i for i in scene.validation_results if i.check == check), None)
+    if item is None:
+        item = scene.validation_results.add()
+        item.check = check
+    item.passed = info.get("passed", False)
+    item.message = info.get("message", "")
+    if not item.passed:
+        scene.issues_found = True
+
+
+def reset_results(scene):
+    scene.validation_results.clear()
+    scene.issues_found = False
+    scene.validation_ran = True
+
+
+def read_process_output(stream, lines):
+    # Hilo lector: nunca toca bpy, solo encola las lineas del proceso
+    for line in iter(stream.readline, ""):
+        lines.put(line)
+    stream.close()
+
+
+def redraw_view3d(context):
+    for area in context.screen.areas if context.screen else []:
+        if area.type == 'VIEW_3D':
+            area.tag_redraw()
+
+
 class ValidateModelOperator(bpy.types.Operator):
     bl_idname = "object.validate_model"
     bl_label = "Run Validation"
-    bl_options = {'REGISTER', 'UNDO'}
+    bl_options = {'REGISTER'}
+
+    _timer = None
+    _process = None
+    _reader = None
+    _lines = None
+    _job = None
+    _area = None
+
+    def invoke(self, context, event):
+        return self.execute(context)
 
     def execute(self, context):
+        global _cancel_requested
+
+        if context.scene.validation_running:
+            self.report({'WARNING'}, "A validation is already running.")
+            return {'CANCELLED'}
         if not context.selected_objects:
             self.report({'WARNING'}, "No objects selected for validation.")
             return {'CANCELLED'}
 
-        save_temps = context.scene.save_temps
-        blend_dir = os.path.dirname(bpy.data.filepath)
-        if not blend_dir:
-            blend_dir = tempfile.gettempdir()
-
-        if save_temps:
-            temp_fbx_path = os.path.join(blend_dir, "temp_validation_model.fbx")
-            temp_json_path = os.path.join(blend_dir, "validation_results.json")
+        selected = list(context.selected_objects)
+        reset_results(context.scene)
+
+        # Ruta rapida: las reglas se evaluan sobre los datos de Blender, sin exportar ni lanzar Maya
+        native = {}
+        if context.scene.validation_backend == 'NATIVE':
+            native = native_checks.run_checks(selected, VALIDATION_PROFILE)
+            for check, info in native.items():
+                set_result(context.scene, check, info)
+            maya_checks = native_checks.maya_checks(VALIDATION_PROFILE)
+            if not maya_checks:
+                record_history(native, "blender")
+                return {'FINISHED'}
+            checks_arg = ",".join(maya_checks)
         else:
-            temp_fbx_path = os.path.join(tempfile.gettempdir(), "temp_validation_model.fbx")
-            temp_json_path = os.path.join(tempfile.gettempdir(), "validation_results.json")
-
-        # Export selected objects to FBX using the shared function
-        export_fbx_maya(filepath=temp_fbx_path, use_selection=True)
+            checks_arg = VALIDATION_PROFILE
+
+        self._job = self.prepare_maya_job(context, selected, checks_arg)
+        self._job["native"] = native
+        if not self._job["pending"]:
+            self.finish_maya_job(context, None)
+            return {'FINISHED'}
+
+        # Export the objects to validate (mesh container or FBX using the shared function)
+        pending_objects = [obj for obj in selected if obj.name in self._job["pending"]]
+        if USE_MESH_CONTAINER:
+            mesh_container.export_container(context, pending_objects, self._job["fbx_path"])
+        else:
+            export_objects_for_validation(context, pending_objects, self._job["fbx_path"])
 
-        # Call Maya Standalone validation
+        # Call Maya Standalone validation without blocking the UI
         standalone_hub_path = os.path.expanduser("~/Documents/maya/2018/scripts/ma_standalone_hub.py")
         validate_script_path = os.path.expanduser("~/Documents/maya/2018/scripts/ma_validate_fbx.py")
         mayapy_path = r"C:\Program Files\Autodesk\Maya2018\bin\mayapy.exe"
 
         try:
-            subprocess.check_call([
+            self._process = subprocess.Popen([
                 mayapy_path,
                 standalone_hub_path,
                 "--script", validate_script_path,
-                "--args", temp_fbx_path, temp_json_path
-            ])
-        except subprocess.CalledProcessError as e:
+                "--args", self._job["fbx_path"], self._job["json_path"], checks_arg
+            ], stdout=subprocess.PIPE, stderr=subprocess.STDOUT, bufsize=1, universal_newlines=True)
+        except OSError as e:
             self.report({'ERROR'}, "Validation failed: {}".format(e))
+            self.cleanup_temps(context)
             return {'CANCELLED'}
 
-        # Load validation results
-        if not os.path.exists(temp_json_path):
-            self.report({'ERROR'}, "Validation results not found.")
+        self._lines = queue.Queue()
+        self._reader = threading.Thread(target=read_process_output, args=(self._process.stdout, self._lines))
+        self._reader.daemon = True
+        self._reader.start()
+
+        _cancel_requested = False
+        self._area = context.area
+        context.scene.validation_running = True
+        context.scene.validation_progress = 0.0
+        self._timer = context.window_manager.event_timer_add(0.1, window=context.window)
+        context.window_manager.modal_handler_add(self)
+        return {'RUNNING_MODAL'}
+
+    def escape_pressed(self, event):
+        """ESC pressed with the mouse over the area that started the validation (other editors keep their ESC)."""
+        if event.type != 'ESC' or event.value != 'PRESS':
+            return False
+        area = self._area
+        if area is None:
+            return True
+        try:
+            return (area.x <= event.mouse_x < area.x + area.width
+                    and area.y <= event.mouse_y < area.y + area.height)
+        except ReferenceError:
+            # El area se cerro mientras corria: queda el boton de cancelar
+            return False
+
+    def modal(self, context, event):
+        if _cancel_requested or self.escape_pressed(event):
+            self.cancel(context)
+            self.report({'WARNING'}, "Validation cancelled.")
             return {'CANCELLED'}
 
-        # Limpiar resultados anteriores
-        context.scene.validation_results.clear()
-        context.scene.issues_found = False
-        context.scene.validation_ran = True
+        if event.type != 'TIMER':
+            return {'PASS_THROUGH'}
 
-        with open(temp_json_path, "r") as f:
+        self.consume_output(context)
+
+        if self._process.poll() is None or self._reader.is_alive():
+            return {'PASS_THROUGH'}
+
+        self.consume_output(context)
+        self.stop(context)
+        if self._process.returncode != 0:
+            self.report({'ERROR'}, "Validation failed (return code {}).".format(self._process.returncode))
+            self.cleanup_temps(context)
+            return {'CANCELLED'}
+
+        if not os.path.exists(self._job["json_path"]):
+            self.report({'ERROR'}, "Validation results not found.")
+            self.cleanup_temps(context)
+            return {'CANCELLED'}
+
+        with open(self._job["json_path"], "r") as f:
             results = json.load(f)
+        self.finish_maya_job(context, results)
+        self.cleanup_temps(context)
+        return {'FINISHED'}
 
-        for check, info in results.items():
-            item = context.scene.validation_results.add()
-            item.passed = info.get("passed", False)
-            item.check = check
-            item.message = info.get("message", "")
-            if not item.passed:
-                context.scene.issues_found = True
+    def consume_output(self, context):
+        updated = False
+        while True:
+            try:
+                line = self._lines.get_nowait()
+            except queue.Empty:
+                break
+            if not line.startswith(STREAM_PREFIX):
+                print(line.rstrip())
+                continue
+            try:
+                info = json.loads(line[len(STREAM_PREFIX):])
+            except ValueError:
+                continue
+            # Resultado provisional de los objetos re-validados; se combina con el cache al terminar
+            set_result(context.scene, info["check"], info)
+            context.scene.validation_progress = float(info.get("index", 0)) / max(info.get("total", 1), 1)
+            updated = True
+        if updated:
+            redraw_view3d(context)
+
+    def stop(self, context):
+        if self._timer is not None:
+            context.window_manager.event_timer_remove(self._timer)
+            self._timer = None
+        context.scene.validation_running = False
+        context.scene.validation_progress = 0.0
+        redraw_view3d(context)
+
+    def cancel(self, context):
+        if self._process is not None and self._process.poll() is None:
+            self._process.terminate()
+            try:
+                self._process.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                self._process.kill()
+        self.stop(context)
+        self.cleanup_temps(context)
+
+    def prepare_maya_job(self, context, selected, checks_arg):
+        save_temps = context.scene.save_temps
+        blend_dir = os.path.dirname(bpy.data.filepath)
+        if not blend_dir:
+            blend_dir = tempfile.gettempdir()
+
+        model_name = "temp_validation_model" + (mesh_container.EXTENSION if USE_MESH_CONTAINER else ".fbx")
+        if save_temps:
+            temp_fbx_path = os.path.join(blend_dir, model_name)
+            temp_json_path = os.path.join(blend_dir, "validation_results.json")
+        else:
+            temp_fbx_path = os.path.join(tempfile.gettempdir(), model_name)
+            temp_json_path = os.path.join(tempfile.gettempdir(), "validation_results.json")
+
+        # Solo se re-validan los objetos cuyo contenido cambio desde la ultima corrida
+        digests = {obj.name: validation_cache.object_digest(obj, checks_arg) for obj in selected}
+        if context.scene.use_validation_cache:
+            scene_results = validation_cache.lookup_scene(digests)
+            if scene_results is None:
+                # Los checks de escena (duplicados, presupuesto del asset) necesitan toda la seleccion;
+                # en Maya los meshes sin cambios salen de su propio cache por mesh
+                cached, pending = {}, list(digests)
+            else:
+                cached, pending = validation_cache.lookup(digests)
+        else:
+            cached, pending, scene_results = {}, list(digests), None
+
+        return {
+            "fbx_path": temp_fbx_path,
+            "json_path": temp_json_path,
+            "digests": digests,
+            "cached": cached,
+            "pending": pending,
+            "scene_results": scene_results,
+        }
+
+    def finish_maya_job(self, context, results):
+        job = self._job
+        cached = job["cached"]
+        if results is not None:
+            pending_digests = {n: job["digests"][n] for n in job["pending"]}
+            fresh, _ = validation_cache.store(results, pending_digests, job["digests"])
+            validation_cache.save()
+            if not cached:
+                merged = results
+            else:
+                # Los checks de escena de un subconjunto no valen para la seleccion: se usan los del cache
+                cached.update(fresh)
+                merged = validation_cache.merge(cached, job["scene_results"])
+        else:
+            merged = validation_cache.merge(cached, job["scene_results"])
+
+        for check, info in merged.items():
+            set_result(context.scene, check, info)
+        redraw_view3d(context)
 
+        history = dict(job["native"])
+        history.update(merged)
+        record_history(history, "maya" if not job["native"] else "blender+maya")
+        self.report({'INFO'}, "Validated {} object(s) in Maya, {} from cache.".format(
+            len(job["pending"]), len(cached)))
+
+    def cleanup_temps(self, context):
         # Clean temp files if not saving
-        if not save_temps:
+        if context.scene.save_temps or not self._job:
+            return
+        for path in (self._job["fbx_path"], self._job["json_path"]):
             try:
-                os.remove(temp_fbx_path)
-                os.remove(temp_json_path)
-            except:
+                os.remove(path)
+            except OSError:
                 pass
 
+
+class CancelValidationOperator(bpy.types.Operator):
+    bl_idname = "object.cancel_validation"
+    bl_label = "Cancel Validation"
+
+    def execute(self, context):
+        global _cancel_requested
+        _cancel_requested = True
+        return {'FINISHED'}
+
+
+class ClearValidationCacheOperator(bpy.types.Operator):
+    bl_idname = "object.clear_validation_cache"
+    bl_label = "Clear Cache"
+
+    def execute(self, context):
+        validation_cache.clear()
         return {'FINISHED'}
 
 
@@ -120,10 +391,18 @@ class ValidationResultsPanel(bpy.types.Panel):
         layout = self.layout
 
         row = layout.row()
-        row.operator("object.validate_model", icon="PLAY")
-        row.operator("object.clear_validation_results", icon="X")
+        if context.scene.validation_running:
+            row.prop(context.scene, "validation_progress", slider=True, text="Validating")
+            row.operator("object.cancel_validation", icon="CANCEL", text="")
+        else:
+            row.operator("object.validate_model", icon="PLAY")
+            row.operator("object.clear_validation_results", icon="X")
 
+        layout.prop(context.scene, "validation_backend")
         layout.prop(context.scene, "save_temps")
+        row = layout.row()
+        row.prop(context.scene, "use_validation_cache")
+        row.operator("object.clear_validation_cache", icon="TRASH")
 
         layout.separator()
 
@@ -152,7 +431,9 @@ class ValidationResultsPanel(bpy.types.Panel):
 def register():
     bpy.utils.register_class(ValidationResultItem)
     bpy.utils.register_class(ValidateModelOperator)
+    bpy.utils.register_class(CancelValidationOperator)
     bpy.utils.register_class(ClearValidationResultsOperator)
+    bpy.utils.register_class(ClearValidationCacheOperator)
     bpy.utils.register_class(ValidationResultsPanel)
 
     bpy.types.Scene.validation_results = bpy.props.CollectionProperty(type=ValidationResultItem)
@@ -171,18 +452,50 @@ def register():
         description="Keep exported FBX and validation JSON next to .blend file",
         default=False
     )
+    bpy.types.Scene.validation_backend = bpy.props.EnumProperty(
+        name="Backend",
+        description="Where the validation rules are evaluated",
+        items=[
+            ('NATIVE', "Native", "Evaluate rules on Blender data, use Maya only for Maya-only checks"),
+            ('MAYA', "Maya Standalone", "Export to FBX and run every check in Maya Standalone"),
+        ],
+        default='NATIVE'
+    )
+    bpy.types.Scene.validation_running = bpy.props.BoolProperty(
+        name="Validation Running",
+        description="Whether a Maya validation is running in the background",
+        default=False
+    )
+    bpy.types.Scene.validation_progress = bpy.props.FloatProperty(
+        name="Validation Progress",
+        subtype='FACTOR',
+        min=0.0,
+        max=1.0,
+        default=0.0
+    )
+    bpy.types.Scene.use_validation_cache = bpy.props.BoolProperty(
+        name="Use Validation Cache",
+        description="Only re-validate objects that changed since the last run",
+        default=True
+    )
 
 
 def unregister():
     bpy.utils.unregister_class(ValidationResultItem)
     bpy.utils.unregister_class(ValidateModelOperator)
+    bpy.utils.unregister_class(CancelValidationOperator)
     bpy.utils.unregister_class(ClearValidationResultsOperator)
+    bpy.utils.unregister_class(ClearValidationCacheOperator)
     bpy.utils.unregister_class(ValidationResultsPanel)
 
     del bpy.types.Scene.validation_results
     del bpy.types.Scene.issues_found
     del bpy.types.Scene.validation_ran
     del bpy.types.Scene.save_temps
+    del bpy.types.Scene.use_validation_cache
+    del bpy.types.Scene.validation_backend
+    del bpy.types.Scene.validation_running
+    del bpy.types.Scene.validation_progress
 
 
 if __name__ == "__main__":
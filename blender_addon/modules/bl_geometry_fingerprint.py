@@ -0,0 +1,258 @@
+# -*- coding: utf-8 -*-
+"""
+Geometry fingerprints of Blender meshes, NumPy counterpart of
+maya_scripts/ma_geometry_fingerprint.
+
+Finds objects whose meshes are copies of each other (same topology and
+points, or the same shape moved, rotated or uniformly scaled, but not
+mirrored) and lets the
+FBX export write each unique geometry once, with the copies exported as
+instances of it.
+"""
+
+import hashlib
+from collections import OrderedDict
+from contextlib import contextmanager
+
+import numpy as np
+
+# Misma precision y tolerancia que ma_geometry_fingerprint
+POINT_PRECISION = 1e-4
+SHAPE_TOLERANCE = 1e-3
+
+# Campo de foreach_get, ancho y dtype de cada tipo de atributo (bpy.types.Attribute.data_type)
+ATTRIBUTE_FIELDS = {
+    "FLOAT": ("value", 1, np.float32),
+    "INT": ("value", 1, np.int32),
+    "INT8": ("value", 1, np.int32),
+    "BOOLEAN": ("value", 1, np.bool_),
+    "FLOAT2": ("vector", 2, np.float32),
+    "FLOAT_VECTOR": ("vector", 3, np.float32),
+    "FLOAT_COLOR": ("color", 4, np.float32),
+    "BYTE_COLOR": ("color", 4, np.float32),
+}
+
+
+class Fingerprint(object):
+    """Hashes and size of one mesh geometry (same fields as the Maya module)."""
+
+    def __init__(self, topology, exact, radii, orientations, vertices, faces, face_vertices, scale):
+        self.topology = topology
+        self.exact = exact
+        self.radii = radii
+        self.orientations = orientations
+        self.vertices = vertices
+        self.faces = faces
+        self.face_vertices = face_vertices
+        self.scale = scale
+
+    @property
+    def bytes(self):
+        return self.vertices * 12 + self.face_vertices * 4 + self.faces * 4
+
+
+def _array(collection, attr, dtype, width=1):
+    data = np.empty(len(collection) * width, dtype=dtype)
+    collection.foreach_get(attr, data)
+    return data.reshape(-1, width) if width > 1 else data
+
+
+def face_orientations(counts, indices, points, center):
+    """
+    Volume each face spans with `center` (fan triangles summed) over the sum
+    of |a| |b x c| of those triangles, as float32 in [-1, 1]: negated by a
+    mirror, unlike the centroid distances.
+    """
+    if not len(counts):
+        return np.zeros(0, dtype=np.float32)
+    local = points - center
+    starts = np.cumsum(counts) - counts
+    tri_count = np.maximum(counts - 2, 0)
+    tri_face = np.repeat(np.arange(len(counts)), tri_count)
+    k = np.arange(int(tri_count.sum())) - np.repeat(np.cumsum(tri_count) - tri_count, tri_count) + 1
+    a = local[indices[starts[tri_face]]]
+    b = local[indices[starts[tri_face] + k]]
+    c = local[indices[starts[tri_face] + k + 1]]
+    normal = np.cross(b, c)
+    volume = np.bincount(tri_face, weights=(a * normal).sum(axis=1), minlength=len(counts))
+    norm = np.bincount(tri_face, weights=np.sqrt((a * a).sum(axis=1) * (normal * normal).sum(axis=1)),
+                       minlength=len(counts))
+    return np.where(norm > 0.0, volume / np.where(norm > 0.0, norm, 1.0), 0.0).astype(np.float32)
+
+
+def same_shape(first, second, tolerance=SHAPE_TOLERANCE):
+    """Same topology, vertex distances and face orientations within `tolerance` (see ma_geometry_fingerprint)."""
+    if first.topology != second.topology:
+        return False
+    return bool((np.abs(first.radii - second.radii) <= tolerance).all()
+                and (np.abs(first.orientations - second.orientations) <= tolerance).all())
+
+
+def fingerprint(mesh):
+    """
+    Fingerprint of a bpy.types.Mesh.
+
+    :return: Fingerprint, with hashes compatible in meaning (not in value)
+             with ma_geometry_fingerprint.
+    """
+    counts = _array(mesh.polygons, "loop_total", np.int32)
+    indices = _array(mesh.loops, "vertex_index", np.int32)
+    points = _array(mesh.vertices, "co", np.float32, 3).astype(np.float64)
+
+    topology = hashlib.sha1(counts.tobytes())
+    topology.update(indices.tobytes())
+
+    exact = topology.copy()
+    exact.update(np.round(points / POINT_PRECISION).tobytes())
+
+    # Distancia al centroide por vertice: invariante a traslacion y rotacion, normalizada por escala
+    center = points.mean(axis=0) if len(points) else np.zeros(3)
+    radii = np.sqrt(((points - center) ** 2).sum(axis=1))
+    scale = float(radii.max()) if len(points) else 0.0
+    if scale > 0.0:
+        radii /= scale
+    # Orientacion de cada cara: separa las copias espejadas
+    orientations = face_orientations(counts.astype(np.int64), indices.astype(np.int64), points, center)
+
+    return Fingerprint(topology.hexdigest(), exact.hexdigest(), radii.astype(np.float32), orientations,
+                       len(points), len(counts), len(indices), scale)
+
+
+def group_duplicates(fingerprints, similar=True):
+    """
+    Groups meshes with the same geometry (see ma_geometry_fingerprint.group_duplicates).
+
+    :param fingerprints: {name: Fingerprint}
+    :return: list of {"kind", "meshes", "vertices", "faces", "bytes", "savings"}.
+    """
+    by_hash = OrderedDict()
+    for name, fp in fingerprints.items():
+        candidates = by_hash.setdefault(fp.topology if similar else fp.exact, [])
+        group = next((group for group in candidates
+                      if not similar or same_shape(fingerprints[group[0]], fp)), None)
+        if group is None:
+            candidates.append([name])
+        else:
+            group.append(name)
+
+    groups = []
+    for names in (names for candidates in by_hash.values() for names in candidates):
+        if len(names) < 2:
+            continue
+        fp = fingerprints[names[0]]
+        exact = all(fingerprints[n].exact == fp.exact for n in names)
+        groups.append({
+            "kind": "exact" if exact else "similar",
+            "meshes": names,
+            "vertices": fp.vertices,
+            "faces": fp.faces,
+            "bytes": fp.bytes,
+            "savings": fp.bytes * (len(names) - 1),
+        })
+    groups.sort(key=lambda g: -g["savings"])
+    return groups
+
+
+def format_bytes(size):
+    for unit in ("B", "KB", "MB"):
+        if size < 1024.0:
+            return "{:.1f} {}".format(size, unit)
+        size /= 1024.0
+    return "{:.1f} GB".format(size)
+
+
+def duplicate_report(fingerprints, similar=True):
+    """{"groups", "duplicates", "total_bytes", "savings"} like ma_geometry_fingerprint.duplicate_report."""
+    groups = group_duplicates(fingerprints, similar)
+    return {
+        "groups": groups,
+        "duplicates": sum(len(g["meshes"]) - 1 for g in groups),
+        "total_bytes": sum(fp.bytes for fp in fingerprints.values()),
+        "savings": sum(g["savings"] for g in groups),
+    }
+
+
+def _loop_normals(mesh):
+    if hasattr(mesh, "corner_normals"):
+        # Blender 4.1+
+        return _array(mesh.corner_normals, "vector", np.float32, 3)
+    mesh.calc_normals_split()
+    return _array(mesh.loops, "normal", np.float32, 3)
+
+
+def _export_key(obj, fp):
+    """
+    Hash of everything the exported mesh carries: geometry, UVs, normals
+    (custom or not), seams, attribute layers (colors, sharp edges/faces,
+    material indices...) and materials. None when the mesh has an attribute
+    type it cannot compare: the object is then always written as is.
+    """
+    mesh = obj.data
+    h = hashlib.sha1(fp.exact.encode("utf-8"))
+    for layer in mesh.uv_layers:
+        h.update(layer.name.encode("utf-8"))
+        h.update(np.round(_array(layer.data, "uv", np.float32, 2) / POINT_PRECISION).tobytes())
+    h.update(_loop_normals(mesh).tobytes())
+    h.update(_array(mesh.edges, "vertices", np.int32, 2).tobytes())
+    h.update(_array(mesh.edges, "use_seam", np.bool_).tobytes())
+    # Los internos (".select_vert"...) no se exportan; las posiciones ya estan en fp.exact
+    for attribute in sorted(mesh.attributes, key=lambda attribute: attribute.name):
+        if attribute.name.startswith(".") or attribute.name == "position":
+            continue
+        field = ATTRIBUTE_FIELDS.get(attribute.data_type)
+        if field is None:
+            return None
+        name, width, dtype = field
+        h.update(repr((attribute.name, attribute.domain, attribute.data_type)).encode("utf-8"))
+        h.update(_array(attribute.data, name, dtype, width).tobytes())
+    h.update(repr([slot.material.name if slot.material else None for slot in obj.material_slots]).encode("utf-8"))
+    return h.hexdigest()
+
+
+def unique_geometry(objects):
+    """
+    Splits mesh objects into the ones whose geometry has to be written and
+    instance references for the rest. Objects with modifiers or shape keys
+    are always unique (their exported mesh is not their data).
+
+    :return: ([unique objects], OrderedDict {duplicate object: object it instances})
+    """
+    unique = []
+    references = OrderedDict()
+    first = {}
+    for obj in objects:
+        if obj.type != 'MESH' or obj.modifiers or obj.data.shape_keys:
+            unique.append(obj)
+            continue
+        key = _export_key(obj, fingerprint(obj.data))
+        if key is None:
+            unique.append(obj)
+        elif key in first:
+            references[obj] = first[key]
+        else:
+            first[key] = obj
+            unique.append(obj)
+    return unique, references
+
+
+@contextmanager
+def shared_geometry(objects):
+    """
+    Temporarily links every exact duplicate in `objects` to the mesh of the
+    object it instances, so exporters write that geometry once. The original
+    meshes are restored on exit.
+
+    Yields the {duplicate object: object it instances} references.
+    """
+    _, references = unique_geometry(objects)
+    original = OrderedDict((obj, obj.data) for obj in references)
+    try:
+        for obj, source in references.items():
+            obj.data = source.data
+        if references:
+            print("[Export] {} object(s) exported as instances of {} mesh(es)".format(
+                len(references), len(set(references.values()))))
+        yield references
+    finally:
+        for obj, data in original.items():
+            obj.data = data
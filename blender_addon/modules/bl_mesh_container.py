@@ -0,0 +1,156 @@
+# -*- coding: utf-8 -*-
+"""
+Writer of .wmesh mesh containers, Blender counterpart of
+maya_scripts/ma_mesh_container (see that module for the layout).
+
+Lets the standalone Maya tools receive geometry and UVs without an FBX
+round trip. Data is converted to the space Maya gets from export_fbx_maya:
+Y up, X forward, one Blender unit per Maya unit, with the world matrix in
+Maya's row-vector convention.
+"""
+
+import json
+import struct
+from collections import OrderedDict
+
+import numpy as np
+from bpy_extras.io_utils import axis_conversion
+
+# Mismos valores que ma_mesh_container
+MAGIC = b"WMSH"
+VERSION = 1
+HEADER = struct.Struct("<4sHHII")
+ALIGNMENT = 16
+EXTENSION = ".wmesh"
+
+# Misma precision con la que bl_uv_analysis suelda los UVs de un vertice
+UV_WELD_DIGITS = 6
+
+
+def _pad(size):
+    return (-size) % ALIGNMENT
+
+
+def _array(collection, attr, dtype, width=1):
+    data = np.empty(len(collection) * width, dtype=dtype)
+    collection.foreach_get(attr, data)
+    return data.reshape(-1, width) if width > 1 else data
+
+
+def _uv_set(layer, loop_vertex, poly_sizes):
+    # UVs por loop -> UVs compartidos por vertice (ids de UV como los de Maya)
+    uv = _array(layer.data, "uv", np.float32, 2)
+    welded = np.column_stack([loop_vertex, np.round(uv.astype(np.float64) * 10 ** UV_WELD_DIGITS).astype(np.int64)])
+    _, first, uv_ids = np.unique(welded, axis=0, return_index=True, return_inverse=True)
+    return OrderedDict([
+        ("name", layer.name),
+        ("us", uv[first, 0]),
+        ("vs", uv[first, 1]),
+        ("uv_counts", poly_sizes),
+        ("uv_ids", uv_ids.reshape(-1).astype(np.int32)),
+    ])
+
+
+def read_object(obj, depsgraph):
+    """
+    Reads the evaluated mesh of an object (modifiers applied, like the FBX
+    export) into the dict layout of write_container.
+    """
+    conversion = axis_conversion(to_forward='X', to_up='Y').to_4x4()
+    rotation = conversion.to_3x3()
+    evaluated = obj.evaluated_get(depsgraph)
+    mesh = evaluated.to_mesh()
+    try:
+        points = _array(mesh.vertices, "co", np.float32, 3) @ np.array(rotation, dtype=np.float32).T
+        poly_sizes = _array(mesh.polygons, "loop_total", np.int32)
+        loop_vertex = _array(mesh.loops, "vertex_index", np.int32)
+        if hasattr(mesh, "corner_normals"):
+            normals = _array(mesh.corner_normals, "vector", np.float32, 3)
+        else:
+            normals = _array(mesh.loops, "normal", np.float32, 3)
+        normals = normals @ np.array(rotation, dtype=np.float32).T
+
+        # Slots vacios -> sin material (-1), como las caras sin shader en Maya
+        slots = [slot.material.name if slot.material else None for slot in obj.material_slots]
+        materials = [name for name in slots if name is not None]
+        remap = np.array([materials.index(name) if name is not None else -1 for name in slots] or [-1], dtype=np.int32)
+        material_ids = remap[np.clip(_array(mesh.polygons, "material_index", np.int32), 0, len(remap) - 1)]
+
+        uv_sets = [_uv_set(layer, loop_vertex, poly_sizes) for layer in mesh.uv_layers]
+    finally:
+        evaluated.to_mesh_clear()
+
+    matrix = conversion @ obj.matrix_world @ conversion.inverted()
+    return {
+        "name": obj.name,
+        "transform": obj.name,
+        # Maya guarda las matrices por filas con la traslacion en la ultima fila
+        "matrix": [matrix[j][i] for i in range(4) for j in range(4)],
+        "materials": materials,
+        "arrays": OrderedDict([
+            ("points", points.reshape(-1)),
+            ("counts", poly_sizes),
+            ("indices", loop_vertex),
+            ("normals", normals.reshape(-1)),
+            ("normal_ids", np.arange(len(loop_vertex), dtype=np.int32)),
+            ("material_ids", material_ids),
+            ("uv_sets", uv_sets),
+        ]),
+    }
+
+
+def write_container(path, meshes, up_axis="y", units="cm"):
+    """
+    Writes a .wmesh file (same layout as ma_mesh_container.write_container).
+
+    :param meshes: list of dicts from read_object.
+    :return: Size of the file in bytes.
+    """
+    blobs = []
+    offset = 0
+
+    def entry(values):
+        nonlocal offset
+        values = np.ascontiguousarray(values, dtype='<f4' if values.dtype.kind == 'f' else '<i4')
+        data = values.tobytes()
+        item = {"type": "f" if values.dtype.kind == 'f' else "i", "offset": offset, "count": int(values.size)}
+        blobs.append(data + b"\0" * _pad(len(data)))
+        offset += len(data) + _pad(len(data))
+        return item
+
+    toc_meshes = []
+    for mesh in meshes:
+        arrays = OrderedDict((key, entry(values)) for key, values in mesh["arrays"].items() if key != "uv_sets")
+        arrays["uv_sets"] = [OrderedDict([("name", uv_set["name"])] + [(key, entry(values))
+                                                                      for key, values in uv_set.items() if key != "name"])
+                             for uv_set in mesh["arrays"]["uv_sets"]]
+        toc_meshes.append(OrderedDict([
+            ("name", mesh["name"]),
+            ("transform", mesh["transform"]),
+            ("matrix", [float(v) for v in mesh["matrix"]]),
+            ("materials", mesh["materials"]),
+            ("arrays", arrays),
+        ]))
+
+    toc = json.dumps({"version": VERSION, "up_axis": up_axis, "units": units, "meshes": toc_meshes}).encode("utf-8")
+    toc += b" " * _pad(HEADER.size + len(toc))
+
+    with open(path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION, 0, len(toc), 0))
+        f.write(toc)
+        for blob in blobs:
+            f.write(blob)
+    return HEADER.size + len(toc) + offset
+
+
+def export_container(context, objects, filepath):
+    """
+    Writes the mesh objects in `objects` to a .wmesh file.
+
+    :return: Number of meshes written.
+    """
+    depsgraph = context.evaluated_depsgraph_get()
+    meshes = [read_object(obj, depsgraph) for obj in objects if obj.type == 'MESH']
+    size = write_container(filepath, meshes)
+    print("[Export] {} mesh(es) written to {} ({:.1f} KB)".format(len(meshes), filepath, size / 1024.0))
+    return len(meshes)
@@ -0,0 +1,431 @@
+# -*- coding: utf-8 -*-
+"""
+Native Blender implementation of the ma_model_profiler rule set.
+
+Reads mesh data in bulk with foreach_get into NumPy arrays and returns the
+same result schema as ma_validate_fbx ({check: {"passed", "message",
+"seconds", "severity"}}), so most validations need no FBX export and no
+Maya subprocess at all. Checks listed in MAYA_ONLY_CHECKS still go through
+the Maya standalone backend.
+"""
+
+import os
+import re
+import json
+import time
+import fnmatch
+import itertools
+from collections import OrderedDict
+
+import numpy as np
+
+import bl_uv_analysis as uv_analysis
+import bl_geometry_fingerprint as geometry_fingerprint
+
+# Costo, severidad, perfiles y config por defecto de cada check, compartidos con ma_model_profiler:
+# la copia de los scripts de Maya si esta instalada, si no la que viaja con el add-on
+# (tests/test_profiler_registry.py comprueba que las dos sean iguales)
+PROFILER_CHECKS_PATHS = [path for path in (
+    os.environ.get("WAUR_PROFILER_CHECKS"),
+    os.path.expanduser("~/Documents/maya/2018/scripts/ma_profiler_checks.json"),
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "ma_profiler_checks.json"),
+) if path]
+
+# Presupuestos por categoria compartidos con ma_polygon_budget (ma_polygon_budgets.json)
+POLYGON_BUDGETS_PATH = os.environ.get("WAUR_POLYGON_BUDGETS",
+                                      os.path.expanduser("~/Documents/maya/2018/scripts/ma_polygon_budgets.json"))
+
+# Checks que solo tienen sentido sobre la escena de Maya (ninguno por ahora)
+MAYA_ONLY_CHECKS = []
+
+_registry = {}
+
+
+def _load_registry():
+    """
+    Check metadata of the first ma_profiler_checks.json of PROFILER_CHECKS_PATHS,
+    reloaded when the file changes:
+    {"max_reported": int, "checks": OrderedDict {check: {"cost", "severity", "profiles", "config"}}}.
+    """
+    path = next((path for path in PROFILER_CHECKS_PATHS if os.path.isfile(path)), None)
+    if path is None:
+        raise IOError("Profiler check registry not found: {}".format(", ".join(PROFILER_CHECKS_PATHS)))
+    stamp = (path, os.path.getmtime(path))
+    if _registry.get("stamp") != stamp:
+        with open(path, "r") as f:
+            data = json.load(f)
+        _registry.update(stamp=stamp, max_reported=data["max_reported_components"],
+                         checks=OrderedDict((entry["name"], entry) for entry in data["checks"]))
+    return _registry
+
+
+def profile_checks(profile):
+    """Checks of a ma_model_profiler profile, cheapest first (same order as ma_model_profiler.iter_checks)."""
+    checks = [entry for entry in _load_registry()["checks"].values() if profile in entry["profiles"]]
+    return [entry["name"] for entry in sorted(checks, key=lambda entry: entry["cost"])]
+
+
+def _config(name):
+    return _load_registry()["checks"][name].get("config") or {}
+
+
+class MeshData(object):
+    """Bulk arrays of one mesh object, read from obj.data (the base mesh, without modifiers)."""
+
+    def __init__(self, obj):
+        mesh = obj.data
+        self.obj = obj
+        self.poly_sizes = np.empty(len(mesh.polygons), dtype=np.int32)
+        mesh.polygons.foreach_get("loop_total", self.poly_sizes)
+        self.material_indices = np.empty(len(mesh.polygons), dtype=np.int32)
+        mesh.polygons.foreach_get("material_index", self.material_indices)
+        self._arrays = {}
+        self._uv_reports = None
+
+    def array(self, collection, attr, dtype, width=1):
+        """Reads a per-element attribute on first use (only the checks that need it pay for it)."""
+        key = (collection, attr)
+        if key not in self._arrays:
+            items = getattr(self.obj.data, collection)
+            data = np.empty(len(items) * width, dtype=dtype)
+            items.foreach_get(attr, data)
+            self._arrays[key] = data.reshape(-1, width) if width > 1 else data
+        return self._arrays[key]
+
+    def uv_reports(self):
+        """{uv layer: report} of bl_uv_analysis, computed once for all UV checks."""
+        if self._uv_reports is None:
+            self._uv_reports = uv_analysis.analyze_mesh(self.obj.data)
+        return self._uv_reports
+
+    def face_vertices(self):
+        """(n faces, max size) matrix of sorted vertex indices, padded with -1."""
+        loop_vertex = self.array("loops", "vertex_index", np.int64)
+        loop_start = self.array("polygons", "loop_start", np.int64)
+        rows = np.repeat(np.arange(len(self.poly_sizes)), self.poly_sizes)
+        cols = np.arange(len(loop_vertex)) - np.repeat(loop_start, self.poly_sizes)
+        matrix = np.full((len(self.poly_sizes), int(self.poly_sizes.max())), -1, dtype=np.int64)
+        matrix[rows, cols] = loop_vertex
+        matrix.sort(axis=1)
+        return matrix
+
+
+def _objects_with_data(objects):
+    return [(obj, MeshData(obj) if obj.type == 'MESH' else None) for obj in objects]
+
+
+def _offenders(items, ok_message, fail_message):
+    if not items:
+        return True, ok_message
+    return False, fail_message.format(count=len(items), items=", ".join(items))
+
+
+def _component_ranges(name, kind, indices):
+    # Mismo formato que ma_mesh_integrity.component_ranges ("obj.vtx[3:7]")
+    ranges = []
+    indices = np.unique(indices)
+    if not len(indices):
+        return ranges
+    breaks = np.nonzero(np.diff(indices) != 1)[0] + 1
+    for run in np.split(indices, breaks):
+        span = str(run[0]) if len(run) == 1 else "{}:{}".format(run[0], run[-1])
+        ranges.append("{}.{}[{}]".format(name, kind, span))
+    return ranges
+
+
+def _components(data, kind, finder, fail_message):
+    count = 0
+    ranges = []
+    for obj, mesh in data:
+        if not mesh or not len(mesh.poly_sizes):
+            continue
+        found, n = finder(mesh)
+        count += n
+        ranges.extend(_component_ranges(obj.name, kind, found))
+    if not count:
+        return True, "OK Passed"
+    max_reported = _load_registry()["max_reported"]
+    items = ", ".join(ranges[:max_reported])
+    if len(ranges) > max_reported:
+        items += ", ..."
+    return False, fail_message.format(count=count, items=items)
+
+
+def _coincident_vertices(mesh):
+    co = mesh.array("vertices", "co", np.float32, 3).astype(np.float64)
+    found = np.zeros(len(co), dtype=bool)
+    tolerance = _config("coincident_vertices")["tolerance"]
+    cell = 2.0 * tolerance
+    # Dos puntos a distancia <= tolerancia comparten celda en al menos una de las 8 grillas desplazadas
+    for shift in itertools.product((0.0, 0.5), repeat=3):
+        keys = np.floor(co / cell + shift).astype(np.int64)
+        _, inverse, counts = np.unique(keys, axis=0, return_inverse=True, return_counts=True)
+        inverse = inverse.reshape(-1)
+        shared = np.nonzero(counts[inverse] > 1)[0]
+        if not len(shared):
+            continue
+        shared = shared[np.argsort(inverse[shared], kind="stable")]
+        for group in np.split(shared, np.nonzero(np.diff(inverse[shared]))[0] + 1):
+            points = co[group]
+            dist2 = ((points[:, None, :] - points[None, :, :]) ** 2).sum(axis=2)
+            np.fill_diagonal(dist2, np.inf)
+            found[group[(dist2 <= tolerance ** 2).any(axis=1)]] = True
+    found = np.nonzero(found)[0]
+    return found, len(found)
+
+
+def _degenerate_faces(mesh):
+    found = np.nonzero(mesh.array("polygons", "area", np.float32) <= _config("degenerate_faces")["area_tolerance"])[0]
+    return found, len(found)
+
+
+def _lamina_faces(mesh):
+    _, inverse, counts = np.unique(mesh.face_vertices(), axis=0, return_inverse=True, return_counts=True)
+    found = np.nonzero(counts[inverse.reshape(-1)] > 1)[0]
+    return found, len(found)
+
+
+def _non_manifold_edges(mesh):
+    edge_vertices = mesh.array("edges", "vertices", np.int64, 2)
+    faces_per_edge = np.bincount(mesh.array("loops", "edge_index", np.int64), minlength=len(edge_vertices))
+    edges = np.nonzero(faces_per_edge > 2)[0]
+    return edge_vertices[edges].reshape(-1), len(edges)
+
+
+def check_coincident_vertices(data):
+    return _components(data, "vtx", _coincident_vertices, "Fail: {count} coincident vertices: {items}")
+
+
+def check_degenerate_faces(data):
+    return _components(data, "f", _degenerate_faces, "Fail: {count} zero-area/degenerate faces: {items}")
+
+
+def check_lamina_faces(data):
+    return _components(data, "f", _lamina_faces, "Fail: {count} lamina faces: {items}")
+
+
+def check_non_manifold_edges(data):
+    return _components(data, "vtx", _non_manifold_edges, "Fail: {count} non-manifold edges: {items}")
+
+
+def check_uv_overlaps(data):
+    problematic = ["{} ({}: {} shell pairs)".format(obj.name, layer, len(report["overlapping_shells"]))
+                   for obj, mesh in data if mesh
+                   for layer, report in mesh.uv_reports().items() if report["overlapping_shells"]]
+    return _offenders(problematic, "OK Passed", "Fail: Overlapping UV shells in: {items}")
+
+
+def check_uv_range(data):
+    allow_udims = _config("uv_range")["allow_udims"]
+    problematic = []
+    for obj, mesh in data:
+        if not mesh:
+            continue
+        for layer, report in mesh.uv_reports().items():
+            if allow_udims and report["straddling_faces"]:
+                problematic.append("{} ({}: {} faces across UDIM tiles)".format(obj.name, layer, report["straddling_faces"]))
+            elif not allow_udims and report["outside_uvs"]:
+                problematic.append("{} ({}: {} UVs outside 0-1)".format(obj.name, layer, report["outside_uvs"]))
+    return _offenders(problematic, "OK Passed", "Fail: UVs out of range in: {items}")
+
+
+def check_texel_density(data):
+    max_variation = _config("texel_density")["max_variation"]
+    problematic = ["{} ({}: {:.0%})".format(obj.name, layer, report["texel_density_cv"])
+                   for obj, mesh in data if mesh
+                   for layer, report in mesh.uv_reports().items()
+                   if report["texel_density_cv"] is not None
+                   and report["texel_density_cv"] > max_variation]
+    return _offenders(problematic, "OK Passed", "Fail: Texel density varies more than {:.0%} in: {{items}}".format(max_variation))
+
+
+def check_duplicate_geometry(data):
+    # Los objetos que ya comparten mesh son instancias reales: no cuentan como duplicados
+    fingerprints = OrderedDict((obj.name, geometry_fingerprint.fingerprint(obj.data))
+                               for obj, mesh in data if mesh and obj.data.users == 1)
+    report = geometry_fingerprint.duplicate_report(fingerprints, _config("duplicate_geometry")["include_similar"])
+    if not report["groups"]:
+        return True, "OK Passed"
+    groups = ["{} (+{}{})".format(g["meshes"][0], len(g["meshes"]) - 1, ", similar" if g["kind"] == "similar" else "")
+              for g in report["groups"]]
+    return False, "Fail: {} meshes could be instances, saving ~{}: {}".format(
+        report["duplicates"], geometry_fingerprint.format_bytes(report["savings"]), ", ".join(groups))
+
+
+def check_instances(data):
+    problematic = [obj.name for obj, mesh in data if mesh and obj.data.users > 1]
+    return _offenders(problematic, "No instances", "Instances in model: {items}")
+
+
+def check_ngons(data):
+    count = sum(int(np.count_nonzero(mesh.poly_sizes > 4)) for obj, mesh in data if mesh)
+    if not count:
+        return True, "OK Passed"
+    return False, "Fail: {} ngons found".format(count)
+
+
+def check_namespaces(data):
+    namespaces = sorted(set(obj.name.rsplit(":", 1)[0] for obj, mesh in data if ":" in obj.name))
+    return _offenders(namespaces, "OK Passed", "Namespaces found: {items}")
+
+
+_budgets = {}
+
+
+def _polygon_budget():
+    """(category, {metric: max}) of the current .blend, with the rules of ma_polygon_budget.category_for."""
+    import bpy
+
+    if not os.path.isfile(POLYGON_BUDGETS_PATH):
+        return None, {}
+    mtime = os.path.getmtime(POLYGON_BUDGETS_PATH)
+    if _budgets.get("mtime") != mtime:
+        with open(POLYGON_BUDGETS_PATH, "r") as f:
+            _budgets.update(mtime=mtime, config=json.load(f))
+    config = _budgets["config"]
+    path = bpy.data.filepath.replace("\\", "/").lower()
+    category = next((rule["category"] for rule in config.get("rules", [])
+                     if path and fnmatch.fnmatch(path, rule["match"].lower())), config.get("default_category"))
+    return category, config.get("categories", {}).get(category, {})
+
+
+def check_polycount(data):
+    total_faces = sum(len(mesh.poly_sizes) for obj, mesh in data if mesh)
+    total_tris = sum(int(mesh.poly_sizes.sum()) - 2 * len(mesh.poly_sizes) for obj, mesh in data if mesh)
+    message = "Polygons: {}, Triangles: {}".format(total_faces, total_tris)
+
+    category, budget = _polygon_budget()
+    if not budget:
+        return True, message
+    counts = {"triangles": total_tris,
+              "vertices": sum(len(obj.data.vertices) for obj, mesh in data if mesh),
+              "materials": len(set(slot.material.name for obj, mesh in data if mesh
+                                   for slot in obj.material_slots if slot.material))}
+    over = [(metric, counts[metric], budget[metric]) for metric in ("triangles", "vertices", "materials")
+            if metric in budget and counts[metric] > budget[metric]]
+    if not over:
+        return True, "{} (within {} budget)".format(message, category)
+    details = ", ".join("{} {}/{}".format(m, v, b) for m, v, b in over)
+    return False, "Fail: {} over {} budget: {}".format(message, category, details)
+
+
+def check_hidden_meshes(data):
+    hidden = [obj.name for obj, mesh in data if mesh and (obj.hide_get() or obj.hide_viewport)]
+    return _offenders(hidden, "OK Passed", "Fail: Hidden meshes found")
+
+
+def check_naming(data):
+    config = _config("naming")
+    prefixes = tuple(config["prefixes"])
+    suffixes = tuple(config["suffixes"])
+    bad_names = [obj.name for obj, mesh in data
+                 if not obj.name.startswith(prefixes) or not obj.name.endswith(suffixes)]
+    return _offenders(bad_names, "OK Passed", "Fail: Invalid names: {items}")
+
+
+def check_history(data):
+    # Equivalente Blender de la historia de construccion: modificadores y shape keys
+    with_history = [obj.name for obj, mesh in data
+                    if obj.modifiers or (mesh and obj.data.shape_keys)]
+    return _offenders(with_history, "OK Passed", "Fail: History found in: {items}")
+
+
+def check_multiple_materials(data):
+    max_materials = _config("multiple_materials")["max_materials"]
+    problematic = []
+    for obj, mesh in data:
+        if not mesh or not len(mesh.material_indices):
+            continue
+        slots = obj.material_slots
+        used = set()
+        for index in np.unique(mesh.material_indices):
+            if index < len(slots) and slots[index].material:
+                used.add(slots[index].material.name)
+        if len(used) > max_materials:
+            problematic.append(obj.name)
+    return _offenders(problematic, "OK Passed",
+                      "Fail: Meshes with >" + str(max_materials) + " materials: {items}")
+
+
+def check_duplicate_materials(data):
+    # Blender no permite nombres repetidos; los duplicados aparecen como "mat.001"
+    seen = {}
+    duplicates = []
+    for obj, mesh in data:
+        for slot in obj.material_slots:
+            mat = slot.material
+            if mat is None or mat.name in seen:
+                continue
+            base = re.sub(r"\.\d{3}$", "", mat.name)
+            if base in seen.values():
+                duplicates.append(mat.name)
+            seen[mat.name] = base
+    return _offenders(duplicates, "OK Passed", "Fail: Duplicate materials: {items}")
+
+
+def check_transform_zero(data):
+    tolerance = _config("transforms_reset")["tolerance"]
+    non_zero = []
+    for obj, mesh in data:
+        loc = np.array(obj.location)
+        # En grados, como ma_profiler_snapshot: la misma tolerancia del registro vale para los dos
+        rot = np.degrees(np.array(obj.matrix_basis.to_euler()))
+        scale = np.array(obj.scale)
+        if (np.abs(loc) > tolerance).any() or (np.abs(rot) > tolerance).any() \
+                or (np.abs(scale - 1.0) > tolerance).any():
+            non_zero.append(obj.name)
+    return _offenders(non_zero, "OK Passed", "Fail: Transforms not reset: {items}")
+
+
+NATIVE_CHECKS = OrderedDict([
+    ("instances", check_instances),
+    ("ngons", check_ngons),
+    ("namespaces", check_namespaces),
+    ("polycount", check_polycount),
+    ("hidden_meshes", check_hidden_meshes),
+    ("naming", check_naming),
+    ("history", check_history),
+    ("multiple_materials", check_multiple_materials),
+    ("duplicate_materials", check_duplicate_materials),
+    ("transforms_reset", check_transform_zero),
+    ("coincident_vertices", check_coincident_vertices),
+    ("degenerate_faces", check_degenerate_faces),
+    ("lamina_faces", check_lamina_faces),
+    ("non_manifold_edges", check_non_manifold_edges),
+    ("uv_overlaps", check_uv_overlaps),
+    ("uv_range", check_uv_range),
+    ("texel_density", check_texel_density),
+    ("duplicate_geometry", check_duplicate_geometry),
+])
+
+
+def maya_checks(profile):
+    """Checks of the profile that have no native implementation."""
+    return [name for name in profile_checks(profile) if name not in NATIVE_CHECKS or name in MAYA_ONLY_CHECKS]
+
+
+def run_checks(objects, profile="full"):
+    """
+    Runs the native checks of a profile over Blender objects.
+
+    :param objects: Objects to validate (usually context.selected_objects).
+    :param profile: 'quick' or 'full'.
+    :return: OrderedDict {check: {"passed", "message", "seconds", "severity"}}
+    """
+    results = OrderedDict()
+    checks = _load_registry()["checks"]
+    data = _objects_with_data(objects)
+
+    for name in profile_checks(profile):
+        func = NATIVE_CHECKS.get(name)
+        if func is None or name in MAYA_ONLY_CHECKS:
+            continue
+        start = time.time()
+        passed, message = func(data)
+        results[name] = {
+            "passed": passed,
+            "message": message,
+            "seconds": round(time.time() - start, 6),
+            "severity": checks[name]["severity"],
+        }
+    return results
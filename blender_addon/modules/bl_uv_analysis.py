@@ -0,0 +1,177 @@
+# -*- coding: utf-8 -*-
+"""
+UV metrics of Blender meshes, NumPy counterpart of maya_scripts/ma_uv_analysis.
+
+Per UV layer: shell count, overlapping shells (raster coverage), UVs outside
+0-1, faces straddling UDIM tiles, UDIM tiles used, 0-1 utilization and the
+area-weighted texel density variation. Reports use the same keys as the Maya
+module so both backends can be compared.
+"""
+
+from collections import OrderedDict
+
+import numpy as np
+
+# Celdas por lado de cada tile UDIM en la grilla de cobertura
+COVERAGE_RESOLUTION = 256
+
+# Margen para no contar como fuera de tile a los UVs apoyados justo en el borde
+TILE_EPSILON = 1e-5
+
+# Precision con la que dos loops del mismo vertice comparten UV (soldados)
+UV_WELD_DIGITS = 6
+
+
+def _array(collection, attr, dtype, width=1):
+    data = np.empty(len(collection) * width, dtype=dtype)
+    collection.foreach_get(attr, data)
+    return data.reshape(-1, width) if width > 1 else data
+
+
+def _uv_shells(uv_ids, loop_start, poly_sizes, uv_count):
+    # Union-find por cara: todos los UVs de una cara quedan en el mismo shell
+    parent = list(range(uv_count))
+    uv_ids = uv_ids.tolist()
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    for start, size in zip(loop_start.tolist(), poly_sizes.tolist()):
+        root = find(uv_ids[start])
+        for k in range(start + 1, start + size):
+            other = find(uv_ids[k])
+            if other != root:
+                parent[other] = root
+
+    roots = np.array([find(i) for i in range(uv_count)], dtype=np.int64)
+    _, shell_ids = np.unique(roots, return_inverse=True)
+    return int(shell_ids.max()) + 1 if uv_count else 0, shell_ids.reshape(-1)
+
+
+def _coverage(uv, tri, tri_shell, resolution):
+    """
+    Covered cells and their shell: cells whose center lies inside a triangle.
+    A triangle smaller than a cell marks one cell at most (none if it holds no center).
+    """
+    a, b, c = uv[tri[:, 0]], uv[tri[:, 1]], uv[tri[:, 2]]
+    lo = np.ceil(np.minimum(np.minimum(a, b), c) * resolution - 0.5).astype(np.int64)
+    hi = np.floor(np.maximum(np.maximum(a, b), c) * resolution - 0.5).astype(np.int64)
+    size = np.maximum(hi - lo + 1, 0)
+    count = size[:, 0] * size[:, 1]
+
+    owner = np.repeat(np.arange(len(tri)), count)
+    local = np.arange(int(count.sum())) - np.repeat(np.cumsum(count) - count, count)
+    width = np.maximum(size[owner, 0], 1)
+    cx = lo[owner, 0] + local % width
+    cy = lo[owner, 1] + local // width
+    px = (cx + 0.5) / resolution
+    py = (cy + 0.5) / resolution
+
+    ta, tb, tc = a[owner], b[owner], c[owner]
+    w0 = (tb[:, 0] - px) * (tc[:, 1] - py) - (tc[:, 0] - px) * (tb[:, 1] - py)
+    w1 = (tc[:, 0] - px) * (ta[:, 1] - py) - (ta[:, 0] - px) * (tc[:, 1] - py)
+    w2 = (ta[:, 0] - px) * (tb[:, 1] - py) - (tb[:, 0] - px) * (ta[:, 1] - py)
+    inside = ((w0 >= 0) & (w1 >= 0) & (w2 >= 0)) | ((w0 <= 0) & (w1 <= 0) & (w2 <= 0))
+
+    return cx[inside], cy[inside], tri_shell[owner[inside]]
+
+
+def analyze_uv_layer(mesh, layer, resolution=COVERAGE_RESOLUTION):
+    """
+    Computes the UV metrics of one UV layer.
+
+    :param mesh: bpy.types.Mesh.
+    :param layer: One of mesh.uv_layers.
+    :return: OrderedDict with the keys of ma_uv_analysis.analyze_uv_set.
+    """
+    poly_sizes = _array(mesh.polygons, "loop_total", np.int64)
+    loop_start = _array(mesh.polygons, "loop_start", np.int64)
+    loop_vertex = _array(mesh.loops, "vertex_index", np.int64)
+    uv = _array(layer.data, "uv", np.float32, 2).astype(np.float64)
+
+    # Loops del mismo vertice con el mismo UV son un solo UV (como los ids de UV de Maya)
+    welded = np.column_stack([loop_vertex, np.round(uv * 10 ** UV_WELD_DIGITS).astype(np.int64)])
+    _, first, uv_ids = np.unique(welded, axis=0, return_index=True, return_inverse=True)
+    uv_ids = uv_ids.reshape(-1)
+    uv_count = len(first)
+    shell_count, shell_ids = _uv_shells(uv_ids, loop_start, poly_sizes, uv_count)
+
+    unique_uv = uv[first]
+    outside = int(np.count_nonzero((unique_uv < 0.0).any(axis=1) | (unique_uv > 1.0).any(axis=1)))
+
+    report = OrderedDict()
+    report["uv_set"] = layer.name
+    report["uv_count"] = uv_count
+    report["shell_count"] = shell_count
+    report["overlapping_shells"] = []
+    report["outside_uvs"] = outside
+    report["straddling_faces"] = 0
+    report["udims"] = []
+    report["utilization"] = 0.0
+    report["texel_density_mean"] = None
+    report["texel_density_cv"] = None
+    faces = poly_sizes >= 3
+    if not faces.any():
+        return report
+
+    starts = loop_start[faces]
+    sizes = poly_sizes[faces]
+    face_center = np.add.reduceat(uv, loop_start, axis=0)[faces] / sizes[:, None]
+    face_min = np.minimum.reduceat(uv, loop_start, axis=0)[faces]
+    face_max = np.maximum.reduceat(uv, loop_start, axis=0)[faces]
+    tiles = np.floor(face_center)
+    straddling = ((face_min < tiles - TILE_EPSILON) | (face_max > tiles + 1 + TILE_EPSILON)).any(axis=1)
+    tile_keys = np.unique(tiles.astype(np.int64), axis=0)
+
+    # Triangulos en abanico desde el primer loop de cada cara
+    tri_count = sizes - 2
+    tri_face = np.repeat(np.arange(len(sizes)), tri_count)
+    k = np.arange(int(tri_count.sum())) - np.repeat(np.cumsum(tri_count) - tri_count, tri_count) + 1
+    tri = np.column_stack([starts[tri_face], starts[tri_face] + k, starts[tri_face] + k + 1])
+    a, b, c = uv[tri[:, 0]], uv[tri[:, 1]], uv[tri[:, 2]]
+    tri_area = 0.5 * np.abs((b[:, 0] - a[:, 0]) * (c[:, 1] - a[:, 1]) - (c[:, 0] - a[:, 0]) * (b[:, 1] - a[:, 1]))
+    uv_area = np.bincount(tri_face, weights=tri_area, minlength=len(sizes))
+
+    face_shell = shell_ids[uv_ids[starts]]
+    solid = tri_area > 0.0
+    cells_x, cells_y, shells = _coverage(uv, tri[solid], face_shell[tri_face[solid]], resolution)
+
+    # Celdas cubiertas por mas de un shell -> pares de shells solapados
+    cells = np.unique(np.column_stack([cells_x, cells_y, shells]), axis=0)
+    _, cell_index, cell_counts = np.unique(cells[:, :2], axis=0, return_inverse=True, return_counts=True)
+    shared = cells[cell_counts[cell_index.reshape(-1)] > 1]
+    pairs = set()
+    if len(shared):
+        order = np.lexsort((shared[:, 2], shared[:, 1], shared[:, 0]))
+        shared = shared[order]
+        breaks = np.nonzero((np.diff(shared[:, :2], axis=0) != 0).any(axis=1))[0] + 1
+        for group in np.split(shared[:, 2], breaks):
+            group = group.tolist()
+            pairs.update((group[i], group[j]) for i in range(len(group)) for j in range(i + 1, len(group)))
+
+    cell_keys = np.unique(cells[:, :2], axis=0)
+    in_unit = ((cell_keys >= 0) & (cell_keys < resolution)).all(axis=1)
+
+    report["overlapping_shells"] = [list(pair) for pair in sorted(pairs)]
+    report["straddling_faces"] = int(np.count_nonzero(straddling))
+    report["udims"] = sorted(int(1001 + u + 10 * v) for u, v in tile_keys.tolist())
+    report["utilization"] = round(100.0 * int(np.count_nonzero(in_unit)) / (resolution * resolution), 2)
+
+    area = _array(mesh.polygons, "area", np.float32).astype(np.float64)[faces]
+    valid = area > 0.0
+    if valid.any():
+        density = np.sqrt(uv_area[valid] / area[valid])
+        weights = area[valid]
+        mean = float(np.average(density, weights=weights))
+        std = float(np.sqrt(np.average((density - mean) ** 2, weights=weights)))
+        report["texel_density_mean"] = mean
+        report["texel_density_cv"] = std / mean if mean > 0.0 else 0.0
+    return report
+
+
+def analyze_mesh(mesh, resolution=COVERAGE_RESOLUTION):
+    """UV report of every UV layer of a mesh: {layer name: report}."""
+    return OrderedDict((layer.name, analyze_uv_layer(mesh, layer, resolution)) for layer in mesh.uv_layers)
@@ -0,0 +1,246 @@
+# -*- coding: utf-8 -*-
+"""
+Per-object validation cache for the WAUR Blender Validator.
+
+Results coming back from the Maya backend are stored per object, keyed by a
+hash of the object's geometry, UVs, transform, visibility, materials, modifiers
+and the validation profile. Only objects whose hash changed are exported and
+re-validated; the rest are answered from the cache. Scene-wide checks
+(duplicates, budgets of the whole asset) are keyed on the digests of the
+whole selection: when that entry is missing the whole selection is exported,
+since a subset would miss duplicates between changed and unchanged objects.
+
+Every entry remembers when it was last used: saving drops entries older than
+MAX_AGE and the least recently used beyond MAX_ENTRIES, merges what other
+Blender sessions saved meanwhile, and replaces the file in one step (temp
+file + os.replace) so concurrent sessions never leave it truncated.
+"""
+
+import os
+import re
+import json
+import time
+import hashlib
+import tempfile
+
+import numpy as np
+
+CACHE_VERSION = 2
+CACHE_PATH = os.path.join(tempfile.gettempdir(), "waur_blender_validation_cache.json")
+
+# Tope de entradas en disco (las menos usadas recientemente se descartan)
+MAX_ENTRIES = 20000
+# Entradas sin usar por mas de este tiempo se descartan al guardar
+MAX_AGE = 30 * 24 * 3600
+
+_entries = None
+_stats = {"hits": 0, "misses": 0}
+
+
+def _read():
+    # {clave: [ultimo uso, resultado]} del archivo, vacio si no existe o es de otra version
+    if not os.path.isfile(CACHE_PATH):
+        return {}
+    try:
+        with open(CACHE_PATH, "r") as f:
+            data = json.load(f)
+    except Exception as e:
+        print("[Validation] Could not read cache '{}': {}".format(CACHE_PATH, e))
+        return {}
+    return data.get("entries", {}) if data.get("version") == CACHE_VERSION else {}
+
+
+def _load():
+    global _entries
+    if _entries is None:
+        _entries = _read()
+    return _entries
+
+
+def _get(key):
+    entry = _load().get(key)
+    if entry is None:
+        return None
+    entry[0] = time.time()
+    return entry[1]
+
+
+def prune(entries, max_entries=MAX_ENTRIES, max_age=MAX_AGE, now=None):
+    """Drops entries unused for more than max_age seconds, then the least recently used beyond max_entries."""
+    oldest = (now or time.time()) - max_age
+    kept = sorted(((item[0], key) for key, item in entries.items() if item[0] >= oldest), reverse=True)
+    return dict((key, entries[key]) for _, key in kept[:max_entries])
+
+
+def save():
+    global _entries
+    if _entries is None:
+        return
+    # Lo que otras sesiones guardaron mientras tanto se conserva (gana el uso mas reciente)
+    entries = _read()
+    for key, entry in _entries.items():
+        if key not in entries or entries[key][0] <= entry[0]:
+            entries[key] = entry
+    _entries = prune(entries)
+    handle, temp_path = tempfile.mkstemp(suffix=".tmp", prefix=os.path.basename(CACHE_PATH) + ".",
+                                         dir=os.path.dirname(CACHE_PATH))
+    try:
+        with os.fdopen(handle, "w") as f:
+            json.dump({"version": CACHE_VERSION, "entries": _entries}, f)
+        os.replace(temp_path, CACHE_PATH)
+    except Exception as e:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        print("[Validation] Could not write cache '{}': {}".format(CACHE_PATH, e))
+
+
+def clear():
+    global _entries
+    _entries = {}
+    _stats["hits"] = 0
+    _stats["misses"] = 0
+    if os.path.isfile(CACHE_PATH):
+        try:
+            os.remove(CACHE_PATH)
+        except Exception:
+            pass
+
+
+def stats():
+    return dict(_stats, entries=len(_load()))
+
+
+def maya_name(name):
+    # Maya reemplaza los caracteres invalidos (".", " ", etc.) al importar el FBX
+    return re.sub(r"[^A-Za-z0-9_]", "_", name)
+
+
+def _array(collection, attr, dtype, width=1):
+    data = np.empty(len(collection) * width, dtype=dtype)
+    collection.foreach_get(attr, data)
+    return data
+
+
+def object_digest(obj, profile):
+    """Content hash of everything the validation of `obj` depends on."""
+    h = hashlib.sha1("{}|{}|{}".format(CACHE_VERSION, profile, obj.name).encode("utf-8"))
+    h.update(np.array(obj.matrix_basis, dtype=np.float64).tobytes())
+    h.update(repr((obj.hide_get(), obj.hide_viewport, obj.type,
+                   obj.parent.name if obj.parent else None)).encode("utf-8"))
+    h.update(repr([(m.type, m.name, m.show_viewport) for m in obj.modifiers]).encode("utf-8"))
+    h.update(repr([s.material.name if s.material else None for s in obj.material_slots]).encode("utf-8"))
+
+    if obj.type == 'MESH':
+        mesh = obj.data
+        h.update(repr((mesh.name, mesh.users, bool(mesh.shape_keys))).encode("utf-8"))
+        h.update(_array(mesh.vertices, "co", np.float32, 3).tobytes())
+        h.update(_array(mesh.polygons, "loop_total", np.int32).tobytes())
+        h.update(_array(mesh.polygons, "material_index", np.int32).tobytes())
+        h.update(_array(mesh.loops, "vertex_index", np.int32).tobytes())
+        for layer in mesh.uv_layers:
+            h.update(layer.name.encode("utf-8"))
+            h.update(_array(layer.data, "uv", np.float32, 2).tobytes())
+    return h.hexdigest()
+
+
+def scene_key(digests):
+    h = hashlib.sha1()
+    for digest in sorted(digests):
+        h.update(digest.encode("utf-8"))
+    return "scene:" + h.hexdigest()
+
+
+def lookup(digests):
+    """
+    Splits objects into cached and pending.
+
+    :param digests: {object name: digest}
+    :return: ({object name: {check: {"passed", "message"}}}, [pending object names])
+    """
+    cached = {}
+    pending = []
+    for name, digest in digests.items():
+        result = _get(digest)
+        if result is not None:
+            cached[name] = result
+        else:
+            pending.append(name)
+    _stats["hits"] += len(cached)
+    _stats["misses"] += len(pending)
+    return cached, pending
+
+
+def lookup_scene(digests):
+    """Scene-wide results of the selection whose digests are `digests` ({object name: digest}), or None."""
+    return _get(scene_key(digests.values()))
+
+
+def store(results, digests, selection=None):
+    """
+    Stores a Maya backend result JSON per object.
+
+    :param results: Result JSON written by ma_validate_fbx for the exported objects.
+    :param digests: {object name: digest} of the exported objects.
+    :param selection: {object name: digest} of the whole selection (default: `digests`).
+                      The scene-wide results are only stored when the exported
+                      objects are the whole selection.
+    :return: ({object name: {check: result}}, {check: result} for scene-wide checks)
+    """
+    selection = digests if selection is None else selection
+    entries = _load()
+    by_maya_name = dict((maya_name(name), name) for name in digests)
+    per_object = dict((name, {}) for name in digests)
+    scene = {}
+
+    for check, info in results.items():
+        units = info.get("units")
+        if units is None:
+            scene[check] = {"passed": info.get("passed", False), "message": info.get("message", "")}
+            continue
+        for unit, unit_result in units.items():
+            parts = unit.split("|")
+            # Los checks por mesh reportan el shape; el objeto de Blender es su transform
+            transform = parts[-2] if info.get("scope") == "mesh" and len(parts) > 1 else parts[-1]
+            name = by_maya_name.get(transform.split(":")[-1])
+            if name is None:
+                continue
+            previous = per_object[name].get(check)
+            if previous and not previous["passed"]:
+                continue
+            per_object[name][check] = unit_result
+
+    now = time.time()
+    for name, digest in digests.items():
+        entries[digest] = [now, per_object[name]]
+    if set(digests) == set(selection):
+        entries[scene_key(selection.values())] = [now, scene]
+    return per_object, scene
+
+
+def merge(per_object, scene):
+    """
+    Merges per-object and scene-wide results into the {check: {"passed", "message"}}
+    shape the panel displays.
+    """
+    merged = {}
+    checks = set(scene)
+    for results in per_object.values():
+        checks.update(results)
+
+    for check in sorted(checks):
+        if check in scene:
+            merged[check] = dict(scene[check])
+            continue
+        entries = [(name, results[check]) for name, results in sorted(per_object.items()) if check in results]
+        failing = [(name, r) for name, r in entries if not r.get("passed", False)]
+        if failing:
+            message = "; ".join("{}: {}".format(name, r.get("message", "")) for name, r in failing)
+            merged[check] = {"passed": False, "message": message}
+        else:
+            messages = sorted(set(r.get("message", "") for name, r in entries))
+            if len(messages) == 1:
+                message = messages[0]
+            else:
+                message = "; ".join("{}: {}".format(name, r.get("message", "")) for name, r in entries)
+            merged[check] = {"passed": True, "message": message}
+    return merged
@@ -1,137 +1,266 @@
 # -*- coding: utf-8 -*-
 import maya.cmds as mc
 import os
-import traceback
+import time
+from collections import OrderedDict
 
-def capture_all_uv_sets(obj, output_folder, resolution):
+import ma_uv_analysis
+import ma_uv_raster
+
+
+# Sufijos de los archivos de salida de cada UV set ('<obj>_<uv set>[_<udim>]<sufijo>')
+ENHANCED_SUFFIX = "_enhanced_uv.png"
+COMPOSED_SUFFIX = "_composed.jpg"
+# Previews del render mejorado: '<stem>_enhanced_uv_<tamano>.png'
+PREVIEW_SUFFIX = "_enhanced_uv_{}.png"
+
+
+def uv_file_stem(obj, uv_set):
+    """Base file name of the images of one UV set: '<obj>_<uv set>' without path/namespace separators."""
+    safe_obj_name = obj.replace("|", "_").replace(":", "_")
+    safe_uv_set_name = uv_set.replace(":", "_").replace(" ", "_")
+    return "{}_{}".format(safe_obj_name, safe_uv_set_name)
+
+
+class UVSetDescriptor(object):
+    """
+    One UV set of an object (the same set on every shape of a transform),
+    described once and passed to every later stage: render, composition,
+    manifest and file names.
+    """
+
+    def __init__(self, obj, name, uv_sets, shapes=None):
+        self.obj = obj
+        self.name = name
+        self.uv_sets = uv_sets                                  # [UVSetData], uno por shape
+        self.shapes = shapes                                    # shape de cada UVSetData (None si no vienen de la escena)
+        self.uv_count = sum(len(data.us) for data in uv_sets)
+        self.shell_count = sum(data.shell_count for data in uv_sets)
+        self.bounds = _uv_bounds(uv_sets)                       # (u min, v min, u max, v max) o None sin UVs
+        self.tiles = ma_uv_raster.uv_tiles(uv_sets)             # tiles (u, v) con caras, en orden UDIM
+        self.stem = uv_file_stem(obj, name)
+
+    @property
+    def multi_tile(self):
+        # Solo los UV sets fuera del tile 0-1 llevan el UDIM en el nombre de archivo
+        return self.tiles != [(0, 0)]
+
+    def path(self, output_folder, suffix, tile=(0, 0)):
+        """
+        Output file '<stem><suffix>' in output_folder (e.g. suffix
+        '_enhanced_uv.png'), '<stem>_<udim><suffix>' for the tiles of a
+        UV set that uses more than the 0-1 tile.
+        """
+        stem = self.stem
+        if self.multi_tile:
+            stem = "{}_{}".format(stem, ma_uv_raster.tile_label(tile))
+        return os.path.normpath(os.path.join(output_folder, stem + suffix))
+
+    def info(self):
+        """Descriptor fields for reports and manifests (no UV arrays)."""
+        return {"uv_set": self.name, "uv_count": self.uv_count, "shell_count": self.shell_count,
+                "bounds": [round(value, 6) for value in self.bounds] if self.bounds else None,
+                "tiles": [ma_uv_raster.tile_label(tile) for tile in self.tiles]}
+
+
+def _uv_bounds(uv_sets):
+    us = [data.us for data in uv_sets if len(data.us)]
+    vs = [data.vs for data in uv_sets if len(data.vs)]
+    if not us:
+        return None
+    return (min(min(values) for values in us), min(min(values) for values in vs),
+            max(max(values) for values in us), max(max(values) for values in vs))
+
+
+def describe_uv_sets(obj, groups):
     """
-    Captures all UV sets of a given object and saves each as a PNG image.
+    Descriptors of UV sets that were read elsewhere (e.g. a .wmesh record).
 
-    :param obj: The transform node of the object.
-    :param output_folder: Folder where the UV snapshots will be saved.
-    :param resolution: Resolution for the UV snapshot (square).
+    :param obj: Name used for the file names (transform of the object).
+    :param groups: OrderedDict {uv set: [UVSetData]} (see ma_uv_raster.group_by_name).
+    :return: list of UVSetDescriptor, in UV set order.
     """
-    # Get all UV sets for the object
+    return [UVSetDescriptor(obj, name, uv_sets) for name, uv_sets in groups.items()]
+
+
+def discover_uv_sets(obj):
+    """
+    Single discovery pass over the UV sets of a scene object: one bulk read
+    per shape and UV set (ma_uv_analysis.read_uv_sets), grouped by UV set
+    name across the mesh shapes of the transform. Later stages use the
+    descriptors and never query the UV sets again.
+
+    :return: list of UVSetDescriptor, in first-seen order (empty if the object has no UVs).
+    """
+    shapes = mc.listRelatives(obj, shapes=True, type="mesh", fullPath=True, noIntermediate=True) or []
+    groups = OrderedDict()
+    for shape in shapes:
+        for data in ma_uv_analysis.read_uv_sets(shape):
+            uv_sets, set_shapes = groups.setdefault(data.name, ([], []))
+            uv_sets.append(data)
+            set_shapes.append(shape)
+    return [UVSetDescriptor(obj, name, uv_sets, set_shapes) for name, (uv_sets, set_shapes) in groups.items()]
+
+
+# Atributos de color que se revisan en el shader, en orden de preferencia
+TEXTURE_COLOR_ATTRS = ['baseColor', 'color', 'TEX_color_map', 'diffuseColor', 'diffuse_color']
+
+
+def _print(message):
+    print(message)
+
+
+def _texture_path(file_node, log):
+    # Ruta del file node expandida al workspace; None si el archivo no existe
     try:
-        # Verificar si el objeto existe en la escena standalone
-        if not mc.objExists(obj):
-             print("[ERROR] Object '{}' does not exist in the current scene.".format(obj))
-             return # Salir si el objeto no existe
-             
-        uv_sets = mc.polyUVSet(obj, query=True, allUVSets=True)
-        
+        texture_file = mc.getAttr(file_node + ".fileTextureName")
     except Exception as e:
-         print("[ERROR] Could not query UV sets for object: {}".format(obj))
-         print("Specific Error: {}".format(str(e)))
-         uv_sets = [] # Asignar lista vacía para evitar error posterior
-
-    if not uv_sets:
-        # Este mensaje es más preciso ahora que comprobamos objExists primero
-        print("[WARNING] No UV sets found on existing object: {}".format(obj)) 
-        return
-
-    # Crear la carpeta de salida si no existe
-    if not os.path.exists(output_folder):
-         try:
-              os.makedirs(output_folder)
-              print("[INFO] Created output directory: {}".format(output_folder))
-         except Exception as e:
-              print("[ERROR] Could not create output directory '{}': {}".format(output_folder, e))
-              return 
-
-    print("[INFO] Processing UV sets for object: {}".format(obj)) 
-
-    for uv_set in uv_sets:
-        # Build output file path
-        # Usar replace para manejar barras y dos puntos (namespaces)
-        safe_obj_name = obj.replace("|", "_").replace(":", "_") 
-        # Asegurarse de que el nombre del UV set también sea seguro para un nombre de archivo
-        safe_uv_set_name = uv_set.replace(":", "_").replace(" ", "_") # Añadir reemplazo de espacios por si acaso
-        filename = "{}_{}_uv.png".format(safe_obj_name, safe_uv_set_name)
-        output_path = os.path.join(output_folder, filename)
-        output_path = os.path.normpath(output_path)
-
-        print("[DEBUG] Attempting UV snapshot:")
-        print("[DEBUG]   Object: {}".format(obj))
-        print("[DEBUG]   UV Set: {}".format(uv_set))
-        print("[DEBUG]   Output Path: {}".format(output_path))
-        print("[DEBUG]   Resolution: {}".format(resolution))
-        
-        # Verificar si el UV set realmente existe
-        try:
-            current_sets = mc.polyUVSet(obj, q=True, auv=True) or []
-            if uv_set not in current_sets:
-                 print("[ERROR] UV set '{}' no longer exists on object '{}' before snapshot.".format(uv_set, obj))
-                 continue 
-            print("[DEBUG]   UV Set Exists Check: OK")
-        except Exception as e_verify:
-            print("[WARNING] Could not re-verify UV set existence for '{}': {}".format(uv_set, e_verify))
-
-        # Set the current UV set (opcional, puede ayudar)
-        try:
-            mc.polyUVSet(obj, currentUVSet=True, uvSet=uv_set)
-            print("[DEBUG]   Set current UV set to: {}".format(uv_set))
-        except Exception as e_set:
-            print("[WARNING] Could not set UV set '{}' as current: {}".format(uv_set, e_set))
-        
-        # Capture the UV snapshot
-        try:
-            # --- *** SOLUCIÓN: Seleccionar el objeto ANTES de llamar a uvSnapshot *** ---
-            # Primero, verificar si el objeto todavía existe antes de intentar seleccionarlo
-            if not mc.objExists(obj):
-                print("[ERROR] Object '{}' disappeared before selection for snapshot.".format(obj))
-                continue # Saltar al siguiente UV set
-
-            mc.select(obj, replace=True) 
-            print("[DEBUG]   Selected object: {}".format(obj))
-            
-            mc.uvSnapshot(
-                o=True,              
-                name=output_path,    
-                xr=resolution,       
-                yr=resolution,       
-                aa=True,             
-                ff="png",            
-                uvSetName=uv_set,    
-                redColor=0,          # Verde
-                greenColor=255,      # Verde
-                blueColor=0          # Verde
-            )
-            
-            # Verificar si el archivo realmente se creó
-            if os.path.exists(output_path) and os.path.getsize(output_path) > 0: 
-                 print("[INFO] UV snapshot saved: {}".format(output_path))
-            else:
-                 # Intentar obtener más información si falló
-                 error_info = "Unknown reason."
-                 if not os.path.exists(output_path):
-                      error_info = "Output file was NOT found."
-                 elif os.path.getsize(output_path) == 0:
-                      error_info = "Output file has size 0."
-                 
-                 # Verificar permisos de escritura en la carpeta
-                 can_write = os.access(output_folder, os.W_OK)
-                 print("[ERROR] mc.uvSnapshot command ran for '{}' but failed. {} Can write to folder: {}".format(output_path, error_info, can_write))
-                 print("[ERROR] Possible issues: File permissions, invalid path/filename chars, disk full, internal Maya error.")
-
-        except Exception as e: 
-            print("\n" + "="*20 + " SNAPSHOT ERROR " + "="*20)
-            print("[ERROR] Failed to capture UV set '{}' for object '{}'".format(uv_set, obj))
-            print("        Attempted Path: {}".format(output_path))
-            print("        Specific Maya Error: {}".format(str(e))) 
-            print("        Traceback:")
-            print(traceback.format_exc()) 
-            print("="*54 + "\n")
-            continue # Continuar con el siguiente UV set si falla
-
-    # Deseleccionar todo al final del procesamiento del objeto (buena práctica)
+        log("[WARNING] Could not get 'fileTextureName' from node '{}': {}".format(file_node, e))
+        return None
     try:
-        mc.select(clear=True)
-        print("[DEBUG] Cleared selection after processing object.")
-    except Exception as e_sel:
-         print("[WARNING] Could not clear selection: {}".format(e_sel))
-         
-    # Mover este print aquí tiene más sentido que fuera del bucle de objetos
-    print("[INFO] Finished processing UV sets for object: {}".format(obj)) 
+        expanded_path = mc.workspace(expandName=texture_file)
+        if expanded_path: texture_file = expanded_path
+    except Exception as we:
+        log("[DEBUG] Could not expand workspace path for '{}': {}".format(texture_file, we))
+    texture_file_norm = os.path.normpath(texture_file) if texture_file else None
+    if texture_file_norm and os.path.isfile(texture_file_norm):
+        log("[DEBUG] Texture file path validated: {}".format(texture_file_norm))
+        return texture_file_norm
+    log("[WARNING] File path '{}' from node '{}' (normalized: '{}') does not exist or path is empty.".format(
+        texture_file, file_node, texture_file_norm))
+    return None
+
+
+class TextureIndex(object):
+    """
+    Scene-level index of color textures: every shading group, surface shader
+    and file node of the scene is walked once, and every texture path is
+    expanded to the workspace and checked on disk once, however many meshes
+    share them. Lookups by mesh transform are then dictionary reads.
+
+    The texture of a shader is the file node connected to its color attribute
+    (TEXTURE_COLOR_ATTRS), or any file node feeding it as a fallback. The
+    index is a snapshot: build a new one when the scene changes.
+    """
+
+    def __init__(self, log=None):
+        log = log or _print
+        start = time.time()
+        self.file_paths = {}                # file node -> ruta validada o None
+        self.shader_textures = {}           # shader -> ruta o None
+        self.sg_textures = OrderedDict()    # shadingEngine -> ruta o None
+        self.mesh_sgs = {}                  # transform (ruta larga) -> [shadingEngine]
+        self.textures = {}                  # mesh pedido -> ruta o None
+        for sg in mc.ls(type='shadingEngine') or []:
+            self.sg_textures[sg] = self._sg_texture(sg, log)
+            # Miembros del set (objeto entero o caras): sus shapes
+            members = mc.listConnections(sg + ".dagSetMembers", source=True, destination=False, shapes=True)
+            for shape in (mc.ls(members, long=True, type='mesh') or []) if members else []:
+                sgs = self.mesh_sgs.setdefault(shape.rsplit("|", 1)[0], [])
+                if sg not in sgs:
+                    sgs.append(sg)
+        log("[INFO] Texture index: {} shading group(s), {} with a texture, {} mesh(es) ({:.2f}s).".format(
+            len(self.sg_textures), sum(1 for path in self.sg_textures.values() if path),
+            len(self.mesh_sgs), time.time() - start))
+
+    def find(self, mesh, log=None):
+        """
+        Color texture of a mesh transform (memoized).
+
+        :return: Normalized path of an existing texture file, or None.
+        """
+        if mesh not in self.textures:
+            self.textures[mesh] = self._find(mesh, log or _print)
+        return self.textures[mesh]
+
+    def _find(self, mesh, log):
+        sgs = self.mesh_sgs.get(mesh)
+        if sgs is None:
+            # Nombre corto, instancia o mesh sin shading group en el indice: sus shapes
+            shapes = mc.listRelatives(mesh, shapes=True, fullPath=True, type='mesh')
+            if not shapes:
+                log("[WARNING] No mesh shape found for transform: {}".format(mesh))
+                return None
+            sgs = []
+            for shape in shapes:
+                sgs.extend(mc.listConnections(shape, type='shadingEngine') or [])
+        for sg in sgs:
+            if sg not in self.sg_textures:
+                self.sg_textures[sg] = self._sg_texture(sg, log)
+            if self.sg_textures[sg]:
+                return self.sg_textures[sg]
+        log("[INFO] No validated texture file path found for mesh: {}".format(mesh))
+        return None
+
+    def _sg_texture(self, sg, log):
+        shader_connections = mc.listConnections(sg + ".surfaceShader", source=True, destination=False) or []
+        if not shader_connections:
+            log("[INFO] No surface shader connected to SG: {}".format(sg))
+            return None
+        shader = shader_connections[0]
+        if shader not in self.shader_textures:
+            self.shader_textures[shader] = self._shader_texture(shader, log)
+        return self.shader_textures[shader]
+
+    def _file_path(self, file_node, log):
+        if file_node not in self.file_paths:
+            self.file_paths[file_node] = _texture_path(file_node, log)
+        return self.file_paths[file_node]
+
+    def _shader_texture(self, shader, log):
+        log("[DEBUG] Checking shader: {}".format(shader))
+        for attr in TEXTURE_COLOR_ATTRS:
+            if not mc.attributeQuery(attr, node=shader, exists=True):
+                continue
+            connection = "{}.{}".format(shader, attr)
+            if not mc.connectionInfo(connection, isDestination=True):
+                continue
+            connected_nodes = mc.listConnections(connection, s=True, d=False, type='file')
+            if not connected_nodes:
+                continue
+            if 'StingrayPBS' in mc.nodeType(shader, inherited=True) and attr == 'TEX_color_map':
+                try:
+                    if not mc.getAttr(shader + '.use_color_map'):
+                        log("[DEBUG] Found connection to TEX_color_map on '{}' but use_color_map is OFF.".format(shader))
+                        continue
+                except Exception as e:
+                    log("[DEBUG] Could not check use_color_map for shader '{}': {}".format(shader, e))
+            log("[DEBUG] Found file node '{}' connected to attribute '{}' on shader '{}'".format(connected_nodes[0], attr, shader))
+            return self._file_path(connected_nodes[0], log)
+        all_file_nodes = mc.listConnections(shader, type='file', source=True, destination=False) or []
+        if all_file_nodes:
+            log("[DEBUG] Trying fallback: Found file node '{}' via general search on shader '{}'.".format(all_file_nodes[0], shader))
+            return self._file_path(all_file_nodes[0], log)
+        return None
+
+
+_texture_index = None
+
+
+def texture_index(log=None):
+    """Texture index of the current scene, built on first use (see reset_texture_index)."""
+    global _texture_index
+    if _texture_index is None:
+        _texture_index = TextureIndex(log)
+    return _texture_index
+
+
+def reset_texture_index():
+    """Drops the texture index of the session: call it when the scene changes (new file, edited shaders)."""
+    global _texture_index
+    _texture_index = None
+
+
+def find_texture(mesh, log=None):
+    """
+    Color texture of a mesh from the scene texture index (TextureIndex),
+    which is built on the first call and reused by every later one.
+
+    :param mesh: Transform of the mesh.
+    :param log: Callable receiving the log lines (printed by default).
+    :return: Normalized path of an existing texture file, or None.
+    """
+    return texture_index(log).find(mesh, log)
+
 
 # No debe haber código ejecutable aquí fuera de las definiciones de funciones/clases
\ No newline at end of file
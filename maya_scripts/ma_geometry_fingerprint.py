@@ -0,0 +1,182 @@
+# -*- coding: utf-8 -*-
+# ma_geometry_fingerprint.py
+# Huellas de geometria para encontrar meshes duplicados que deberian ser instancias.
+#
+# Cada mesh se resume en dos hashes sobre sus arrays planos (los mismos del
+# snapshot del profiler):
+#   topology -> vertices por cara + indices
+#   exact    -> topologia + puntos en espacio objeto cuantizados (instanciable tal cual)
+# mas su forma para los duplicados "similares" (igual salvo traslacion, rotacion o
+# escala uniforme): distancia normalizada de cada vertice al centroide y orientacion
+# de cada cara respecto del centroide. La forma se compara con tolerancia entre meshes
+# de la misma topologia (redondearla a un hash separa copias que caen a los dos lados
+# de un redondeo); una copia espejada invierte las orientaciones y no coincide.
+
+import math
+import hashlib
+from array import array
+from collections import OrderedDict
+
+# Cuantizacion de los puntos en espacio objeto para el hash exacto (unidades de escena)
+POINT_PRECISION = 1e-4
+
+# Diferencia maxima de distancias normalizadas (0-1) y orientaciones (-1 a 1) entre meshes "similares"
+SHAPE_TOLERANCE = 1e-3
+
+
+class Fingerprint(object):
+    """Hashes and size of one mesh geometry."""
+
+    def __init__(self, topology, exact, radii, orientations, vertices, faces, face_vertices, scale):
+        self.topology = topology
+        self.exact = exact
+        self.radii = radii                  # distancia de cada vertice al centroide / scale
+        self.orientations = orientations    # ver face_orientations
+        self.vertices = vertices
+        self.faces = faces
+        self.face_vertices = face_vertices
+        self.scale = scale   # radio maximo desde el centroide
+
+    @property
+    def bytes(self):
+        # Estimacion de lo que ocupa la geometria: puntos float32 + indices y conteos int32
+        return self.vertices * 12 + self.face_vertices * 4 + self.faces * 4
+
+
+def fingerprint(counts, indices, points):
+    """
+    Fingerprint of a mesh from its bulk arrays.
+
+    :param counts: array('i') vertices per face.
+    :param indices: array('i') vertex indices, face by face.
+    :param points: Flat xyz array in object space.
+    :return: Fingerprint.
+    """
+    topology = hashlib.sha1(array('i', counts))
+    topology.update(array('i', indices))
+
+    exact = topology.copy()
+    inv = 1.0 / POINT_PRECISION
+    exact.update(array('d', [round(v * inv) for v in points]))
+
+    n = len(points) // 3
+    cx = sum(points[0::3]) / n if n else 0.0
+    cy = sum(points[1::3]) / n if n else 0.0
+    cz = sum(points[2::3]) / n if n else 0.0
+    radii = [math.sqrt((points[i] - cx) ** 2 + (points[i + 1] - cy) ** 2 + (points[i + 2] - cz) ** 2)
+             for i in range(0, n * 3, 3)]
+    scale = max(radii) if n else 0.0
+    # La distancia al centroide por vertice no cambia con traslacion ni rotacion; se normaliza la escala
+    inv = 1.0 / scale if scale > 0.0 else 0.0
+    return Fingerprint(topology.hexdigest(), exact.hexdigest(), array('f', [r * inv for r in radii]),
+                       face_orientations(counts, indices, points, (cx, cy, cz)),
+                       n, len(counts), len(indices), scale)
+
+
+def face_orientations(counts, indices, points, center):
+    """
+    Volume each face spans with `center` (fan triangles summed) over the sum
+    of |a| |b x c| of those triangles: a value in [-1, 1] unchanged by
+    translation, rotation and uniform scale, negated by a mirror, and near 0
+    for faces flat against the center.
+
+    :return: array('f') with one value per face.
+    """
+    cx, cy, cz = center
+    values = array('f')
+    offset = 0
+    for c in counts:
+        face = [(points[3 * i] - cx, points[3 * i + 1] - cy, points[3 * i + 2] - cz)
+                for i in indices[offset:offset + c]]
+        offset += c
+        volume = 0.0
+        norm = 0.0
+        ax, ay, az = face[0] if face else (0.0, 0.0, 0.0)
+        length = math.sqrt(ax * ax + ay * ay + az * az)
+        for k in range(1, c - 1):
+            bx, by, bz = face[k]
+            qx, qy, qz = face[k + 1]
+            nx, ny, nz = by * qz - bz * qy, bz * qx - bx * qz, bx * qy - by * qx
+            volume += ax * nx + ay * ny + az * nz
+            norm += length * math.sqrt(nx * nx + ny * ny + nz * nz)
+        values.append(volume / norm if norm > 0.0 else 0.0)
+    return values
+
+
+def same_shape(first, second, tolerance=SHAPE_TOLERANCE):
+    """
+    True when two fingerprints have the same topology and their normalized
+    vertex distances and face orientations all match within `tolerance`
+    (same shape up to translation, rotation or uniform scale, not mirrored).
+    """
+    if first.topology != second.topology:
+        return False
+    return (all(abs(a - b) <= tolerance for a, b in zip(first.radii, second.radii))
+            and all(abs(a - b) <= tolerance for a, b in zip(first.orientations, second.orientations)))
+
+
+def group_duplicates(fingerprints, similar=True):
+    """
+    Groups meshes with the same geometry.
+
+    :param fingerprints: {mesh: Fingerprint}
+    :param similar: Also group meshes that only match up to translation,
+                    rotation or uniform scale of their points (mirrored
+                    copies are not similar: they need a negative scale).
+    :return: list of {"kind": "exact"|"similar", "meshes": [...], "vertices",
+             "faces", "bytes", "savings"}, biggest savings first. "similar"
+             groups need a transform per copy to become instances. The first
+             mesh of each group is the one to keep.
+    """
+    # Candidatos por hash (topologia para "similar"); dentro, cada mesh se une al primer grupo de su forma
+    by_hash = OrderedDict()
+    for mesh, fp in fingerprints.items():
+        candidates = by_hash.setdefault(fp.topology if similar else fp.exact, [])
+        group = next((group for group in candidates
+                      if not similar or same_shape(fingerprints[group[0]], fp)), None)
+        if group is None:
+            candidates.append([mesh])
+        else:
+            group.append(mesh)
+
+    groups = []
+    for meshes in (meshes for candidates in by_hash.values() for meshes in candidates):
+        if len(meshes) < 2:
+            continue
+        fp = fingerprints[meshes[0]]
+        exact = all(fingerprints[m].exact == fp.exact for m in meshes)
+        groups.append({
+            "kind": "exact" if exact else "similar",
+            "meshes": meshes,
+            "vertices": fp.vertices,
+            "faces": fp.faces,
+            "bytes": fp.bytes,
+            "savings": fp.bytes * (len(meshes) - 1),
+        })
+    groups.sort(key=lambda g: -g["savings"])
+    return groups
+
+
+def format_bytes(size):
+    for unit in ("B", "KB", "MB"):
+        if size < 1024.0:
+            return "{:.1f} {}".format(size, unit)
+        size /= 1024.0
+    return "{:.1f} GB".format(size)
+
+
+def duplicate_report(fingerprints, similar=True):
+    """
+    Summary of duplicated geometry in a scene or asset library.
+
+    :param fingerprints: {mesh: Fingerprint}
+    :return: dict with "groups" (see group_duplicates), "duplicates" (meshes
+             that could be instances), "total_bytes" and "savings".
+    """
+    groups = group_duplicates(fingerprints, similar)
+    return {
+        "groups": groups,
+        "duplicates": sum(len(g["meshes"]) - 1 for g in groups),
+        "total_bytes": sum(fp.bytes for fp in fingerprints.values()),
+        "savings": sum(g["savings"] for g in groups),
+    }
@@ -1,188 +1,60 @@
 # -*- coding: utf-8 -*-
-import subprocess
 import os
-import uuid 
-import tempfile
+import time
 import traceback # Import traceback for detailed error logging
 
-# Asumiendo que convert.exe está en el mismo directorio que composite.exe
-IMAGEMAGICK_DIR = r"C:\Telltale\ArtData\Tools\Maya\Apps\ImageMagick" 
-IMAGEMAGICK_CONVERT_EXE = os.path.join(IMAGEMAGICK_DIR, "convert.exe")
-IMAGEMAGICK_COMPOSITE_EXE = os.path.join(IMAGEMAGICK_DIR, "composite.exe")
+# Operaciones de imagen en memoria (antes convert.exe / composite.exe con archivos temporales)
+import ma_image_ops as image_ops
+# Texturas redimensionadas compartidas entre UV sets y meshes de la misma corrida
+import ma_texture_cache as texture_cache
 
-# Parámetros para la visualización (se usan en enhance_uv_snapshot)
-LINE_DILATION_RADIUS = "1.5" 
-SHELL_FILL_COLOR = "rgba(128,128,128,0.4)" 
-
-def enhance_uv_snapshot(input_uv_png_path, output_enhanced_png_path):
-    """
-    Enhances a basic UV snapshot PNG with thicker lines and filled shells using ImageMagick.
-
-    :param input_uv_png_path: Path to the original thin-line UV PNG file.
-    :param output_enhanced_png_path: Path where the enhanced PNG will be saved.
-    :return: True if successful, False otherwise.
+def compose_uv_image(enhanced_uv_png_path, texture_image_path, output_composed_jpg_path, uv_width, uv_height):
     """
-    if not os.path.isfile(IMAGEMAGICK_CONVERT_EXE):
-        print("[ERROR] ImageMagick convert.exe not found at: {}".format(IMAGEMAGICK_CONVERT_EXE))
-        return False
-    if not os.path.isfile(input_uv_png_path):
-        print("[ERROR] Input UV snapshot image not found: {}".format(input_uv_png_path))
-        return False
-
-    # Generar nombres únicos para archivos temporales
-    temp_id = uuid.uuid4().hex
-    temp_dir = tempfile.gettempdir()
-    
-    # Archivos intermedios
-    mask_path = os.path.join(temp_dir, "mask_{}.png".format(temp_id))
-    inverted_mask_path = os.path.join(temp_dir, "inv_mask_{}.png".format(temp_id))
-    filled_outside_mask_path = os.path.join(temp_dir, "fill_mask_{}.png".format(temp_id))
-    shell_fill_layer_path = os.path.join(temp_dir, "shells_{}.png".format(temp_id))
-    thick_line_layer_path = os.path.join(temp_dir, "lines_{}.png".format(temp_id))
-
-    temp_files = [mask_path, inverted_mask_path, filled_outside_mask_path, 
-                  shell_fill_layer_path, thick_line_layer_path]
-
-    try:
-        print("[INFO] Starting UV enhancement for: {}".format(input_uv_png_path))
-        print("[INFO]   Outputting enhanced UV to: {}".format(output_enhanced_png_path))
-
-        # --- Paso 1: Crear capa de relleno de Shells ---
-        cmd_mask = [IMAGEMAGICK_CONVERT_EXE, input_uv_png_path, "-alpha", "extract", mask_path]
-        subprocess.check_call(cmd_mask)
-        cmd_invert = [IMAGEMAGICK_CONVERT_EXE, mask_path, "-negate", inverted_mask_path]
-        subprocess.check_call(cmd_invert)
-        cmd_fill_outside = [
-            IMAGEMAGICK_CONVERT_EXE, inverted_mask_path,
-            "-fill", "black", "-bordercolor", "white", "-border", "1x1", 
-            "-draw", "color 0,0 floodfill", 
-            "-shave", "1x1", 
-            filled_outside_mask_path
-        ]
-        subprocess.check_call(cmd_fill_outside)
-        cmd_shell_layer = [
-            IMAGEMAGICK_CONVERT_EXE, filled_outside_mask_path,
-            "-fill", SHELL_FILL_COLOR, "-opaque", "white", 
-            "-fill", "transparent", "-opaque", "black",    
-            shell_fill_layer_path
-        ]
-        subprocess.check_call(cmd_shell_layer)
-        # print("[DEBUG] Shell fill layer created: {}".format(shell_fill_layer_path)) # Optional debug
-
-        # --- Paso 2: Crear capa de líneas gruesas ---
-        cmd_thicken = [
-            IMAGEMAGICK_CONVERT_EXE, input_uv_png_path,
-            "-morphology", "Dilate", "Disk:{}".format(LINE_DILATION_RADIUS), 
-            thick_line_layer_path
-        ]
-        subprocess.check_call(cmd_thicken)
-        # print("[DEBUG] Thick line layer created: {}".format(thick_line_layer_path)) # Optional debug
-
-        # --- Paso 3: Combinar Shells y Líneas Gruesas (guardar como salida final) ---
-        cmd_combine_uv = [
-            IMAGEMAGICK_CONVERT_EXE, shell_fill_layer_path, thick_line_layer_path,
-            "-compose", "over", 
-            "-composite",
-            output_enhanced_png_path # Guardar directamente en la ruta de salida deseada
-        ]
-        subprocess.check_call(cmd_combine_uv)
-        
-        # Verificar que el archivo se creó
-        if os.path.exists(output_enhanced_png_path):
-             print("[SUCCESS] Enhanced UV image saved: {}".format(output_enhanced_png_path))
-             return True
-        else:
-             print("[ERROR] Enhancement command ran but output file was not created: {}".format(output_enhanced_png_path))
-             return False
+    Composes an enhanced UV PNG (with transparency) over a texture and saves
+    the result as a JPEG. Hands back the composed image that was written
+    (e.g. for contact sheet thumbnails).
 
-    except Exception as e:
-        print("\n" + "="*20 + " UV ENHANCEMENT ERROR " + "="*20)
-        print("[ERROR] Failed during ImageMagick UV enhancement.")
-        print("        Input UV: {}".format(input_uv_png_path))
-        print("        Output: {}".format(output_enhanced_png_path))
-        print("        Error: {}".format(str(e)))
-        print("        Traceback:")
-        print(traceback.format_exc())
-        print("="*60 + "\n")
-        return False
-
-    finally:
-        # Limpieza de archivos temporales de mejora
-        # print("[DEBUG] Cleaning up enhancement temporary files...")
-        for temp_file in temp_files:
-            if os.path.exists(temp_file):
-                try:
-                    os.remove(temp_file)
-                except Exception as e:
-                    print("[WARNING] Failed to remove enhancement temporary file '{}': {}".format(temp_file, e))
-
-def compose_uv_over_texture(enhanced_uv_png_path, texture_image_path, output_composed_jpg_path, uv_width, uv_height):
-    """
-    Composes an ENHANCED UV snapshot (PNG with transparency) over a texture 
-    and saves the result as a JPEG.
-
-    :param enhanced_uv_png_path: Path to the ENHANCED UV PNG file (thick lines, shells).
+    :param enhanced_uv_png_path: Path to the enhanced UV PNG file (thick lines, shells).
     :param texture_image_path: Path to the texture image.
     :param output_composed_jpg_path: Path to the final composed output JPEG.
-    :param uv_width: Width of the UV snapshot (used for resizing texture).
-    :param uv_height: Height of the UV snapshot (used for resizing texture).
-    :return: True if successful, False otherwise.
+    :param uv_width: Width of the UV image (used for resizing texture).
+    :param uv_height: Height of the UV image (used for resizing texture).
+    :return: The composed ma_image_ops.Image if successful, None otherwise.
     """
-    if not os.path.isfile(IMAGEMAGICK_CONVERT_EXE):
-        print("[ERROR] ImageMagick convert.exe not found at: {}".format(IMAGEMAGICK_CONVERT_EXE))
-        return False
-    if not os.path.isfile(IMAGEMAGICK_COMPOSITE_EXE):
-        print("[ERROR] ImageMagick composite.exe not found at: {}".format(IMAGEMAGICK_COMPOSITE_EXE))
-        return False
-        
     if not os.path.isfile(enhanced_uv_png_path):
         print("[ERROR] Input ENHANCED UV image not found: {}".format(enhanced_uv_png_path))
-        return False
+        return None
     if not os.path.isfile(texture_image_path):
         print("[ERROR] Input texture image not found: {}".format(texture_image_path))
-        return False
+        return None
 
-    # Generar nombre único para la textura redimensionada
-    temp_id = uuid.uuid4().hex
-    temp_dir = tempfile.gettempdir()
-    resized_texture_path = os.path.join(temp_dir, "resized_texture_{}.png".format(temp_id))
-    
     try:
-        # --- Paso 1: Redimensionar la Textura Base ---
+        start = time.time()
+        uv_image = image_ops.read_image(enhanced_uv_png_path)
+        if (uv_image.width, uv_image.height) != (uv_width, uv_height):
+            print("[WARNING] Enhanced UV is {}x{}, resizing to {}x{}.".format(
+                uv_image.width, uv_image.height, uv_width, uv_height))
+            uv_image = image_ops.resize(uv_image, uv_width, uv_height)
+
+        # --- Paso 1: Textura Base redimensionada (sin alpha), desde la cache ---
         print("[INFO] Resizing base texture for composition...")
-        resize_cmd = [
-            IMAGEMAGICK_CONVERT_EXE, 
-            texture_image_path,
-            "-resize", "{}x{}!".format(uv_width, uv_height), 
-            "-alpha", "off", 
-            resized_texture_path
-        ]
-        subprocess.check_call(resize_cmd)
-        print("[INFO] Resized texture saved: {}".format(resized_texture_path))
+        texture = texture_cache.resized_texture(texture_image_path, uv_width, uv_height)
 
         # --- Paso 2: Componer UV Mejorado sobre Textura Redimensionada ---
         print("[INFO] Compositing enhanced UV over texture...")
-        command = [
-            IMAGEMAGICK_COMPOSITE_EXE,
-            "-compose", "over",      
-            "-gravity", "center",    
-            enhanced_uv_png_path,        # ENHANCED UV PNG
-            resized_texture_path,        # Resized texture
-            "-quality", "95",       
-            output_composed_jpg_path     # Salida final JPEG
-        ]
-        subprocess.check_call(command)
+        composed = image_ops.alpha_over(uv_image, texture)
+        image_ops.write_jpeg(composed, output_composed_jpg_path)
         
         if os.path.exists(output_composed_jpg_path):
-            print("[SUCCESS] Composition successful. Saved: {}".format(output_composed_jpg_path))
-            return True
+            print("[SUCCESS] Composition successful. Saved: {} ({:.2f}s)".format(output_composed_jpg_path, time.time() - start))
+            return composed
         else:
-            print("[ERROR] Composition command ran but output file was not created: {}".format(output_composed_jpg_path))
-            return False
+            print("[ERROR] Composition ran but output file was not created: {}".format(output_composed_jpg_path))
+            return None
 
     except Exception as e:
         print("\n" + "="*20 + " IMAGE COMPOSITION ERROR " + "="*20)
-        print("[ERROR] Failed during ImageMagick composition.")
+        print("[ERROR] Failed during image composition.")
         print("        Enhanced UV: {}".format(enhanced_uv_png_path))
         print("        Texture: {}".format(texture_image_path))
         print("        Output: {}".format(output_composed_jpg_path))
@@ -190,12 +62,4 @@ def compose_uv_over_texture(enhanced_uv_png_path, texture_image_path, output_com
         print("        Traceback:")
         print(traceback.format_exc())
         print("="*60 + "\n")
-        return False
-        
-    finally:
-        # Limpieza archivo temporal de textura
-        if os.path.exists(resized_texture_path):
-            try:
-                os.remove(resized_texture_path)
-            except Exception as e:
-                print("[WARNING] Failed to remove resized texture temporary file '{}': {}".format(resized_texture_path, e))
\ No newline at end of file
+        return None
\ No newline at end of file
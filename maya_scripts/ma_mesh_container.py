@@ -0,0 +1,394 @@
+# -*- coding: utf-8 -*-
+# ma_mesh_container.py
+# Contenedor binario de meshes (.wmesh) para las herramientas standalone.
+#
+# Reemplaza al FBX cuando solo hace falta geometria y UVs: un header fijo, una
+# tabla de contenido JSON y arrays little-endian alineados a 16 bytes que se
+# leen con mmap sin copiar. El lector es Python puro (no necesita Maya); el
+# escritor y load_into_scene usan la API de Maya.
+#
+# Layout (version 1):
+#   header  "<4sHHII"  magic "WMSH", version, reservado, largo del TOC, reservado
+#   TOC     JSON utf-8 {"version", "up_axis", "units", "meshes": [...]}
+#   arrays  cada array del TOC es {"type": "f"|"i", "offset": bytes, "count": elementos}
+#
+# Cada mesh del TOC tiene name, transform (nombre largo de origen), matrix
+# (16 floats, convencion de Maya), materials y arrays:
+#   points (xyz), counts, indices, normals (xyz), normal_ids (por vertice de
+#   cara), material_ids (por cara, -1 sin material) y por UV set "uv_sets":
+#   [{"name", "us", "vs", "uv_counts", "uv_ids", "shell_ids" (opcional)}]
+
+import os
+import re
+import sys
+import json
+import mmap
+import struct
+from array import array
+from collections import OrderedDict
+
+try:
+    import maya.cmds as mc
+    import maya.api.OpenMaya as om
+except ImportError:
+    # Lector sin Maya (herramientas de Python puro)
+    mc = om = None
+
+MAGIC = b"WMSH"
+VERSION = 1
+HEADER = struct.Struct("<4sHHII")
+ALIGNMENT = 16
+EXTENSION = ".wmesh"
+
+# Todos los arrays son de 4 bytes: float32 o int32
+ITEM_SIZE = 4
+
+
+class ContainerError(Exception):
+    pass
+
+
+def _pad(size):
+    return (-size) % ALIGNMENT
+
+
+def write_container(path, meshes, up_axis="y", units="cm"):
+    """
+    Writes a .wmesh file.
+
+    :param path: Destination file.
+    :param meshes: list of dicts with "name", "transform", "matrix",
+                   "materials" and "arrays" ({key: array('f'|'i')}, UV sets
+                   as "uv_sets": [{"name": ..., key: array}]).
+    :param up_axis: Up axis of the stored data.
+    :param units: Linear units of the stored data.
+    :return: Size of the file in bytes.
+    """
+    blobs = []
+    offset = [0]
+
+    def entry(values):
+        values = values if isinstance(values, array) else array('f', values)
+        if values.itemsize != ITEM_SIZE:
+            values = array('f' if values.typecode in 'fd' else 'i', values)
+        if sys.byteorder != 'little':
+            values = array(values.typecode, values)
+            values.byteswap()
+        data = values.tostring() if sys.version_info[0] < 3 else values.tobytes()
+        item = {"type": values.typecode, "offset": offset[0], "count": len(values)}
+        blobs.append(data + b"\0" * _pad(len(data)))
+        offset[0] += len(data) + _pad(len(data))
+        return item
+
+    toc_meshes = []
+    for mesh in meshes:
+        arrays = OrderedDict((key, entry(values)) for key, values in mesh["arrays"].items() if key != "uv_sets")
+        arrays["uv_sets"] = [OrderedDict([("name", uv_set["name"])] + [(key, entry(values))
+                                                                      for key, values in uv_set.items() if key != "name"])
+                             for uv_set in mesh["arrays"].get("uv_sets", [])]
+        toc_meshes.append(OrderedDict([
+            ("name", mesh["name"]),
+            ("transform", mesh.get("transform", mesh["name"])),
+            ("matrix", list(mesh.get("matrix") or [1.0, 0.0, 0.0, 0.0, 0.0, 1.0, 0.0, 0.0,
+                                                   0.0, 0.0, 1.0, 0.0, 0.0, 0.0, 0.0, 1.0])),
+            ("materials", list(mesh.get("materials", []))),
+            ("arrays", arrays),
+        ]))
+
+    toc = json.dumps({"version": VERSION, "up_axis": up_axis, "units": units, "meshes": toc_meshes}).encode("utf-8")
+    toc += b" " * _pad(HEADER.size + len(toc))
+    data_start = HEADER.size + len(toc)
+
+    # Los offsets del TOC son relativos al inicio de los datos; el lector suma data_start
+    with open(path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION, 0, len(toc), 0))
+        f.write(toc)
+        for blob in blobs:
+            f.write(blob)
+    return data_start + offset[0]
+
+
+class MeshRecord(object):
+    """One mesh of a container. Arrays are read on access."""
+
+    def __init__(self, container, info):
+        self._container = container
+        self.name = info["name"]
+        self.transform = info["transform"]
+        self.matrix = info["matrix"]
+        self.materials = info["materials"]
+        self.info = info
+
+    def array(self, key):
+        """Array stored under `key` (points, counts, indices, normals, normal_ids, material_ids), or None."""
+        item = self.info["arrays"].get(key)
+        return self._container.view(item) if item else None
+
+    @property
+    def points(self):
+        return self.array("points")
+
+    @property
+    def counts(self):
+        return self.array("counts")
+
+    @property
+    def indices(self):
+        return self.array("indices")
+
+    @property
+    def vertex_count(self):
+        return self.info["arrays"]["points"]["count"] // 3
+
+    @property
+    def face_count(self):
+        return self.info["arrays"]["counts"]["count"]
+
+    def uv_sets(self):
+        """
+        UV sets as ma_uv_analysis.UVSetData, ready for analyze_uv_set. Shell
+        ids are computed when the writer did not store them.
+        """
+        import ma_uv_analysis as uv_analysis
+
+        uv_sets = []
+        for info in self.info["arrays"]["uv_sets"]:
+            us, vs = self._container.view(info["us"]), self._container.view(info["vs"])
+            uv_counts, uv_ids = self._container.view(info["uv_counts"]), self._container.view(info["uv_ids"])
+            if "shell_ids" in info:
+                shell_ids = self._container.view(info["shell_ids"])
+                shell_count = max(shell_ids) + 1 if len(shell_ids) else 0
+            else:
+                shell_count, shell_ids = uv_analysis.uv_shells(uv_counts, uv_ids, len(us))
+            uv_sets.append(uv_analysis.UVSetData(info["name"], us, vs, uv_counts, uv_ids, shell_ids, shell_count))
+        return uv_sets
+
+
+class MeshContainer(object):
+    """
+    Reader of .wmesh files. On Python 3 the arrays are memoryviews over a
+    read-only mmap of the file (no copies); on Python 2 they are arrays read
+    from the map. Views stay valid until close().
+
+    Usage:
+        with MeshContainer(path) as container:
+            for mesh in container.meshes:
+                mesh.points, mesh.counts, mesh.indices, mesh.uv_sets()
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, "rb")
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self._file.close()
+            raise ContainerError("Empty mesh container: {}".format(path))
+        self._buffer = memoryview(self._map) if sys.version_info[0] >= 3 else None
+        self._views = []
+
+        magic, version, _, toc_size, _ = HEADER.unpack(self._map[:HEADER.size])
+        if magic != MAGIC:
+            self.close()
+            raise ContainerError("Not a mesh container: {}".format(path))
+        if version > VERSION:
+            self.close()
+            raise ContainerError("Mesh container version {} is newer than supported ({})".format(version, VERSION))
+
+        toc = json.loads(self._map[HEADER.size:HEADER.size + toc_size].decode("utf-8"))
+        self._data_start = HEADER.size + toc_size
+        self.version = version
+        self.up_axis = toc.get("up_axis", "y")
+        self.units = toc.get("units", "cm")
+        self.meshes = [MeshRecord(self, info) for info in toc["meshes"]]
+
+    def view(self, item):
+        start = self._data_start + item["offset"]
+        end = start + item["count"] * ITEM_SIZE
+        if sys.version_info[0] >= 3 and sys.byteorder == 'little':
+            view = self._buffer[start:end].cast(item["type"])
+            self._views.append(view)
+            return view
+        values = array(item["type"])
+        if sys.version_info[0] < 3:
+            values.fromstring(self._map[start:end])
+        else:
+            values.frombytes(self._map[start:end])
+        if sys.byteorder != 'little':
+            values.byteswap()
+        return values
+
+    def close(self):
+        for view in self._views:
+            view.release()
+        self._views = []
+        if self._buffer is not None:
+            self._buffer.release()
+            self._buffer = None
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def read_mesh(mesh):
+    """
+    Reads one mesh shape with the API into the dict layout of write_container.
+
+    :param mesh: Long name of the mesh shape.
+    """
+    sel = om.MSelectionList()
+    sel.add(mesh)
+    path = sel.getDagPath(0)
+    fn = om.MFnMesh(path)
+
+    points = array('f')
+    for p in fn.getPoints(om.MSpace.kObject):
+        points.extend((p.x, p.y, p.z))
+    counts, indices = fn.getVertices()
+    normals = array('f')
+    for n in fn.getNormals(om.MSpace.kObject):
+        normals.extend((n.x, n.y, n.z))
+    _, normal_ids = fn.getNormalIds()
+
+    shaders, shader_ids = fn.getConnectedShaders(path.instanceNumber())
+    materials = [om.MFnDependencyNode(s).name() for s in shaders]
+
+    uv_sets = []
+    for name in fn.getUVSetNames():
+        us, vs = fn.getUVs(name)
+        uv_counts, uv_ids = fn.getAssignedUVs(name)
+        _, shell_ids = fn.getUvShellsIds(name)
+        uv_sets.append(OrderedDict([("name", name), ("us", array('f', us)), ("vs", array('f', vs)),
+                                    ("uv_counts", array('i', uv_counts)), ("uv_ids", array('i', uv_ids)),
+                                    ("shell_ids", array('i', shell_ids))]))
+
+    transform = mesh.rsplit("|", 1)[0]
+    return {
+        "name": transform.split("|")[-1],
+        "transform": transform,
+        "matrix": mc.xform(transform, q=True, matrix=True, worldSpace=True),
+        "materials": materials,
+        "arrays": OrderedDict([
+            ("points", points),
+            ("counts", array('i', counts)),
+            ("indices", array('i', indices)),
+            ("normals", normals),
+            ("normal_ids", array('i', normal_ids)),
+            ("material_ids", array('i', shader_ids)),
+            ("uv_sets", uv_sets),
+        ]),
+    }
+
+
+def export_container(path, nodes=None):
+    """
+    Writes the meshes under `nodes` (current selection by default) to a .wmesh file.
+
+    :return: Number of meshes written.
+    """
+    nodes = nodes or mc.ls(sl=True, long=True)
+    meshes = sorted(set(mc.listRelatives(nodes, allDescendents=True, type='mesh', fullPath=True) or []))
+    meshes = [m for m in meshes if not mc.getAttr(m + ".intermediateObject")]
+    write_container(path, [read_mesh(m) for m in meshes])
+    print("[INFO] {} mesh(es) written to {}".format(len(meshes), path))
+    return len(meshes)
+
+
+def load_into_scene(path):
+    """
+    Creates the meshes of a .wmesh file in the current Maya scene (points,
+    topology, UV sets, world matrix and per-face shading groups). Much cheaper
+    than an FBX import for tools that only need geometry.
+
+    :return: Long names of the created transforms.
+    """
+    from ma_mesh_integrity import component_ranges
+
+    created = []
+    with MeshContainer(path) as container:
+        for record in container.meshes:
+            points = record.points
+            vertices = om.MPointArray([om.MPoint(points[i], points[i + 1], points[i + 2])
+                                       for i in range(0, len(points), 3)])
+            fn = om.MFnMesh()
+            transform = fn.create(vertices, list(record.counts), list(record.indices))
+            # Mismo saneado de nombres que el import FBX de Maya
+            name = re.sub(r"[^A-Za-z0-9_]", "_", record.name)
+            dag = om.MFnDagNode(transform)
+            dag.setName(name)
+            om.MFnDagNode(fn.object()).setName(name + "Shape")
+
+            for i, data in enumerate(record.info["arrays"]["uv_sets"]):
+                us, vs = container.view(data["us"]), container.view(data["vs"])
+                uv_counts, uv_ids = container.view(data["uv_counts"]), container.view(data["uv_ids"])
+                name = data["name"]
+                if i == 0:
+                    # El set por defecto se llama "map1"; se renombra al del origen
+                    default = fn.currentUVSetName()
+                    if default != name:
+                        fn.renameUVSet(default, name)
+                else:
+                    fn.createUVSet(name)
+                fn.setUVs(list(us), list(vs), name)
+                fn.assignUVs(list(uv_counts), list(uv_ids), name)
+
+            om.MFnTransform(transform).setTransformation(
+                om.MTransformationMatrix(om.MMatrix(record.matrix)))
+            node = dag.fullPathName()
+            created.append(node)
+
+            material_ids = record.array("material_ids")
+            if material_ids is not None and record.materials:
+                faces = {}
+                for face, material in enumerate(material_ids):
+                    if material >= 0:
+                        faces.setdefault(material, []).append(face)
+                for material, face_ids in faces.items():
+                    sg = record.materials[material]
+                    if not mc.objExists(sg):
+                        sg = mc.sets(renderable=True, noSurfaceShader=True, empty=True, name=sg)
+                    mc.sets(component_ranges(node, "f", face_ids), e=True, forceElement=sg)
+            else:
+                mc.sets(node, e=True, forceElement="initialShadingGroup")
+
+    print("[INFO] {} mesh(es) loaded from {}".format(len(created), os.path.basename(path)))
+    return created
+
+
+def report(path):
+    """
+    Geometry and UV report of a container without Maya: integrity offenders
+    and UV metrics per mesh, using ma_mesh_integrity and ma_uv_analysis.
+    """
+    import ma_mesh_integrity as integrity
+    import ma_uv_analysis as uv_analysis
+
+    results = OrderedDict()
+    with MeshContainer(path) as container:
+        for record in container.meshes:
+            points, counts, indices = record.points, record.counts, record.indices
+            results[record.transform] = OrderedDict([
+                ("vertices", record.vertex_count),
+                ("faces", record.face_count),
+                ("coincident_vertices", len(integrity.coincident_vertices(points, 1e-5))),
+                ("degenerate_faces", len(integrity.degenerate_faces(points, counts, indices, 1e-8))),
+                ("lamina_faces", len(integrity.lamina_faces(counts, indices))),
+                ("non_manifold_edges", len(integrity.non_manifold_edges(counts, indices)) // 2),
+                ("uv_sets", OrderedDict((data.name, uv_analysis.analyze_uv_set(data, points, counts, indices))
+                                        for data in record.uv_sets())),
+            ])
+    return results
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Usage: python ma_mesh_container.py <file{}>".format(EXTENSION))
+        sys.exit(1)
+    print(json.dumps(report(sys.argv[1]), indent=2))
@@ -0,0 +1,153 @@
+# -*- coding: utf-8 -*-
+# ma_mesh_integrity.py
+# Checks de integridad geometrica sobre arrays planos (sin queries por componente).
+#
+# Todas las funciones reciben los datos que ya estan en el snapshot del profiler:
+#   points  -> array('d') xyz plano en espacio objeto
+#   counts  -> array('i') vertices por cara
+#   indices -> array('i') indices de vertices, cara por cara
+# y devuelven un array('i') compacto con los indices de los componentes que fallan.
+
+import math
+from array import array
+
+# Tamano de celda del hash espacial, en multiplos de la tolerancia. Con celdas
+# mayores que la tolerancia casi ningun vertice necesita mirar celdas vecinas.
+CELL_FACTOR = 16
+
+
+def coincident_vertices(points, tolerance):
+    """
+    Vertices closer than `tolerance` to another vertex (unwelded seams, doubled
+    points). Uses a spatial hash grid, so the cost grows linearly with the
+    vertex count instead of quadratically.
+
+    :return: array('i') of vertex indices, sorted.
+    """
+    cell = tolerance * CELL_FACTOR
+    inv = 1.0 / cell
+    # Fraccion de celda dentro de la cual un vecino puede caer en la celda de al lado
+    edge = 1.0 / CELL_FACTOR
+    tol2 = tolerance * tolerance
+    grid = {}
+    found = set()
+
+    for i in range(len(points) // 3):
+        x, y, z = points[i * 3], points[i * 3 + 1], points[i * 3 + 2]
+        fx, fy, fz = x * inv, y * inv, z * inv
+        cx, cy, cz = int(math.floor(fx)), int(math.floor(fy)), int(math.floor(fz))
+
+        xs, ys, zs = [cx], [cy], [cz]
+        for cells, f, c in ((xs, fx, cx), (ys, fy, cy), (zs, fz, cz)):
+            if f - c < edge:
+                cells.append(c - 1)
+            elif f - c > 1.0 - edge:
+                cells.append(c + 1)
+
+        for kx in xs:
+            for ky in ys:
+                for kz in zs:
+                    for j in grid.get((kx, ky, kz), ()):
+                        dx = x - points[j * 3]
+                        dy = y - points[j * 3 + 1]
+                        dz = z - points[j * 3 + 2]
+                        if dx * dx + dy * dy + dz * dz <= tol2:
+                            found.add(i)
+                            found.add(j)
+        grid.setdefault((cx, cy, cz), []).append(i)
+
+    return array('i', sorted(found))
+
+
+def degenerate_faces(points, counts, indices, area_tolerance):
+    """
+    Faces with fewer than three distinct vertices or an area below
+    `area_tolerance` (Newell's method, valid for non-planar ngons).
+
+    :return: array('i') of face indices.
+    """
+    offenders = array('i')
+    offset = 0
+    for face, c in enumerate(counts):
+        verts = indices[offset:offset + c]
+        offset += c
+        if len(set(verts)) < 3 or polygon_area(points, verts) <= area_tolerance:
+            offenders.append(face)
+    return offenders
+
+
+def polygon_area(points, verts):
+    """Area of a polygon given by vertex indices (Newell's method, valid for non-planar ngons)."""
+    nx = ny = nz = 0.0
+    prev = verts[-1] * 3
+    px, py, pz = points[prev], points[prev + 1], points[prev + 2]
+    for v in verts:
+        v3 = v * 3
+        x, y, z = points[v3], points[v3 + 1], points[v3 + 2]
+        nx += (py - y) * (pz + z)
+        ny += (pz - z) * (px + x)
+        nz += (px - x) * (py + y)
+        px, py, pz = x, y, z
+    return 0.5 * math.sqrt(nx * nx + ny * ny + nz * nz)
+
+
+def lamina_faces(counts, indices):
+    """
+    Faces that share all their vertices with another face (lamina / duplicated
+    faces). Every face of a duplicated group is reported.
+
+    :return: array('i') of face indices.
+    """
+    seen = {}
+    offenders = set()
+    offset = 0
+    for face, c in enumerate(counts):
+        key = tuple(sorted(indices[offset:offset + c]))
+        offset += c
+        first = seen.setdefault(key, face)
+        if first != face:
+            offenders.add(first)
+            offenders.add(face)
+    return array('i', sorted(offenders))
+
+
+def non_manifold_edges(counts, indices):
+    """
+    Edges shared by more than two faces.
+
+    :return: array('i') of vertex index pairs (two entries per edge).
+    """
+    edge_faces = {}
+    offset = 0
+    for c in counts:
+        verts = indices[offset:offset + c]
+        offset += c
+        prev = verts[-1]
+        for v in verts:
+            key = (prev, v) if prev < v else (v, prev)
+            edge_faces[key] = edge_faces.get(key, 0) + 1
+            prev = v
+
+    offenders = array('i')
+    for a, b in sorted(k for k, n in edge_faces.items() if n > 2):
+        offenders.extend((a, b))
+    return offenders
+
+
+def component_ranges(node, kind, component_indices):
+    """
+    Compresses component indices into Maya range strings, e.g.
+    ["pCube1.vtx[3:7]", "pCube1.vtx[10]"], ready for mc.select.
+    """
+    ranges = []
+    ordered = sorted(set(component_indices))
+    start = prev = None
+    for i in ordered + [None]:
+        if start is not None and i == prev + 1:
+            prev = i
+            continue
+        if start is not None:
+            span = str(start) if start == prev else "{}:{}".format(start, prev)
+            ranges.append("{}.{}[{}]".format(node, kind, span))
+        start = prev = i
+    return ranges
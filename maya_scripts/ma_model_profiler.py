@@ -1,146 +1,476 @@
-# -*- coding: utf-8 -*-
-
-import maya.cmds as mc
-
-# Configurable prefixes and suffixes
-REQUIRED_PREFIXES = ['geo_', 'mesh_']
-REQUIRED_SUFFIXES = ['_geo', '_mesh']
-
-def check_instances(meshes):
-    problematic = []
-    for mesh in meshes:
-        paths = mc.ls(mesh, long=True, dag=True)
-        if len(paths) > 1:
-            problematic.append(mesh)
-    if not problematic:
-        return True, "No instances"
-    return False, "Instances in model: {}".format(", ".join(problematic))
-
-def check_ngons(meshes):
-    ngons = []
-    for mesh in meshes:
-        face_count = mc.polyEvaluate(mesh, face=True)
-        for i in range(face_count):
-            try:
-                info = mc.polyInfo("{}.f[{}]".format(mesh, i), faceToVertex=True)
-                if info:
-                    vtx_count = len(info[0].split()) - 2
-                    if vtx_count > 4:
-                        ngons.append("{}.f[{}]".format(mesh, i))
-            except:
-                continue
-    if not ngons:
-        return True, "OK Passed"
-    return False, "Fail: {} ngons found".format(len(ngons))
-
-def check_namespaces(selection):
-    namespaces = set()
-    for node in selection:
-        if ":" in node:
-            namespaces.add(node.split(":"[0]))
-    if not namespaces:
-        return True, "OK Passed"
-    return False, "Namespaces found: {}".format(", ".join(namespaces))
-
-def check_polycount(meshes):
-    total_faces = 0
-    total_tris = 0
-    for mesh in meshes:
-        total_faces += mc.polyEvaluate(mesh, face=True)
-        total_tris += mc.polyEvaluate(mesh, triangle=True)
-    return True, "Polygons: {}, Triangles: {}".format(total_faces, total_tris)
-
-def check_hidden_meshes(meshes):
-    hidden = []
-    for mesh in meshes:
-        transform = mc.listRelatives(mesh, parent=True, fullPath=True)[0]
-        if not mc.getAttr(transform + ".visibility"):
-            hidden.append(transform)
-    if not hidden:
-        return True, "OK Passed"
-    return False, "Fail: Hidden meshes found"
-
-def check_naming(selection):
-    bad_names = []
-    for t in selection:
-        name = t.split("|")[-1]
-        if not any(name.startswith(prefix) for prefix in REQUIRED_PREFIXES) or not any(name.endswith(suffix) for suffix in REQUIRED_SUFFIXES):
-            bad_names.append(name)
-    if not bad_names:
-        return True, "OK Passed"
-    return False, "Fail: Invalid names: {}".format(", ".join(bad_names))
-
-def check_history(selection):
-    with_history = []
-    ignored_types = ['transform', 'shadingEngine', 'materialInfo', 'groupId', 'groupParts', 'objectSet', 'polySurfaceShape']
-
-    for node in selection:
-        history = mc.listHistory(node, pruneDagObjects=True) or []
-        construction = [h for h in history if mc.nodeType(h) not in ignored_types]
-        if construction:
-            with_history.append(node)
-
-    if not with_history:
-        return True, "OK Passed"
-    return False, "Fail: History found in: {}".format(", ".join(with_history))
-
-def check_multiple_materials(meshes):
-    problematic = []
-    for mesh in meshes:
-        shading_grps = mc.listConnections(mesh, type='shadingEngine') or []
-        if len(shading_grps) > 2:
-            problematic.append(mesh)
-    if not problematic:
-        return True, "OK Passed"
-    return False, "Fail: Meshes with >2 materials: {}".format(", ".join(problematic))
-
-def check_duplicate_materials():
-    materials = mc.ls(materials=True)
-    seen = {}
-    duplicates = []
-    for mat in materials:
-        name = mat.split("|")[-1]
-        if name in seen:
-            duplicates.append(mat)
-        else:
-            seen[name] = True
-    if not duplicates:
-        return True, "OK Passed"
-    return False, "Fail: Duplicate materials: {}".format(", ".join(duplicates))
-
-def check_transform_zero(selection):
-    non_zero = []
-    for t in selection:
-        for attr in ["translate", "rotate"]:
-            for axis in ["X", "Y", "Z"]:
-                val = mc.getAttr("{}.{}{}".format(t, attr, axis))
-                if abs(val) > 1e-4:
-                    non_zero.append(t)
-                    break
-        scale_vals = [mc.getAttr("{}.scale{}".format(t, axis)) for axis in ["X", "Y", "Z"]]
-        if any(abs(s - 1) > 1e-4 for s in scale_vals):
-            non_zero.append(t)
-    if not non_zero:
-        return True, "OK Passed"
-    return False, "Fail: Transforms not reset: {}".format(", ".join(set(non_zero)))
-
-def run_all_checks():
-    selection = mc.ls(sl=True, long=True)
-    if not selection:
-        return {"error": (False, "Nothing selected! Please select a model to check.")}
-
-    meshes = mc.listRelatives(selection, allDescendents=True, type='mesh', fullPath=True) or []
-    meshes = list(set(meshes))
-
-    return {
-        "instances": check_instances(meshes),
-        "ngons": check_ngons(meshes),
-        "namespaces": check_namespaces(selection),
-        "polycount": check_polycount(meshes),
-        "hidden_meshes": check_hidden_meshes(meshes),
-        "naming": check_naming(selection),
-        "history": check_history(selection),
-        "multiple_materials": check_multiple_materials(meshes),
-        "duplicate_materials": check_duplicate_materials(),
-        "transforms_reset": check_transform_zero(selection)
-    }
+# -*- coding: utf-8 -*-
+
+import os
+import json
+import time
+from collections import OrderedDict
+
+import ma_mesh_integrity as integrity
+import ma_geometry_fingerprint as geometry_fingerprint
+import ma_polygon_budget as polygon_budget
+from ma_profiler_snapshot import INPUT_SCOPES, build_snapshot, gather, unit_digests
+
+# Costo, severidad, perfiles y config por defecto de cada check; el validador
+# nativo de Blender (bl_native_checks) lee el mismo archivo
+REGISTRY_PATH = os.environ.get("WAUR_PROFILER_CHECKS",
+                               os.path.join(os.path.dirname(os.path.abspath(__file__)), "ma_profiler_checks.json"))
+
+# Severidades: solo "error" bloquea (y corta la corrida con fail_fast)
+SEVERITIES = ('error', 'warning', 'info')
+
+# Perfiles de ejecucion. "quick" deja fuera los checks caros por cara/historia.
+PROFILES = ('quick', 'full')
+
+# Alcance de un check: se evalua por mesh (shape), por nodo seleccionado o una vez por escena.
+# Solo los checks por mesh/nodo se pueden cachear.
+SCOPES = ('mesh', 'node', 'scene')
+
+CHECKS = OrderedDict()
+
+
+def load_registry(path=None):
+    """
+    Check metadata shared with the Blender validator:
+    {"max_reported_components", "checks": [{"name", "cost", "severity", "profiles", "config"}]}.
+
+    :return: (max reported components, OrderedDict {check name: metadata dict})
+    """
+    with open(path or REGISTRY_PATH, "r") as f:
+        data = json.load(f)
+    return data["max_reported_components"], OrderedDict((entry["name"], entry) for entry in data["checks"])
+
+
+# Maximo de rangos de componentes listados en el mensaje de un check de integridad
+MAX_REPORTED_COMPONENTS, REGISTRY = load_registry()
+
+
+class Check(object):
+    """Registered profiler check and its metadata."""
+
+    def __init__(self, name, func, scope, inputs, cost, severity, profiles, config, summary, aggregate=False):
+        if severity not in SEVERITIES:
+            raise ValueError("Unknown severity '{}' for check '{}'".format(severity, name))
+        if scope not in SCOPES:
+            raise ValueError("Unknown scope '{}' for check '{}'".format(scope, name))
+        if scope != 'scene' and summary is None:
+            raise ValueError("Check '{}' is evaluated per {} and needs a summary".format(name, scope))
+        self.name = name
+        self.func = func
+        self.scope = scope
+        self.inputs = tuple(inputs)
+        self.cost = cost
+        self.severity = severity
+        self.profiles = tuple(profiles)
+        self.config = dict(config or {})
+        self.summary = summary
+        self.aggregate = aggregate
+
+    @property
+    def blocking(self):
+        return self.severity == 'error'
+
+
+def register_check(name, scope='scene', inputs=(), summary=None, aggregate=False):
+    """
+    Decorator that registers a check function. Cost, severity, profiles and
+    default config come from the shared registry (ma_profiler_checks.json).
+
+    Scene checks are called as `check(snap, config)` and return (passed, message).
+    Mesh/node checks are called once per unit as `check(snap, unit, config)` and
+    return a JSON-serializable partial result; `summary(partials, config)` turns
+    the partials of all units into (passed, message).
+
+    :param name: Key of the check in the results and in the registry.
+    :param scope: 'mesh', 'node' or 'scene'.
+    :param inputs: Snapshot data kinds the check reads (see ma_profiler_snapshot.INPUT_SCOPES).
+    :param summary: Reducer for per-unit partials (required unless scope is 'scene').
+    :param aggregate: The summary judges the units together (e.g. the polygon
+                      budget of the whole asset): partials are still computed
+                      and cached per unit, but no per-unit results are reported.
+    """
+    if name not in REGISTRY:
+        raise ValueError("Check '{}' is missing from {}".format(name, REGISTRY_PATH))
+    meta = REGISTRY[name]
+
+    def decorator(func):
+        CHECKS[name] = Check(name, func, scope, inputs, meta["cost"], meta["severity"], meta["profiles"],
+                             meta.get("config"), summary, aggregate)
+        return func
+    return decorator
+
+
+def offenders_summary(ok_message, fail_message):
+    """
+    Summary for checks whose partials are lists of offending items.
+    `fail_message` is formatted with {count}, {items} and the check config.
+    """
+    def summarize(partials, config):
+        items = []
+        seen = set()
+        for partial in partials:
+            for item in partial:
+                if item not in seen:
+                    seen.add(item)
+                    items.append(item)
+        if not items:
+            return True, ok_message
+        fields = dict(config)
+        fields.update(count=len(items), items=", ".join(items))
+        return False, fail_message.format(**fields)
+    return summarize
+
+
+def components_summary(ok_message, fail_message):
+    """
+    Summary for checks whose partials are [offending component count, [Maya
+    component range strings]]. `fail_message` is formatted with {count},
+    {items} and the check config.
+    """
+    def summarize(partials, config):
+        count = sum(p[0] for p in partials)
+        if not count:
+            return True, ok_message
+        ranges = [r for p in partials for r in p[1]]
+        items = ", ".join(ranges[:MAX_REPORTED_COMPONENTS])
+        if len(ranges) > MAX_REPORTED_COMPONENTS:
+            items += ", ..."
+        fields = dict(config)
+        fields.update(count=count, items=items)
+        return False, fail_message.format(**fields)
+    return summarize
+
+
+def _polycount_summary(partials, config):
+    total_faces = sum(p[0] for p in partials)
+    total_tris = sum(p[1] for p in partials)
+    message = "Polygons: {}, Triangles: {}".format(total_faces, total_tris)
+
+    # Presupuesto de la categoria del asset (ma_polygon_budgets.json)
+    budgets = polygon_budget.load_budgets(config['budgets_path'])
+    category = config['category'] or budgets.get("default_category")
+    budget = polygon_budget.budget_for(category, budgets)
+    if not budget:
+        return True, message
+    counts = {"triangles": total_tris,
+              "vertices": sum(p[2] for p in partials),
+              "materials": len(set(sg for p in partials for sg in p[3]))}
+    over = polygon_budget.overruns(counts, budget)
+    if not over:
+        return True, "{} (within {} budget)".format(message, category)
+    details = ", ".join("{} {}/{}".format(m, over[m][0], over[m][1]) for m in polygon_budget.METRICS if m in over)
+    return False, "Fail: {} over {} budget: {}".format(message, category, details)
+
+
+@register_check("instances", scope='mesh', inputs=['instances'],
+                summary=offenders_summary("No instances", "Instances in model: {items}"))
+def check_instances(snap, mesh, config):
+    return [mesh] if snap.is_instanced(mesh) else []
+
+@register_check("ngons", scope='mesh', inputs=['face_sizes'],
+                summary=offenders_summary("OK Passed", "Fail: {count} ngons found"))
+def check_ngons(snap, mesh, config):
+    return ["{}.f[{}]".format(mesh, i) for i in snap.ngon_faces[mesh]]
+
+@register_check("namespaces", scope='node',
+                summary=offenders_summary("OK Passed", "Namespaces found: {items}"))
+def check_namespaces(snap, node, config):
+    name = node.split("|")[-1]
+    return [name.rsplit(":", 1)[0]] if ":" in name else []
+
+@register_check("polycount", scope='mesh', inputs=['face_sizes', 'shading'], summary=_polycount_summary,
+                aggregate=True)
+def check_polycount(snap, mesh, config):
+    return [snap.face_counts[mesh], snap.tri_counts[mesh], snap.vertex_counts[mesh], snap.shading[mesh]]
+
+@register_check("hidden_meshes", scope='mesh', inputs=['visibility'],
+                summary=offenders_summary("OK Passed", "Fail: Hidden meshes found"))
+def check_hidden_meshes(snap, mesh, config):
+    transform = snap.mesh_parent[mesh]
+    return [] if snap.is_visible(transform) else [transform]
+
+@register_check("naming", scope='node',
+                summary=offenders_summary("OK Passed", "Fail: Invalid names: {items}"))
+def check_naming(snap, node, config):
+    name = node.split("|")[-1]
+    if not name.startswith(tuple(config['prefixes'])) or not name.endswith(tuple(config['suffixes'])):
+        return [name]
+    return []
+
+@register_check("history", scope='node', inputs=['history'],
+                summary=offenders_summary("OK Passed", "Fail: History found in: {items}"))
+def check_history(snap, node, config):
+    # Reporta que tipos de historia carga cada nodo, no solo que tiene historia
+    types = sorted(snap.history_types[node] - set(config['ignored_types']))
+    return ["{} ({})".format(node, ", ".join(types))] if types else []
+
+@register_check("multiple_materials", scope='mesh', inputs=['shading'],
+                summary=offenders_summary("OK Passed", "Fail: Meshes with >{max_materials} materials: {items}"))
+def check_multiple_materials(snap, mesh, config):
+    return [mesh] if len(snap.shading[mesh]) > config['max_materials'] else []
+
+@register_check("duplicate_materials", inputs=['materials'])
+def check_duplicate_materials(snap, config):
+    seen = {}
+    duplicates = []
+    for mat in snap.materials:
+        name = mat.split("|")[-1]
+        if name in seen:
+            duplicates.append(mat)
+        else:
+            seen[name] = True
+    if not duplicates:
+        return True, "OK Passed"
+    return False, "Fail: Duplicate materials: {}".format(", ".join(duplicates))
+
+@register_check("transforms_reset", scope='node', inputs=['trs'],
+                summary=offenders_summary("OK Passed", "Fail: Transforms not reset: {items}"))
+def check_transform_zero(snap, node, config):
+    # La desviacion maxima de t/r/s ya se calculo por fila al leer las tablas DAG
+    row = snap.dag_index.get(node)
+    if row is None or not snap.is_transform[row]:
+        return []
+    return [node] if snap.trs_deviation[row] > config['tolerance'] else []
+
+@register_check("coincident_vertices", scope='mesh', inputs=['points'],
+                summary=components_summary("OK Passed", "Fail: {count} coincident vertices: {items}"))
+def check_coincident_vertices(snap, mesh, config):
+    found = integrity.coincident_vertices(snap.points[mesh], config['tolerance'])
+    return [len(found), integrity.component_ranges(mesh, "vtx", found)]
+
+@register_check("degenerate_faces", scope='mesh', inputs=['topology', 'points'],
+                summary=components_summary("OK Passed", "Fail: {count} zero-area/degenerate faces: {items}"))
+def check_degenerate_faces(snap, mesh, config):
+    counts, indices = snap.topology[mesh]
+    found = integrity.degenerate_faces(snap.points[mesh], counts, indices, config['area_tolerance'])
+    return [len(found), integrity.component_ranges(mesh, "f", found)]
+
+@register_check("lamina_faces", scope='mesh', inputs=['topology'],
+                summary=components_summary("OK Passed", "Fail: {count} lamina faces: {items}"))
+def check_lamina_faces(snap, mesh, config):
+    found = integrity.lamina_faces(*snap.topology[mesh])
+    return [len(found), integrity.component_ranges(mesh, "f", found)]
+
+@register_check("non_manifold_edges", scope='mesh', inputs=['topology'],
+                summary=components_summary("OK Passed", "Fail: {count} non-manifold edges: {items}"))
+def check_non_manifold_edges(snap, mesh, config):
+    # Se reportan los vertices de cada arista: los ids de arista de Maya no salen de la topologia
+    pairs = integrity.non_manifold_edges(*snap.topology[mesh])
+    return [len(pairs) // 2, integrity.component_ranges(mesh, "vtx", pairs)]
+
+@register_check("uv_overlaps", scope='mesh', inputs=['uv_analysis'],
+                summary=offenders_summary("OK Passed", "Fail: Overlapping UV shells in: {items}"))
+def check_uv_overlaps(snap, mesh, config):
+    return ["{} ({}: {} shell pairs)".format(mesh, uv_set, len(report["overlapping_shells"]))
+            for uv_set, report in snap.uv_reports[mesh].items() if report["overlapping_shells"]]
+
+@register_check("uv_range", scope='mesh', inputs=['uv_analysis'],
+                summary=offenders_summary("OK Passed", "Fail: UVs out of range in: {items}"))
+def check_uv_range(snap, mesh, config):
+    # Con UDIMs se aceptan UVs fuera de 0-1 mientras cada cara quede dentro de un solo tile
+    offenders = []
+    for uv_set, report in snap.uv_reports[mesh].items():
+        if config['allow_udims'] and report["straddling_faces"]:
+            offenders.append("{} ({}: {} faces across UDIM tiles)".format(mesh, uv_set, report["straddling_faces"]))
+        elif not config['allow_udims'] and report["outside_uvs"]:
+            offenders.append("{} ({}: {} UVs outside 0-1)".format(mesh, uv_set, report["outside_uvs"]))
+    return offenders
+
+@register_check("texel_density", scope='mesh', inputs=['uv_analysis'],
+                summary=offenders_summary("OK Passed", "Fail: Texel density varies more than {max_variation:.0%} in: {items}"))
+def check_texel_density(snap, mesh, config):
+    return ["{} ({}: {:.0%})".format(mesh, uv_set, report["texel_density_cv"])
+            for uv_set, report in snap.uv_reports[mesh].items()
+            if report["texel_density_cv"] is not None and report["texel_density_cv"] > config['max_variation']]
+
+@register_check("duplicate_geometry", inputs=['fingerprint', 'instances'])
+def check_duplicate_geometry(snap, config):
+    # Las instancias reales ya comparten la geometria: no cuentan como duplicados
+    fingerprints = OrderedDict((m, snap.fingerprints[m]) for m in snap.meshes if not snap.is_instanced(m))
+    report = geometry_fingerprint.duplicate_report(fingerprints, config['include_similar'])
+    if not report["groups"]:
+        return True, "OK Passed"
+    groups = ["{} (+{}{})".format(g["meshes"][0], len(g["meshes"]) - 1, ", similar" if g["kind"] == "similar" else "")
+              for g in report["groups"]]
+    return False, "Fail: {} meshes could be instances, saving ~{}: {}".format(
+        report["duplicates"], geometry_fingerprint.format_bytes(report["savings"]), ", ".join(groups))
+
+
+def select_checks(profile='full', names=None):
+    """
+    Returns the registered checks for a profile (or an explicit list of names),
+    cheapest first.
+    """
+    if profile not in PROFILES:
+        raise ValueError("Unknown profile '{}'. Expected one of: {}".format(profile, ", ".join(PROFILES)))
+    if names:
+        checks = [CHECKS[n] for n in names]
+    else:
+        checks = [c for c in CHECKS.values() if profile in c.profiles]
+    return sorted(checks, key=lambda c: c.cost)
+
+
+def check_config(check, overrides=None):
+    config = dict(check.config)
+    config.update((overrides or {}).get(check.name, {}))
+    return config
+
+
+def _evaluate_units(check, snap, config, cache, stats, partials, digests, chunk_size=None):
+    """
+    Generator that fills `partials` ({unit: partial}) for a mesh/node check,
+    yielding (units done, units total) after each chunk of units.
+
+    With a cache, each chunk is first hashed over the raw data the check
+    declares in `inputs` only (see ma_profiler_snapshot.unit_digests), so a
+    lookup never reads more of the scene than running the check would;
+    `digests` gets {unit: digest}.
+    """
+    units = snap.units(check.scope)
+    step = chunk_size or len(units) or 1
+    for i in range(0, len(units), step):
+        chunk = units[i:i + step]
+        missing = chunk
+        if cache is not None:
+            digests.update(unit_digests(snap, check.inputs, chunk))
+            missing = []
+            for unit in chunk:
+                hit, value = cache.get(cache.key(check.name, config, digests[unit]))
+                if hit:
+                    partials[unit] = value
+                else:
+                    missing.append(unit)
+            stats["hits"] += len(chunk) - len(missing)
+
+        # Solo se recolecta y evalua lo que el cache no pudo responder
+        stats["misses"] += len(missing)
+        gather(snap, check.inputs, missing)
+        for unit in missing:
+            partials[unit] = check.func(snap, unit, config)
+            if cache is not None:
+                cache.put(cache.key(check.name, config, digests[unit]), partials[unit])
+        yield len(partials), len(units)
+
+
+def _gather_scene_inputs(check, snap, chunk_size=None):
+    """
+    Generator that gathers the inputs of a scene check before it runs,
+    yielding (steps done, steps total) after each step. Per-mesh/per-node
+    inputs (fingerprints, instances...) are gathered one chunk of units per
+    step, so a large selection is not read in a single blocking pass;
+    scene-wide inputs take one step each.
+    """
+    steps = []
+    for name in check.inputs:
+        if INPUT_SCOPES[name] == 'scene':
+            steps.append((name, None))
+            continue
+        units = snap.units(INPUT_SCOPES[name])
+        step = chunk_size or len(units) or 1
+        steps.extend((name, units[i:i + step]) for i in range(0, len(units), step))
+    for done, (name, units) in enumerate(steps, 1):
+        gather(snap, [name], units)
+        yield done, len(steps)
+
+
+def new_run(profile='full'):
+    return {"results": OrderedDict(), "timings": OrderedDict(), "units": OrderedDict(),
+            "cache": OrderedDict(), "digests": {}, "profile": profile, "config": {}, "stopped_at": None}
+
+
+def iter_checks(run, names=None, fail_fast=False, config=None, selection=None, cache=None, chunk_size=None):
+    """
+    Time-sliced version of run_checks: a generator that evaluates the checks in
+    small steps and fills `run` (see new_run) as it goes, so a UI can drive it
+    from idle callbacks and stop it at any step.
+
+    Yields (check_name, index, total, progress, finished) after every step;
+    `progress` is the fraction of the whole run done and `finished` is True
+    once `run["results"][check_name]` is available.
+
+    :param chunk_size: Max meshes/nodes evaluated or gathered per step (all at once by default).
+    """
+    checks = select_checks(run["profile"], names)
+    run["config"] = dict(config or {})
+    snap = build_snapshot(selection, inputs=())
+    if snap is None:
+        run["results"]["error"] = (False, "Nothing selected! Please select a model to check.")
+        return
+
+    total = len(checks)
+    for index, check in enumerate(checks):
+        elapsed = 0.0
+        start = time.time()
+        cfg = check_config(check, config)
+        if check.scope == 'scene':
+            # Cada check paga la recoleccion de los datos que todavia no estan en el snapshot, por tandas
+            for done, count in _gather_scene_inputs(check, snap, chunk_size):
+                elapsed += time.time() - start
+                yield check.name, index + 1, total, (index + float(done) / max(count, 1)) / total, False
+                start = time.time()
+            result = check.func(snap, cfg)
+        else:
+            stats = {"hits": 0, "misses": 0}
+            partials = OrderedDict()
+            digests = OrderedDict()
+            for done, count in _evaluate_units(check, snap, cfg, cache, stats, partials, digests, chunk_size):
+                elapsed += time.time() - start
+                yield check.name, index + 1, total, (index + float(done) / max(count, 1)) / total, False
+                start = time.time()
+            partials = OrderedDict((u, partials[u]) for u in snap.units(check.scope))
+            result = check.summary(list(partials.values()), cfg)
+            if not check.aggregate:
+                run["units"][check.name] = partials
+            run["cache"][check.name] = stats
+            # Hash de los datos que leyo el check por mesh/nodo (solo existe si se uso el cache) para el historial
+            if digests:
+                run["digests"][check.name] = digests
+        run["timings"][check.name] = elapsed + time.time() - start
+        run["results"][check.name] = result
+        yield check.name, index + 1, total, float(index + 1) / total, True
+
+        if fail_fast and check.blocking and not result[0]:
+            run["stopped_at"] = check.name
+            return
+
+
+def run_checks(profile='full', names=None, fail_fast=False, config=None, selection=None, cache=None,
+               on_result=None):
+    """
+    Runs the registered checks over a snapshot of the selection.
+
+    :param profile: 'quick' or 'full'.
+    :param names: Optional explicit list of check names (overrides the profile).
+    :param fail_fast: Stop after the first failing blocking ('error') check.
+    :param config: Optional {check_name: {key: value}} config overrides.
+    :param selection: Nodes to validate (current selection by default).
+    :param cache: Optional ma_profiler_cache.ValidationCache. Mesh/node checks
+                  whose input digest is cached are not recomputed.
+    :param on_result: Optional callback `on_result(name, result, seconds, index, total)`
+                      called as soon as each check finishes.
+    :return: dict with "results" ({name: (passed, message)}), "timings"
+             ({name: seconds}), "units" ({name: {unit: partial}}, except
+             aggregate checks), "cache" (hit/miss counts per check), "digests"
+             ({name: {unit: digest}}, with a cache), "profile", "config" and
+             "stopped_at".
+    """
+    run = new_run(profile)
+    for name, index, total, progress, finished in iter_checks(run, names, fail_fast, config, selection, cache):
+        if finished and on_result is not None:
+            on_result(name, run["results"][name], run["timings"][name], index, total)
+    return run
+
+
+def unit_result(check_name, partial, config=None):
+    """(passed, message) of a single mesh/node partial, as if it were the only unit."""
+    check = CHECKS[check_name]
+    return check.summary([partial], check_config(check, config))
+
+
+def cache_totals(run):
+    hits = sum(s["hits"] for s in run["cache"].values())
+    misses = sum(s["misses"] for s in run["cache"].values())
+    return hits, misses
+
+
+def run_all_checks():
+    return dict(run_checks()["results"])
@@ -1,8 +1,69 @@
 # -*- coding: utf-8 -*-
 
+import time
+
 import maya.cmds as mc
 from PySide2 import QtWidgets, QtCore, QtGui
 import ma_model_profiler as profiler
+from ma_profiler_cache import ValidationCache
+
+# Presupuesto de cada tick ocioso: Maya sigue respondiendo entre tick y tick
+TIME_SLICE = 0.03
+# Meshes/nodos evaluados por paso dentro de un check
+UNITS_PER_STEP = 20
+
+COLORS = {
+    "passed": QtGui.QColor("lime"),
+    "failed": QtGui.QColor("yellow"),
+    "offender": QtGui.QColor("#bbbbbb"),
+    "status": QtGui.QColor("orange"),
+}
+
+
+class ResultModel(QtCore.QAbstractListModel):
+    """
+    Flat list of result rows (text, color key, Maya node). Rows are plain
+    tuples, so thousands of offending items cost no widgets at all.
+    """
+
+    NodeRole = QtCore.Qt.UserRole + 1
+
+    def __init__(self, parent=None):
+        super(ResultModel, self).__init__(parent)
+        self.rows = []
+
+    def rowCount(self, parent=QtCore.QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self.rows)
+
+    def data(self, index, role=QtCore.Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        text, color, node = self.rows[index.row()]
+        if role == QtCore.Qt.DisplayRole:
+            return text
+        if role == QtCore.Qt.ForegroundRole:
+            return COLORS[color]
+        if role == QtCore.Qt.ToolTipRole:
+            return node or text
+        if role == self.NodeRole:
+            return node
+        return None
+
+    def add_rows(self, rows):
+        if not rows:
+            return
+        first = len(self.rows)
+        self.beginInsertRows(QtCore.QModelIndex(), first, first + len(rows) - 1)
+        self.rows.extend(rows)
+        self.endInsertRows()
+
+    def clear(self):
+        self.beginResetModel()
+        self.rows = []
+        self.endResetModel()
+
 
 class ModelProfilerUI(QtWidgets.QDialog):
     def __init__(self):
@@ -12,6 +73,11 @@ class ModelProfilerUI(QtWidgets.QDialog):
         self.setWindowFlags(QtCore.Qt.Tool)
         self.setMinimumWidth(420)
         self.setStyleSheet(self.get_stylesheet())
+        # Cache en memoria: re-ejecutar sobre meshes sin cambios es casi gratis
+        self.cache = ValidationCache()
+        self.run = None
+        self.steps = None
+        self.run_start = 0.0
         self.build_ui()
 
     def get_maya_window(self):
@@ -37,13 +103,16 @@ class ModelProfilerUI(QtWidgets.QDialog):
         QPushButton:hover {
             background-color: #357ab8;
         }
-        QListWidget {
+        QPushButton:disabled {
+            background-color: #555555;
+        }
+        QListView {
             background-color: #1e1e1e;
             border: 1px solid #444444;
             border-radius: 4px;
             padding: 4px;
         }
-        QListWidget::item {
+        QListView::item {
             padding: 4px;
         }
         """
@@ -55,37 +124,121 @@ class ModelProfilerUI(QtWidgets.QDialog):
         title.setStyleSheet("font-size: 16px; font-weight: bold; margin-bottom: 6px;")
         layout.addWidget(title)
 
-        self.result_list = QtWidgets.QListWidget()
+        self.result_model = ResultModel(self)
+        self.result_list = QtWidgets.QListView()
+        self.result_list.setModel(self.result_model)
+        self.result_list.setUniformItemSizes(True)
+        self.result_list.setSelectionMode(QtWidgets.QAbstractItemView.ExtendedSelection)
+        self.result_list.doubleClicked.connect(self.select_offender)
         layout.addWidget(self.result_list)
 
+        self.progress_bar = QtWidgets.QProgressBar()
+        self.progress_bar.setRange(0, 1000)
+        self.progress_bar.setValue(0)
+        self.progress_bar.setFormat("Idle")
+        layout.addWidget(self.progress_bar)
+
+        self.fail_fast_checkbox = QtWidgets.QCheckBox("Stop at first blocking error")
+        layout.addWidget(self.fail_fast_checkbox)
+
+        buttons = QtWidgets.QHBoxLayout()
         self.check_button = QtWidgets.QPushButton("Run Checks")
         self.check_button.clicked.connect(self.run_checks)
-        layout.addWidget(self.check_button)
+        buttons.addWidget(self.check_button)
+
+        self.cancel_button = QtWidgets.QPushButton("Cancel")
+        self.cancel_button.setEnabled(False)
+        self.cancel_button.clicked.connect(self.cancel_checks)
+        buttons.addWidget(self.cancel_button)
+        layout.addLayout(buttons)
 
     def run_checks(self):
-        self.result_list.clear()
-        results = profiler.run_all_checks()
-
-        if "error" in results:
-            passed, message = results["error"]
-            item = QtWidgets.QListWidgetItem(message)
-            item.setForeground(QtGui.QColor("yellow"))
-            self.result_list.addItem(item)
+        if self.steps is not None:
+            return
+        self.result_model.clear()
+        self.run = profiler.new_run('full')
+        self.steps = profiler.iter_checks(self.run, fail_fast=self.fail_fast_checkbox.isChecked(),
+                                          cache=self.cache, chunk_size=UNITS_PER_STEP)
+        self.run_start = time.time()
+        self.set_running(True)
+        QtCore.QTimer.singleShot(0, self.step_checks)
+
+    def step_checks(self):
+        # Cada tick avanza el generador hasta agotar su presupuesto y cede el control a Maya
+        if self.steps is None:
+            return
+        deadline = time.time() + TIME_SLICE
+        try:
+            while time.time() < deadline:
+                name, index, total, progress, finished = next(self.steps)
+                self.progress_bar.setValue(int(progress * 1000))
+                self.progress_bar.setFormat("{}/{} {}".format(index, total, name))
+                if finished:
+                    self.add_check_result(name)
+        except StopIteration:
+            self.finish_checks()
+            return
+        except Exception as e:
+            self.result_model.add_rows([("[Error] {}".format(e), "status", None)])
+            self.finish_checks()
+            return
+        QtCore.QTimer.singleShot(0, self.step_checks)
+
+    def add_check_result(self, check_name):
+        result = self.run["results"][check_name]
+        if not isinstance(result, tuple) or len(result) != 2:
+            self.result_model.add_rows([("[{}] Unexpected result format".format(check_name), "status", None)])
             return
 
-        for check_name, result in results.items():
-            if not isinstance(result, tuple) or len(result) != 2:
-                item = QtWidgets.QListWidgetItem("[{}] Unexpected result format".format(check_name))
-                item.setForeground(QtGui.QColor("orange"))
-                self.result_list.addItem(item)
-                continue
-
-            passed, message = result
-            display = "[{}] {}".format(check_name.replace("_", " ").title(), message)
-            item = QtWidgets.QListWidgetItem(display)
-            color = QtGui.QColor("lime") if passed else QtGui.QColor("yellow")
-            item.setForeground(color)
-            self.result_list.addItem(item)
+        passed, message = result
+        display = "[{}] {} ({:.1f} ms)".format(check_name.replace("_", " ").title(), message,
+                                               self.run["timings"][check_name] * 1000.0)
+        rows = [(display, "passed" if passed else "failed", None)]
+
+        # Una fila por mesh/nodo que falla; doble click lo selecciona en la escena
+        if not passed:
+            for unit, partial in self.run["units"].get(check_name, {}).items():
+                unit_passed, unit_message = profiler.unit_result(check_name, partial, self.run["config"])
+                if not unit_passed:
+                    rows.append(("    {}: {}".format(unit.split("|")[-1], unit_message), "offender", unit))
+        self.result_model.add_rows(rows)
+
+    def finish_checks(self):
+        if "error" in self.run["results"]:
+            passed, message = self.run["results"]["error"]
+            self.result_model.add_rows([(message, "failed", None)])
+            self.progress_bar.setFormat("Idle")
+        else:
+            if self.run["stopped_at"]:
+                self.result_model.add_rows([("Stopped at the first blocking error: {}".format(
+                    self.run["stopped_at"].replace("_", " ").title()), "status", None)])
+            hits, misses = profiler.cache_totals(self.run)
+            self.progress_bar.setValue(1000)
+            self.progress_bar.setFormat("Done in {:.2f}s ({} cached)".format(time.time() - self.run_start, hits))
+        self.steps = None
+        self.set_running(False)
+
+    def cancel_checks(self):
+        if self.steps is None:
+            return
+        self.steps.close()
+        self.steps = None
+        self.result_model.add_rows([("Cancelled", "status", None)])
+        self.progress_bar.setFormat("Cancelled")
+        self.set_running(False)
+
+    def set_running(self, running):
+        self.check_button.setEnabled(not running)
+        self.cancel_button.setEnabled(running)
+
+    def select_offender(self, index):
+        node = self.result_model.data(index, ResultModel.NodeRole)
+        if node and mc.objExists(node):
+            mc.select(node, replace=True)
+
+    def closeEvent(self, event):
+        self.cancel_checks()
+        super(ModelProfilerUI, self).closeEvent(event)
 
 def show_profiler_ui():
     global profiler_ui_instance
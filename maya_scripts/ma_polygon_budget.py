@@ -0,0 +1,386 @@
+# -*- coding: utf-8 -*-
+# ma_polygon_budget.py
+# Presupuestos de poligonos por categoria de asset y reportes de toda la libreria.
+#
+# - Los presupuestos (triangulos, vertices, materiales) salen de
+#   ma_polygon_budgets.json; cada archivo cae en una categoria por reglas de ruta.
+# - gather_library cuenta una libreria entera con varios workers de Maya
+#   standalone en paralelo (este mismo modulo corrido por ma_standalone_hub) y
+#   guarda los conteos por hash de archivo: lo que no cambio no se vuelve a abrir.
+# - budget_report / over_budget / heaviest ordenan los resultados.
+#
+# Uso sin Maya (desde Python o mayapy):
+#   python ma_polygon_budget.py <carpeta o archivos> [--workers 4] [--top 100] [--json salida.json]
+
+import os
+import sys
+import json
+import time
+import fnmatch
+import hashlib
+import tempfile
+import threading
+import subprocess
+
+try:
+    import queue
+except ImportError:
+    import Queue as queue
+
+try:
+    import maya.cmds as mc
+    import maya.api.OpenMaya as om
+except ImportError:
+    # Fuera de Maya solo se usan el driver de la libreria y los reportes
+    mc = om = None
+
+BUDGETS_PATH = os.environ.get("WAUR_POLYGON_BUDGETS",
+                              os.path.join(os.path.dirname(os.path.abspath(__file__)), "ma_polygon_budgets.json"))
+
+CACHE_PATH = os.path.join(tempfile.gettempdir(), "waur_polygon_counts.json")
+CACHE_VERSION = 1
+
+MAYAPY_PATH = os.environ.get("MAYAPY", r"C:\Program Files\Autodesk\Maya2018\bin\mayapy.exe")
+HUB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "ma_standalone_hub.py")
+
+SCENE_EXTENSIONS = (".ma", ".mb", ".fbx")
+METRICS = ("triangles", "vertices", "materials")
+
+# Prefijo de las lineas de stdout de los workers (una linea JSON por archivo contado)
+STREAM_PREFIX = "@@COUNT "
+
+# Meshes mas pesados guardados por archivo
+HEAVIEST_MESHES = 5
+
+_configs = {}
+
+
+def load_budgets(path=None):
+    """
+    Budget config ({"default_category", "categories": {name: {metric: max}},
+    "rules": [{"match": glob, "category": name}]}), reloaded when the file changes.
+    """
+    path = path or BUDGETS_PATH
+    mtime = os.path.getmtime(path)
+    cached = _configs.get(path)
+    if cached is None or cached[0] != mtime:
+        with open(path, "r") as f:
+            _configs[path] = (mtime, json.load(f))
+    return _configs[path][1]
+
+
+def category_for(path, config):
+    """Budget category of an asset file: first rule whose glob matches the path, else the default."""
+    normalized = path.replace("\\", "/").lower()
+    for rule in config.get("rules", []):
+        if fnmatch.fnmatch(normalized, rule["match"].lower()):
+            return rule["category"]
+    return config.get("default_category")
+
+
+def budget_for(category, config):
+    """{metric: max} of a category ({} when the category has no budget)."""
+    return config.get("categories", {}).get(category, {})
+
+
+def overruns(counts, budget):
+    """{metric: (value, budget)} for every metric of `counts` above its budget."""
+    return dict((metric, (counts[metric], budget[metric])) for metric in METRICS
+                if metric in budget and counts.get(metric, 0) > budget[metric])
+
+
+# ---------- Conteo dentro de Maya ----------
+
+def count_scene():
+    """
+    Triangles, vertices, faces and materials of every (non intermediate) mesh
+    in the open scene, read with the API.
+
+    :return: {"triangles", "vertices", "faces", "materials", "meshes", "heaviest": [[mesh, triangles]]}
+    """
+    totals = {"triangles": 0, "vertices": 0, "faces": 0, "meshes": 0}
+    per_mesh = []
+    it = om.MItDag(om.MItDag.kDepthFirst, om.MFn.kMesh)
+    while not it.isDone():
+        path = it.getPath()
+        fn = om.MFnMesh(path)
+        if not fn.isIntermediateObject:
+            counts, _ = fn.getVertices()
+            # Mismo criterio que el profiler: una cara de n lados son n - 2 triangulos
+            tris = sum(counts) - 2 * len(counts)
+            totals["triangles"] += tris
+            totals["vertices"] += fn.numVertices
+            totals["faces"] += fn.numPolygons
+            totals["meshes"] += 1
+            per_mesh.append((path.fullPathName(), tris))
+        it.next()
+
+    meshes = mc.ls(type="mesh", noIntermediate=True, long=True) or []
+    engines = set(mc.listConnections(meshes, type="shadingEngine") or []) if meshes else set()
+    totals["materials"] = len(engines)
+    totals["heaviest"] = [list(m) for m in sorted(per_mesh, key=lambda m: -m[1])[:HEAVIEST_MESHES]]
+    return totals
+
+
+def open_scene(path):
+    if path.lower().endswith(".fbx"):
+        if not mc.pluginInfo("fbxmaya", query=True, loaded=True):
+            mc.loadPlugin("fbxmaya")
+        mc.file(new=True, force=True)
+        mc.file(path, i=True, type="FBX", ignoreVersion=True, options="fbx", pr=True)
+    else:
+        mc.file(path, open=True, force=True, ignoreVersion=True, prompt=False)
+
+
+def main(args):
+    """
+    Worker entry point for ma_standalone_hub: counts every file in `args[1:]`
+    and writes {path: counts} to `args[0]`. Streams one line per file.
+    """
+    if len(args) < 2:
+        print("[ERROR] ma_polygon_budget.py requires: <output_json> <scene> [<scene> ...]")
+        sys.exit(1)
+
+    output_path, paths = args[0], args[1:]
+    results = {}
+    for path in paths:
+        start = time.time()
+        try:
+            open_scene(path)
+            counts = count_scene()
+        except Exception as e:
+            counts = {"error": str(e)}
+        counts["seconds"] = round(time.time() - start, 3)
+        results[path] = counts
+        print(STREAM_PREFIX + json.dumps({"path": path, "counts": counts}))
+        sys.stdout.flush()
+
+    with open(output_path, "w") as f:
+        json.dump(results, f)
+
+
+# ---------- Libreria en batch ----------
+
+def file_hash(path, chunk_size=1 << 20):
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class CountCache(object):
+    """
+    Counts by file content hash. A stat index (size, mtime -> hash) avoids
+    rehashing files that were not touched since the last run.
+    """
+
+    def __init__(self, path=CACHE_PATH):
+        self.path = path
+        self.counts = {}   # hash -> conteos
+        self.files = {}    # ruta -> [size, mtime, hash]
+        if path and os.path.isfile(path):
+            try:
+                with open(path, "r") as f:
+                    data = json.load(f)
+                if data.get("version") == CACHE_VERSION:
+                    self.counts = data.get("counts", {})
+                    self.files = data.get("files", {})
+            except Exception as e:
+                print("[WARNING] Could not read polygon count cache '{}': {}".format(path, e))
+
+    def digest(self, path):
+        stat = os.stat(path)
+        known = self.files.get(path)
+        if known and known[0] == stat.st_size and known[1] == stat.st_mtime:
+            return known[2]
+        digest = file_hash(path)
+        self.files[path] = [stat.st_size, stat.st_mtime, digest]
+        return digest
+
+    def save(self):
+        if not self.path:
+            return
+        try:
+            with open(self.path, "w") as f:
+                json.dump({"version": CACHE_VERSION, "counts": self.counts, "files": self.files}, f)
+        except Exception as e:
+            print("[WARNING] Could not write polygon count cache '{}': {}".format(self.path, e))
+
+
+def find_scenes(roots):
+    """Scene files (.ma, .mb, .fbx) under the given folders/files, sorted."""
+    found = []
+    for root in roots:
+        if os.path.isfile(root):
+            found.append(os.path.abspath(root))
+            continue
+        for folder, _, files in os.walk(root):
+            found.extend(os.path.join(folder, name) for name in files if name.lower().endswith(SCENE_EXTENSIONS))
+    return sorted(set(found))
+
+
+def _read_lines(process, lines):
+    for line in iter(process.stdout.readline, ""):
+        lines.put(line)
+    lines.put(None)
+
+
+def gather_library(paths, workers=4, cache=None, mayapy=MAYAPY_PATH, on_progress=None):
+    """
+    Polygon counts of many scene files, opening only the files whose content
+    changed since they were last counted.
+
+    :param paths: Scene files.
+    :param workers: Maya standalone processes run in parallel.
+    :param cache: CountCache (a default one on disk if None).
+    :param on_progress: Optional callback(done, total, path, counts).
+    :return: {path: counts} (see count_scene; "error" when the file failed or
+             its worker exited before counting it).
+    """
+    if workers < 1:
+        raise ValueError("gather_library needs at least 1 worker, got {}".format(workers))
+    cache = cache or CountCache()
+    results = {}
+    digests = {}
+    pending = []
+    for path in paths:
+        digests[path] = cache.digest(path)
+        counts = cache.counts.get(digests[path])
+        if counts is None:
+            pending.append(path)
+        else:
+            results[path] = counts
+
+    total = len(paths)
+    print("[INFO] {} file(s): {} cached, {} to count with {} worker(s)".format(
+        total, total - len(pending), len(pending), min(workers, len(pending))))
+
+    # Los archivos mas grandes primero y repartidos en round-robin para balancear los workers
+    pending.sort(key=lambda p: -os.path.getsize(p))
+    chunks = [pending[i::workers] for i in range(workers) if pending[i::workers]]
+    lines = queue.Queue()
+    processes = []
+    for chunk in chunks:
+        handle, output = tempfile.mkstemp(suffix=".json", prefix="waur_counts_")
+        os.close(handle)
+        process = subprocess.Popen([mayapy, HUB_PATH, "--script", os.path.abspath(__file__), "--args", output] + chunk,
+                                   stdout=subprocess.PIPE, stderr=subprocess.STDOUT, universal_newlines=True)
+        # Un hilo por worker vacia su stdout para que ninguno se bloquee con el pipe lleno
+        reader = threading.Thread(target=_read_lines, args=(process, lines))
+        reader.daemon = True
+        reader.start()
+        processes.append((process, output, chunk))
+
+    done = total - len(pending)
+    running = len(processes)
+    while running:
+        line = lines.get()
+        if line is None:
+            running -= 1
+            continue
+        if not line.startswith(STREAM_PREFIX):
+            continue
+        item = json.loads(line[len(STREAM_PREFIX):])
+        path, counts = item["path"], item["counts"]
+        results[path] = counts
+        if "error" not in counts:
+            cache.counts[digests[path]] = counts
+        done += 1
+        if on_progress:
+            on_progress(done, total, path, counts)
+
+    for process, output, chunk in processes:
+        process.wait()
+        try:
+            os.remove(output)
+        except OSError:
+            pass
+        # Un worker que se cae a mitad de su tanda no reporta el resto: cada archivo queda como error
+        for path in chunk:
+            if path not in results:
+                results[path] = {"error": "Worker exited (code {}) before counting this file".format(
+                    process.returncode)}
+                done += 1
+                if on_progress:
+                    on_progress(done, total, path, results[path])
+
+    cache.save()
+    return results
+
+
+# ---------- Reportes ----------
+
+def budget_report(results, config=None):
+    """
+    Counts of every file against the budget of its category.
+
+    :param results: {path: counts} from gather_library.
+    :return: list of {"path", "category", "triangles", "vertices", "materials",
+             "over": {metric: [value, budget]}, "ratio"}, worst ratio first.
+             "ratio" is the largest value / budget of the file.
+    """
+    config = config or load_budgets()
+    rows = []
+    for path, counts in results.items():
+        if "error" in counts:
+            continue
+        category = category_for(path, config)
+        budget = budget_for(category, config)
+        ratios = [float(counts.get(m, 0)) / budget[m] for m in METRICS if budget.get(m)]
+        row = {"path": path, "category": category, "over": overruns(counts, budget),
+               "ratio": round(max(ratios), 3) if ratios else 0.0}
+        row.update((m, counts.get(m, 0)) for m in METRICS)
+        rows.append(row)
+    rows.sort(key=lambda row: -row["ratio"])
+    return rows
+
+
+def over_budget(report):
+    return [row for row in report if row["over"]]
+
+
+def heaviest(results, count=100, metric="triangles"):
+    """The `count` heaviest files by `metric`: [(path, value)]."""
+    ranked = sorted(((path, c.get(metric, 0)) for path, c in results.items() if "error" not in c),
+                    key=lambda item: -item[1])
+    return ranked[:count]
+
+
+def print_report(report, top=None):
+    rows = over_budget(report)
+    print("[INFO] {} of {} file(s) over budget".format(len(rows), len(report)))
+    for row in rows[:top]:
+        over = ", ".join("{} {}/{}".format(m, v, b) for m, (v, b) in sorted(row["over"].items()))
+        print("  {:>6.0%}  {:<12} {}  ({})".format(row["ratio"], row["category"], row["path"], over))
+
+
+def positive_int(value):
+    """argparse type for counts that must be at least 1."""
+    import argparse
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError("must be at least 1, got {}".format(value))
+    return number
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Polygon budget report of an asset library")
+    parser.add_argument("roots", nargs="+", help="Folders or scene files")
+    parser.add_argument("--workers", type=positive_int, default=4)
+    parser.add_argument("--top", type=int, default=100, help="Heaviest files to list")
+    parser.add_argument("--budgets", help="Budget config (defaults to ma_polygon_budgets.json)")
+    parser.add_argument("--json", help="Write the full report to this file")
+    options = parser.parse_args()
+
+    counts = gather_library(find_scenes(options.roots), workers=options.workers)
+    library_report = budget_report(counts, load_budgets(options.budgets))
+    print_report(library_report)
+    print("[INFO] Heaviest {} file(s) by triangles:".format(options.top))
+    for scene_path, tris in heaviest(counts, options.top):
+        print("  {:>10}  {}".format(tris, scene_path))
+    if options.json:
+        with open(options.json, "w") as f:
+            json.dump(library_report, f, indent=2)
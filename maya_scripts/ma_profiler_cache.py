@@ -0,0 +1,132 @@
+# -*- coding: utf-8 -*-
+# ma_profiler_cache.py
+# Cache de resultados por (mesh/nodo, check), indexado por hash de contenido.
+#
+# En disco es un JSON compartido por todas las corridas (UI de Maya, bridge de
+# Blender, batch): cada entrada guarda cuando se uso por ultima vez, al
+# guardar se descartan las viejas y las que exceden el tope, y el archivo se
+# reemplaza de una vez (temporal + rename) para que dos corridas a la par no
+# lo dejen truncado.
+
+import os
+import time
+import json
+import hashlib
+import tempfile
+
+CACHE_VERSION = 2
+
+# Tope de entradas en disco (las menos usadas recientemente se descartan)
+MAX_ENTRIES = 20000
+# Entradas sin usar por mas de este tiempo se descartan al guardar
+MAX_AGE = 30 * 24 * 3600
+
+
+def replace_file(source, target):
+    """Moves `source` over `target` in one step (os.replace; Python 2 has no replace on Windows)."""
+    if hasattr(os, "replace"):
+        os.replace(source, target)
+        return
+    if os.name == "nt" and os.path.exists(target):
+        os.remove(target)
+    os.rename(source, target)
+
+
+def write_json_atomic(data, path):
+    """Writes JSON to a temp file next to `path` and renames it over `path`."""
+    folder = os.path.dirname(os.path.abspath(path))
+    handle, temp_path = tempfile.mkstemp(suffix=".tmp", prefix=os.path.basename(path) + ".", dir=folder)
+    try:
+        with os.fdopen(handle, "w") as f:
+            json.dump(data, f)
+        replace_file(temp_path, path)
+    except Exception:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+
+def prune_entries(entries, max_entries=MAX_ENTRIES, max_age=MAX_AGE, now=None):
+    """
+    Drops entries ({key: [last used, value]}) unused for more than max_age
+    seconds, then the least recently used ones beyond max_entries.
+
+    :return: Pruned dict.
+    """
+    oldest = (now or time.time()) - max_age
+    kept = sorted(((item[0], key) for key, item in entries.items() if item[0] >= oldest), reverse=True)
+    return dict((key, entries[key]) for _, key in kept[:max_entries])
+
+
+class ValidationCache(object):
+    """
+    Stores per-unit check results keyed by the unit content digest, the check
+    name and its config. Lives in memory and optionally in a JSON file so it
+    survives between standalone runs; the file is capped by MAX_ENTRIES and
+    MAX_AGE and merged with what other runs saved meanwhile.
+    """
+
+    def __init__(self, path=None, max_entries=MAX_ENTRIES, max_age=MAX_AGE):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_age = max_age
+        self.entries = {}  # clave -> [ultimo uso, resultado]
+        self.hits = 0
+        self.misses = 0
+        if path and os.path.isfile(path):
+            self.load()
+
+    @staticmethod
+    def key(check_name, config, digest):
+        config_blob = json.dumps(config, sort_keys=True, default=str)
+        h = hashlib.sha1("{}|{}|{}".format(check_name, config_blob, digest).encode('utf-8'))
+        return h.hexdigest()
+
+    def get(self, key):
+        if key in self.entries:
+            self.hits += 1
+            entry = self.entries[key]
+            entry[0] = time.time()
+            return True, entry[1]
+        self.misses += 1
+        return False, None
+
+    def put(self, key, value):
+        self.entries[key] = [time.time(), value]
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "entries": len(self.entries)}
+
+    def reset_stats(self):
+        self.hits = 0
+        self.misses = 0
+
+    def clear(self):
+        self.entries.clear()
+        self.reset_stats()
+
+    def _read(self):
+        try:
+            with open(self.path, "r") as f:
+                data = json.load(f)
+        except Exception as e:
+            print("[WARNING] Could not read validation cache '{}': {}".format(self.path, e))
+            return {}
+        return data.get("entries", {}) if data.get("version") == CACHE_VERSION else {}
+
+    def load(self):
+        self.entries = self._read()
+
+    def save(self):
+        if not self.path:
+            return
+        # Lo que otras corridas guardaron mientras tanto se conserva (gana el uso mas reciente)
+        entries = self._read() if os.path.isfile(self.path) else {}
+        for key, entry in self.entries.items():
+            if key not in entries or entries[key][0] <= entry[0]:
+                entries[key] = entry
+        self.entries = prune_entries(entries, self.max_entries, self.max_age)
+        try:
+            write_json_atomic({"version": CACHE_VERSION, "entries": self.entries}, self.path)
+        except Exception as e:
+            print("[WARNING] Could not write validation cache '{}': {}".format(self.path, e))
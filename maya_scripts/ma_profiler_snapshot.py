@@ -0,0 +1,428 @@
+# -*- coding: utf-8 -*-
+# ma_profiler_snapshot.py
+# Captura de escena en una sola pasada para los checks de ma_model_profiler.
+
+import math
+import hashlib
+from array import array
+from collections import OrderedDict
+
+import maya.cmds as mc
+import maya.api.OpenMaya as om
+
+import ma_uv_analysis as uv_analysis
+import ma_geometry_fingerprint as geometry_fingerprint
+
+# Datos que puede recolectar el snapshot. Cada check lee solo de aqui.
+ALL_INPUTS = ('instances', 'topology', 'points', 'face_sizes', 'trs',
+              'visibility', 'shading', 'history', 'materials', 'uvs', 'uv_analysis',
+              'fingerprint')
+
+# Alcance de cada dato: por mesh (shape), por nodo seleccionado o global.
+INPUT_SCOPES = {
+    'instances': 'mesh',
+    'topology': 'mesh',
+    'points': 'mesh',
+    'face_sizes': 'mesh',
+    'visibility': 'mesh',
+    'shading': 'mesh',
+    'uvs': 'mesh',
+    'uv_analysis': 'mesh',
+    'fingerprint': 'mesh',
+    'trs': 'node',
+    'history': 'node',
+    'materials': 'scene',
+}
+
+# Datos crudos de los que sale cada dato derivado: el hash de cache de un check
+# se calcula sobre estos, nunca sobre el analisis que el cache quiere evitar
+DIGEST_SOURCES = {
+    'face_sizes': ('topology',),
+    'uv_analysis': ('topology', 'points', 'uvs'),
+    'fingerprint': ('topology', 'points'),
+}
+
+# Datos que salen de la misma pasada de API sobre los nodos DAG
+DAG_INPUTS = frozenset(['instances', 'trs', 'visibility'])
+
+# TRS neutro de los nodos que no son transform (shapes)
+IDENTITY_TRS = (0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 1.0, 1.0, 1.0)
+
+# Entradas que no son historia de construccion: display layers (displayLayer.drawInfo ->
+# drawOverride) y render layers (renderLayer.renderInfo -> renderLayerInfo). No se siguen.
+NON_HISTORY_PLUGS = frozenset(['drawOverride', 'renderLayerInfo'])
+
+
+class SceneSnapshot(object):
+    """
+    In-memory copy of everything the profiler checks need from the scene.
+
+    Built once per validation with one bulk query per node and data kind;
+    checks never call maya.cmds themselves. Data can be gathered for a subset
+    of meshes/nodes only (the ones the validation cache could not answer).
+    """
+
+    def __init__(self, selection, meshes):
+        self.selection = list(selection)
+        self.meshes = list(meshes)
+        # mesh -> transform padre (derivado del nombre largo, sin queries)
+        self.mesh_parent = dict((m, m.rsplit("|", 1)[0]) for m in self.meshes)
+
+        self.topology = {}        # mesh -> (array('i') vertices por cara, array('i') indices)
+        self.points = {}          # mesh -> array('d') xyz en espacio objeto
+        self.face_counts = {}     # mesh -> numero de caras
+        self.tri_counts = {}      # mesh -> numero de triangulos
+        self.vertex_counts = {}   # mesh -> numero de vertices usados por las caras
+        self.face_sizes = {}      # mesh -> {vertices por cara: cantidad}
+        self.ngon_faces = {}      # mesh -> array('i') de indices de caras > 4 lados
+        self.dag_nodes = []           # nodos DAG consultados, en el orden de las tablas
+        self.dag_index = {}           # nodo -> fila en las tablas DAG
+        self.is_transform = array('b')
+        self.trs = array('d')         # 9 floats por fila (t, r en grados, s)
+        self.trs_deviation = array('d')  # max(|t|, |r|, |s - 1|) por fila
+        self.visible = array('b')
+        self.parent_counts = array('i')  # padres DAG por fila (> 1 = instancia)
+        self.shading = {}         # mesh -> lista de shadingEngines
+        self.uv_sets = {}         # mesh -> lista de ma_uv_analysis.UVSetData
+        self.uv_reports = {}      # mesh -> {uv set: metricas de ma_uv_analysis}
+        self.fingerprints = {}    # mesh -> ma_geometry_fingerprint.Fingerprint
+        self.history_nodes = {}   # nodo -> nodos de historia
+        self.history_types = {}   # nodo -> set de tipos en su historia
+        self.node_types = {}      # nodo DG -> tipo (memoizado durante el recorrido)
+        self.dg_objects = {}      # nodo DG -> MObject
+        self.dg_inputs = {}       # nodo DG -> nodos DG conectados a sus entradas
+        self.dg_closure = {}      # nodo DG -> set de nodos DG aguas arriba (incluido el mismo)
+        self.materials = []       # materiales de la escena
+        self.digests = {}         # (datos crudos, mesh/nodo) -> hash del contenido
+        self.gathered = set()     # (dato, unidad) ya recolectados
+
+    def units(self, scope):
+        if scope == 'mesh':
+            return self.meshes
+        if scope == 'node':
+            return self.selection
+        return [None]
+
+    def dag_units(self):
+        """Every DAG node the snapshot can ask about: selection, meshes and their parents."""
+        return list(OrderedDict.fromkeys(self.selection + self.meshes + list(self.mesh_parent.values())))
+
+    def trs_of(self, node):
+        i = self.dag_index[node] * 9
+        return self.trs[i:i + 9]
+
+    def is_visible(self, node):
+        return bool(self.visible[self.dag_index[node]])
+
+    def is_instanced(self, node):
+        return self.parent_counts[self.dag_index[node]] > 1
+
+
+def _mesh_fn(mesh):
+    sel = om.MSelectionList()
+    sel.add(mesh)
+    return om.MFnMesh(sel.getDagPath(0))
+
+
+def _query_dag(snap, nodes):
+    """
+    Reads TRS, visibility and parent counts of many DAG nodes in one OpenMaya
+    pass and appends them as rows of the snapshot DAG tables.
+    """
+    pending = [n for n in OrderedDict.fromkeys(nodes) if n not in snap.dag_index]
+    if not pending:
+        return
+    sel = om.MSelectionList()
+    for node in pending:
+        sel.add(node)
+
+    for i, node in enumerate(pending):
+        obj = sel.getDependNode(i)
+        if not obj.hasFn(om.MFn.kDagNode):
+            continue
+        fn = om.MFnDagNode(obj)
+        values = IDENTITY_TRS
+        is_transform = obj.hasFn(om.MFn.kTransform)
+        if is_transform:
+            xform = om.MFnTransform(obj)
+            t = xform.translation(om.MSpace.kTransform)
+            r = xform.rotation()
+            sx, sy, sz = xform.scale()
+            # getAttr devuelve la rotacion en grados; la tolerancia se sigue midiendo igual
+            values = (t.x, t.y, t.z, math.degrees(r.x), math.degrees(r.y), math.degrees(r.z), sx, sy, sz)
+
+        snap.dag_index[node] = len(snap.dag_nodes)
+        snap.dag_nodes.append(node)
+        snap.is_transform.append(is_transform)
+        snap.trs.extend(values)
+        snap.trs_deviation.append(max(max(abs(v) for v in values[:6]), max(abs(v - 1.0) for v in values[6:])))
+        snap.visible.append(fn.findPlug("visibility", False).asBool())
+        snap.parent_counts.append(fn.parentCount())
+
+
+def _gather_instances(snap, meshes):
+    _query_dag(snap, meshes)
+
+
+def _gather_topology(snap, meshes):
+    for mesh in meshes:
+        counts, indices = _mesh_fn(mesh).getVertices()
+        snap.topology[mesh] = (array('i', counts), array('i', indices))
+
+
+def _gather_points(snap, meshes):
+    for mesh in meshes:
+        # Un solo xform devuelve todas las posiciones como lista plana
+        snap.points[mesh] = array('d', mc.xform(mesh + ".vtx[*]", q=True, objectSpace=True, translation=True) or [])
+
+
+def _gather_face_sizes(snap, meshes):
+    gather(snap, ['topology'], meshes)
+    for mesh in meshes:
+        counts, indices = snap.topology[mesh]
+        histogram = {}
+        ngons = array('i')
+        tris = 0
+        for i, c in enumerate(counts):
+            histogram[c] = histogram.get(c, 0) + 1
+            tris += c - 2
+            if c > 4:
+                ngons.append(i)
+        snap.face_counts[mesh] = len(counts)
+        snap.tri_counts[mesh] = tris
+        snap.vertex_counts[mesh] = max(indices) + 1 if indices else 0
+        snap.face_sizes[mesh] = histogram
+        snap.ngon_faces[mesh] = ngons
+
+
+def _gather_trs(snap, nodes):
+    _query_dag(snap, nodes)
+
+
+def _gather_visibility(snap, meshes):
+    _query_dag(snap, [snap.mesh_parent[m] for m in meshes])
+
+
+def _gather_shading(snap, meshes):
+    for mesh in meshes:
+        shading_grps = mc.listConnections(mesh, type='shadingEngine') or []
+        # listConnections repite el SG por cada conexion de instObjGroups
+        snap.shading[mesh] = sorted(set(shading_grps))
+
+
+def _dg_inputs(snap, obj):
+    """
+    Non-DAG nodes connected to the inputs of `obj` (DAG nodes are pruned, like
+    pruneDagObjects). Layer membership plugs (NON_HISTORY_PLUGS) are not followed.
+    """
+    inputs = []
+    for plug in om.MFnDependencyNode(obj).getConnections():
+        if plug.partialName(useLongNames=True).split("[")[0] in NON_HISTORY_PLUGS:
+            continue
+        for source in plug.connectedTo(True, False):
+            src = source.node()
+            if src.hasFn(om.MFn.kDagNode):
+                continue
+            fn = om.MFnDependencyNode(src)
+            name = fn.name()
+            if name not in snap.node_types:
+                snap.node_types[name] = fn.typeName
+                snap.dg_objects[name] = src
+            inputs.append(name)
+    return inputs
+
+
+def _dg_closure(snap, root):
+    """Every DG node upstream of `root`, shared by all nodes whose history reaches it."""
+    if root in snap.dg_closure:
+        return snap.dg_closure[root]
+    found = set()
+    stack = [root]
+    while stack:
+        name = stack.pop()
+        if name in found:
+            continue
+        if name in snap.dg_closure:
+            found.update(snap.dg_closure[name])
+            continue
+        found.add(name)
+        if name not in snap.dg_inputs:
+            snap.dg_inputs[name] = _dg_inputs(snap, snap.dg_objects[name])
+        stack.extend(snap.dg_inputs[name])
+    snap.dg_closure[root] = found
+    return found
+
+
+def _gather_uvs(snap, meshes):
+    for mesh in meshes:
+        snap.uv_sets[mesh] = uv_analysis.read_uv_sets(mesh)
+
+
+def _gather_uv_analysis(snap, meshes):
+    gather(snap, ['topology', 'points', 'uvs'], meshes)
+    for mesh in meshes:
+        counts, indices = snap.topology[mesh]
+        snap.uv_reports[mesh] = OrderedDict(
+            (data.name, uv_analysis.analyze_uv_set(data, snap.points[mesh], counts, indices))
+            for data in snap.uv_sets[mesh])
+
+
+def _gather_fingerprint(snap, meshes):
+    gather(snap, ['topology', 'points'], meshes)
+    for mesh in meshes:
+        counts, indices = snap.topology[mesh]
+        snap.fingerprints[mesh] = geometry_fingerprint.fingerprint(counts, indices, snap.points[mesh])
+
+
+def _list_history(snap, nodes):
+    """
+    Walks the dependency graph upstream of the nodes (and of the shapes under
+    them) once, visiting every DG node at most one time for the whole selection.
+    """
+    pending = [n for n in OrderedDict.fromkeys(nodes) if n not in snap.history_nodes]
+    if not pending:
+        return
+    sel = om.MSelectionList()
+    for node in pending:
+        sel.add(node)
+
+    for i, node in enumerate(pending):
+        obj = sel.getDependNode(i)
+        starts = [obj]
+        if obj.hasFn(om.MFn.kDagNode):
+            fn = om.MFnDagNode(obj)
+            children = [fn.child(c) for c in range(fn.childCount())]
+            starts.extend(c for c in children if c.hasFn(om.MFn.kShape))
+        history = set()
+        for start in starts:
+            for root in _dg_inputs(snap, start):
+                history.update(_dg_closure(snap, root))
+        snap.history_nodes[node] = sorted(history)
+
+
+def _gather_history(snap, nodes):
+    # Los tipos salen del mismo recorrido: ningun nodo se tipa dos veces
+    _list_history(snap, nodes)
+    for node in nodes:
+        snap.history_types[node] = set(snap.node_types[h] for h in snap.history_nodes[node])
+
+
+def _gather_materials(snap, units):
+    snap.materials = mc.ls(materials=True) or []
+
+
+_GATHERERS = {
+    'instances': _gather_instances,
+    'topology': _gather_topology,
+    'points': _gather_points,
+    'face_sizes': _gather_face_sizes,
+    'trs': _gather_trs,
+    'visibility': _gather_visibility,
+    'shading': _gather_shading,
+    'history': _gather_history,
+    'materials': _gather_materials,
+    'uvs': _gather_uvs,
+    'uv_analysis': _gather_uv_analysis,
+    'fingerprint': _gather_fingerprint,
+}
+
+
+def gather(snap, inputs, units=None):
+    """
+    Gathers the given data kinds into an existing snapshot, skipping what was
+    already collected.
+
+    :param snap: SceneSnapshot to fill.
+    :param inputs: Names of the data kinds to gather (see INPUT_SCOPES).
+    :param units: Meshes/nodes to gather for. Defaults to every unit of each
+                  input's scope; ignored for scene-wide inputs.
+    """
+    if units is None and DAG_INPUTS.intersection(inputs):
+        # Una sola pasada de API para TRS, visibilidad e instancias de todo el snapshot
+        _query_dag(snap, snap.dag_units())
+
+    for name in inputs:
+        gatherer = _GATHERERS[name]
+        scope = INPUT_SCOPES[name]
+        targets = snap.units(scope) if units is None or scope == 'scene' else units
+        pending = [u for u in targets if (name, u) not in snap.gathered]
+        if not pending:
+            continue
+        gatherer(snap, pending)
+        snap.gathered.update((name, u) for u in pending)
+
+
+def digest_sources(inputs):
+    """Raw data kinds that identify the result of a check reading `inputs` (see DIGEST_SOURCES)."""
+    sources = []
+    for name in inputs:
+        for source in DIGEST_SOURCES.get(name, (name,)):
+            if source not in sources:
+                sources.append(source)
+    return tuple(sources)
+
+
+def _digest_data(snap, source, unit):
+    # Bytes de un dato crudo ya recolectado para una unidad
+    if source == 'topology':
+        counts, indices = snap.topology[unit]
+        return [counts, indices]
+    if source == 'points':
+        return [snap.points[unit]]
+    if source == 'uvs':
+        return [part for data in snap.uv_sets[unit]
+                for part in (data.name.encode('utf-8'), data.us, data.vs, data.uv_counts, data.uv_ids)]
+    if source == 'shading':
+        return [repr(snap.shading[unit]).encode('utf-8')]
+    if source == 'instances':
+        return [repr(snap.is_instanced(unit)).encode('utf-8')]
+    if source == 'visibility':
+        return [repr(snap.is_visible(snap.mesh_parent[unit])).encode('utf-8')]
+    if source == 'trs':
+        return [snap.trs_of(unit)] if unit in snap.dag_index else []
+    if source == 'history':
+        return [repr((snap.history_nodes[unit], sorted(snap.history_types[unit]))).encode('utf-8')]
+    raise ValueError("No digest for data kind '{}'".format(source))
+
+
+def unit_digests(snap, inputs, units):
+    """
+    Content hash of each mesh/node over the raw data a check reads (name
+    included), gathering only that data for `units`. Hashes are memoized in
+    snap.digests, so checks reading the same data share them.
+
+    :return: {unit: sha1 hex digest}
+    """
+    sources = digest_sources(inputs)
+    gather(snap, sources, units)
+    digests = OrderedDict()
+    for unit in units:
+        key = (sources, unit)
+        if key not in snap.digests:
+            h = hashlib.sha1(unit.encode('utf-8'))
+            for source in sources:
+                h.update(source.encode('utf-8'))
+                for part in _digest_data(snap, source, unit):
+                    h.update(part)
+            snap.digests[key] = h.hexdigest()
+        digests[unit] = snap.digests[key]
+    return digests
+
+
+def build_snapshot(selection=None, inputs=ALL_INPUTS):
+    """
+    Builds a SceneSnapshot for the given selection (current selection by default).
+
+    :param selection: Long names of the nodes to validate.
+    :param inputs: Names of the data kinds to gather (see INPUT_SCOPES).
+    :return: SceneSnapshot, or None if nothing is selected.
+    """
+    if selection is None:
+        selection = mc.ls(sl=True, long=True)
+    if not selection:
+        return None
+
+    meshes = mc.listRelatives(selection, allDescendents=True, type='mesh', fullPath=True) or []
+    snap = SceneSnapshot(selection, sorted(set(meshes)))
+    gather(snap, inputs)
+    return snap
@@ -0,0 +1,168 @@
+# -*- coding: utf-8 -*-
+# ma_texture_cache.py
+# Cache de texturas redimensionadas para componer capturas UV: cada textura
+# se decodifica y redimensiona una sola vez por resolucion destino, aunque la
+# usen varios UV sets o varios meshes del mismo batch.
+#
+# Clave: (ruta, mtime, tamano del archivo, ancho, alto), asi una textura
+# modificada en disco nunca devuelve la version vieja. En memoria durante la
+# corrida y, si hay carpeta configurada, tambien en disco entre corridas
+# (PNG sin filtros, que ma_image_ops decodifica rapido). Ambos niveles tienen
+# tope de bytes y desalojan por LRU.
+
+import os
+import hashlib
+from collections import OrderedDict
+
+import ma_image_ops as image_ops
+
+# Tope del nivel en memoria (una textura 1024x1024 RGBA son 4 MB)
+MEMORY_LIMIT = 256 * 1024 * 1024
+
+# Carpeta del nivel en disco; sin WAUR_TEXTURE_CACHE solo se cachea en memoria
+DISK_PATH = os.environ.get("WAUR_TEXTURE_CACHE") or None
+DISK_LIMIT = 2 * 1024 * 1024 * 1024
+
+DISK_EXTENSION = ".png"
+
+
+def texture_key(path, width, height):
+    """Cache key of a texture resized to width x height: (path, mtime, size, width, height)."""
+    path = os.path.normcase(os.path.abspath(path))
+    stat = os.stat(path)
+    return (path, stat.st_mtime, stat.st_size, width, height)
+
+
+class TextureCache(object):
+    """
+    Resized textures (ma_image_ops.Image, opaque) in memory with an optional
+    disk level, both LRU-evicted under a byte cap. Returned images are
+    shared: callers must not modify them (alpha_over already copies).
+    """
+
+    def __init__(self, memory_limit=MEMORY_LIMIT, disk_path=DISK_PATH, disk_limit=DISK_LIMIT):
+        self.memory_limit = memory_limit
+        self.disk_path = disk_path
+        self.disk_limit = disk_limit
+        self.images = OrderedDict()  # clave -> Image, de menos a mas reciente
+        self.memory_bytes = 0
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        if disk_path and not os.path.isdir(disk_path):
+            try:
+                os.makedirs(disk_path)
+            except Exception as e:
+                print("[WARNING] Could not create texture cache folder '{}': {}".format(disk_path, e))
+                self.disk_path = None
+
+    def get(self, path, width, height):
+        """
+        Texture `path` resized to width x height with alpha off, decoding and
+        resizing it only on a cache miss.
+
+        :return: ma_image_ops.Image
+        """
+        key = texture_key(path, width, height)
+        image = self.images.pop(key, None)
+        if image is not None:
+            self.hits += 1
+            self.images[key] = image
+            return image
+
+        image = self._read_disk(key)
+        if image is not None:
+            self.disk_hits += 1
+        else:
+            self.misses += 1
+            image = image_ops.set_opaque(image_ops.read_image(path, size=(width, height)))
+            self._write_disk(key, image)
+        self._remember(key, image)
+        return image
+
+    def _remember(self, key, image):
+        size = len(image.data)
+        if size > self.memory_limit:
+            return
+        self.images[key] = image
+        self.memory_bytes += size
+        while self.memory_bytes > self.memory_limit:
+            _, evicted = self.images.popitem(last=False)
+            self.memory_bytes -= len(evicted.data)
+
+    def clear(self):
+        self.images.clear()
+        self.memory_bytes = 0
+
+    # --- Nivel en disco ---
+
+    def _disk_file(self, key):
+        digest = hashlib.sha1(repr(key).encode("utf-8")).hexdigest()
+        return os.path.join(self.disk_path, digest + DISK_EXTENSION)
+
+    def _read_disk(self, key):
+        if not self.disk_path:
+            return None
+        path = self._disk_file(key)
+        if not os.path.isfile(path):
+            return None
+        try:
+            with open(path, "rb") as f:
+                image = image_ops.decode_png(f.read())
+            # Marcar como usado recientemente para el LRU del disco
+            os.utime(path, None)
+            return image
+        except Exception as e:
+            print("[WARNING] Ignoring unreadable cached texture '{}': {}".format(path, e))
+            return None
+
+    def _write_disk(self, key, image):
+        if not self.disk_path:
+            return
+        path = self._disk_file(key)
+        try:
+            image_ops.write_png(image, path)
+        except Exception as e:
+            print("[WARNING] Could not write cached texture '{}': {}".format(path, e))
+            return
+        self._evict_disk()
+
+    def _evict_disk(self):
+        entries = []
+        for name in os.listdir(self.disk_path):
+            if name.endswith(DISK_EXTENSION):
+                path = os.path.join(self.disk_path, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.disk_limit:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError as e:
+                print("[WARNING] Could not evict cached texture '{}': {}".format(path, e))
+
+    def stats(self):
+        return {"hits": self.hits, "disk_hits": self.disk_hits, "misses": self.misses,
+                "entries": len(self.images), "memory_bytes": self.memory_bytes}
+
+
+_default_cache = None
+
+
+def default_cache():
+    """Cache shared by everything running in this process."""
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = TextureCache()
+    return _default_cache
+
+
+def resized_texture(path, width, height):
+    """Texture `path` resized to width x height from the shared cache."""
+    return default_cache().get(path, width, height)
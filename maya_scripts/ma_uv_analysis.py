@@ -0,0 +1,221 @@
+# -*- coding: utf-8 -*-
+# ma_uv_analysis.py
+# Metricas numericas de UVs: shells, solapes, rango 0-1, UDIMs, uso del espacio y densidad de texel.
+#
+# Lee UVs e indices UV por cara en bloque (una llamada de API por UV set) y
+# hace una sola pasada por triangulo para todas las metricas. Lo usan los
+# checks de ma_model_profiler y el pipeline standalone de capturas UV.
+
+import math
+from array import array
+from collections import OrderedDict
+
+try:
+    import maya.api.OpenMaya as om
+except ImportError:
+    # Sin Maya solo se usan las funciones sobre arrays (ej. desde ma_mesh_container)
+    om = None
+
+from ma_mesh_integrity import polygon_area
+
+# Celdas por lado de cada tile UDIM en la grilla de cobertura (solapes y uso del espacio)
+COVERAGE_RESOLUTION = 256
+
+# Margen para no contar como fuera de tile a los UVs apoyados justo en el borde
+TILE_EPSILON = 1e-5
+
+
+class UVSetData(object):
+    """Bulk arrays of one UV set of a mesh."""
+
+    def __init__(self, name, us, vs, uv_counts, uv_ids, shell_ids, shell_count):
+        self.name = name
+        self.us = us                  # array('f') u por UV
+        self.vs = vs                  # array('f') v por UV
+        self.uv_counts = uv_counts    # array('i') UVs por cara (0 si la cara no tiene UVs)
+        self.uv_ids = uv_ids          # array('i') ids de UV, cara por cara
+        self.shell_ids = shell_ids    # array('i') shell de cada UV
+        self.shell_count = shell_count
+
+
+def read_uv_sets(mesh):
+    """
+    Reads every UV set of a mesh shape with one API call per array.
+
+    :param mesh: Long name of the mesh shape.
+    :return: list of UVSetData.
+    """
+    sel = om.MSelectionList()
+    sel.add(mesh)
+    fn = om.MFnMesh(sel.getDagPath(0))
+
+    uv_sets = []
+    for name in fn.getUVSetNames():
+        us, vs = fn.getUVs(name)
+        uv_counts, uv_ids = fn.getAssignedUVs(name)
+        shell_count, shell_ids = fn.getUvShellsIds(name)
+        uv_sets.append(UVSetData(name, array('f', us), array('f', vs), array('i', uv_counts),
+                                 array('i', uv_ids), array('i', shell_ids), shell_count))
+    return uv_sets
+
+
+def uv_shells(uv_counts, uv_ids, uv_count):
+    """
+    Shell id of each UV from the face-UV connectivity (union-find). Same
+    result as MFnMesh.getUvShellsIds, for UV data that does not come from Maya.
+
+    :return: (shell count, array('i') shell id per UV)
+    """
+    parent = array('i', range(uv_count))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    offset = 0
+    for c in uv_counts:
+        if c:
+            root = find(uv_ids[offset])
+            for k in range(offset + 1, offset + c):
+                other = find(uv_ids[k])
+                if other != root:
+                    parent[other] = root
+        offset += c
+
+    shell_ids = array('i', [0]) * uv_count
+    roots = {}
+    for i in range(uv_count):
+        shell_ids[i] = roots.setdefault(find(i), len(roots))
+    return len(roots), shell_ids
+
+
+def analyze_uv_set(data, points=None, counts=None, indices=None, resolution=COVERAGE_RESOLUTION):
+    """
+    Computes the UV metrics of one UV set in a single pass over its triangles.
+
+    :param data: UVSetData.
+    :param points: Optional flat xyz array of the mesh (object space), for texel density.
+    :param counts: Optional vertices per face, matching `points`.
+    :param indices: Optional vertex indices per face, matching `points`.
+    :param resolution: Coverage grid cells per UDIM tile side.
+    :return: OrderedDict with uv_set, uv_count, shell_count, overlapping_shells
+             ([[shell, shell], ...]), outside_uvs, straddling_faces, udims,
+             utilization (percentage of 0-1 covered), texel_density_mean and
+             texel_density_cv (area-weighted coefficient of variation).
+    """
+    us, vs, shell_ids = data.us, data.vs, data.shell_ids
+    with_3d = points is not None and counts is not None and indices is not None
+
+    outside = 0
+    for i in range(len(us)):
+        if us[i] < 0.0 or us[i] > 1.0 or vs[i] < 0.0 or vs[i] > 1.0:
+            outside += 1
+
+    coverage = {}     # celda -> shell que la cubrio primero
+    overlaps = set()
+    tiles = set()     # (tile u, tile v) usados por los centros de cara
+    floor = math.floor
+    straddling = 0
+    density_sum = density_sq_sum = weight_sum = 0.0
+
+    uv_offset = vtx_offset = 0
+    for face, c in enumerate(data.uv_counts):
+        face_uvs = data.uv_ids[uv_offset:uv_offset + c]
+        uv_offset += c
+        face_vtx = None
+        if with_3d:
+            n = counts[face]
+            face_vtx = indices[vtx_offset:vtx_offset + n]
+            vtx_offset += n
+        if c < 3:
+            continue
+
+        fu = [us[i] for i in face_uvs]
+        fv = [vs[i] for i in face_uvs]
+        cu = sum(fu) / c
+        cv = sum(fv) / c
+        tile_u, tile_v = floor(cu), floor(cv)
+        tiles.add((tile_u, tile_v))
+        shell = shell_ids[face_uvs[0]]
+        min_u, max_u, min_v, max_v = min(fu), max(fu), min(fv), max(fv)
+        if (min_u < tile_u - TILE_EPSILON or max_u > tile_u + 1 + TILE_EPSILON
+                or min_v < tile_v - TILE_EPSILON or max_v > tile_v + 1 + TILE_EPSILON):
+            straddling += 1
+
+        uv_area = 0.0
+        for k in range(1, c - 1):
+            # Abanico de triangulos desde el primer UV de la cara
+            u0, v0, u1, v1, u2, v2 = fu[0], fv[0], fu[k], fv[k], fu[k + 1], fv[k + 1]
+            area2 = (u1 - u0) * (v2 - v0) - (u2 - u0) * (v1 - v0)
+            uv_area += abs(area2) * 0.5
+            if area2 == 0.0:
+                continue
+            # Celdas cuyo centro cae dentro del triangulo (una cara menor que una celda
+            # marca a lo sumo una, y ninguna si no contiene un centro: shells vecinos no se tocan)
+            x0 = int(math.ceil(min(u0, u1, u2) * resolution - 0.5))
+            x1 = int(math.floor(max(u0, u1, u2) * resolution - 0.5))
+            y0 = int(math.ceil(min(v0, v1, v2) * resolution - 0.5))
+            y1 = int(math.floor(max(v0, v1, v2) * resolution - 0.5))
+            for y in range(y0, y1 + 1):
+                py = (y + 0.5) / resolution
+                for x in range(x0, x1 + 1):
+                    px = (x + 0.5) / resolution
+                    w0 = (u1 - px) * (v2 - py) - (u2 - px) * (v1 - py)
+                    w1 = (u2 - px) * (v0 - py) - (u0 - px) * (v2 - py)
+                    w2 = (u0 - px) * (v1 - py) - (u1 - px) * (v0 - py)
+                    if (w0 >= 0 and w1 >= 0 and w2 >= 0) or (w0 <= 0 and w1 <= 0 and w2 <= 0):
+                        owner = coverage.setdefault((x, y), shell)
+                        if owner != shell:
+                            overlaps.add((owner, shell) if owner < shell else (shell, owner))
+
+        if face_vtx is not None and len(face_vtx) == c:
+            area = polygon_area(points, face_vtx)
+            if area > 0.0:
+                density = math.sqrt(uv_area / area)
+                density_sum += density * area
+                density_sq_sum += density * density * area
+                weight_sum += area
+
+    covered = sum(1 for x, y in coverage if 0 <= x < resolution and 0 <= y < resolution)
+
+    report = OrderedDict()
+    report["uv_set"] = data.name
+    report["uv_count"] = len(us)
+    report["shell_count"] = data.shell_count
+    report["overlapping_shells"] = [list(pair) for pair in sorted(overlaps)]
+    report["outside_uvs"] = outside
+    report["straddling_faces"] = straddling
+    report["udims"] = sorted(1001 + int(u) + 10 * int(v) for u, v in tiles)
+    report["utilization"] = round(100.0 * covered / (resolution * resolution), 2)
+    report["texel_density_mean"] = None
+    report["texel_density_cv"] = None
+    if weight_sum > 0.0:
+        mean = density_sum / weight_sum
+        variance = max(density_sq_sum / weight_sum - mean * mean, 0.0)
+        report["texel_density_mean"] = mean
+        report["texel_density_cv"] = math.sqrt(variance) / mean if mean > 0.0 else 0.0
+    return report
+
+
+def analyze_mesh(mesh, points=None, counts=None, indices=None, resolution=COVERAGE_RESOLUTION, uv_sets=None):
+    """
+    UV report of every UV set of a mesh shape. Points, topology and UV sets
+    are read in bulk when not given.
+
+    :param mesh: Long name of the mesh shape.
+    :param uv_sets: UVSetData list of the shape, if already read.
+    :return: OrderedDict {uv set name: report} (see analyze_uv_set).
+    """
+    if points is None or counts is None or indices is None:
+        sel = om.MSelectionList()
+        sel.add(mesh)
+        fn = om.MFnMesh(sel.getDagPath(0))
+        counts, indices = [array('i', a) for a in fn.getVertices()]
+        points = array('d')
+        for p in fn.getPoints(om.MSpace.kObject):
+            points.extend((p.x, p.y, p.z))
+
+    return OrderedDict((data.name, analyze_uv_set(data, points, counts, indices, resolution))
+                       for data in (read_uv_sets(mesh) if uv_sets is None else uv_sets))
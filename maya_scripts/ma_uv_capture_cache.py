@@ -0,0 +1,143 @@
+# -*- coding: utf-8 -*-
+# ma_uv_capture_cache.py
+# Capturas UV incrementales: el manifest de la carpeta de salida guarda, por
+# (mesh, UV set, tile UV), un hash de las coordenadas y la topologia UV, el
+# hash de la textura y los parametros de render. En la corrida siguiente solo
+# se vuelve a renderizar lo que cambio de UVs o parametros y solo se vuelve a
+# componer lo que cambio de render o de textura.
+#
+# El hash de cada textura se reutiliza del manifest anterior mientras la ruta,
+# el mtime y el tamano del archivo sean los mismos (sin releer el archivo).
+
+import os
+import json
+import hashlib
+
+import ma_uv_raster
+
+# Bloques de lectura al hashear texturas
+HASH_CHUNK = 1024 * 1024
+
+
+def render_params(resolution, preview_levels=0):
+    """Every parameter that changes the rendered/composed images, as stored in the manifest."""
+    params = {
+        "resolution": resolution,
+        "preview_levels": preview_levels,
+        "line_color": ma_uv_raster.LINE_COLOR,
+        "line_width": ma_uv_raster.LINE_WIDTH,
+        "dense_line_density": ma_uv_raster.DENSE_LINE_DENSITY,
+        "fill_color": ma_uv_raster.SHELL_FILL_COLOR,
+    }
+    # Mismo formato que al leerlo del JSON (tuplas -> listas) para poder comparar
+    return json.loads(json.dumps(params))
+
+
+def uv_hash(uv_sets):
+    """
+    Hash of the UV coordinates and UV topology of a UV set group (the same
+    set on every shape of a transform).
+
+    :param uv_sets: list of ma_uv_analysis.UVSetData.
+    :return: sha1 hex digest.
+    """
+    digest = hashlib.sha1()
+    for data in uv_sets:
+        for values in (data.us, data.vs, data.uv_counts, data.uv_ids):
+            # El largo separa arrays vecinos: (a, bc) y (ab, c) no deben dar igual
+            digest.update(str(len(values)).encode("ascii") + b":")
+            digest.update(values)
+    return digest.hexdigest()
+
+
+def item_key(item):
+    """Identity of a manifest item across runs: (mesh, UV set, UV tile)."""
+    return (item["mesh"], item["uv_set"], tuple(item.get("tile") or (0, 0)))
+
+
+def file_hash(path):
+    """sha1 hex digest of a file's contents."""
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        chunk = f.read(HASH_CHUNK)
+        while chunk:
+            digest.update(chunk)
+            chunk = f.read(HASH_CHUNK)
+    return digest.hexdigest()
+
+
+class CaptureCache(object):
+    """
+    Decides, from the manifest of the previous run in an output folder,
+    which UV images have to be rendered and composed again.
+
+    Items are the manifest item dicts ("mesh", "uv_set", "enhanced",
+    "composed", "texture"); stamp() adds "uv_hash", "texture_hash" and
+    "texture_stat" to them.
+    """
+
+    def __init__(self, manifest_path, params, version, force=False):
+        self.params = params
+        self.previous = {}
+        self.texture_hashes = {}  # (ruta, mtime, tamano) -> hash
+        self.cached = 0
+        if force or not os.path.isfile(manifest_path):
+            return
+        try:
+            with open(manifest_path, "r") as f:
+                manifest = json.load(f)
+        except Exception as e:
+            print("[WARNING] Ignoring unreadable capture manifest '{}': {}".format(manifest_path, e))
+            return
+        if manifest.get("version") != version or manifest.get("params") != params:
+            print("[INFO] Capture parameters changed since the last run: every UV set will be rendered.")
+            return
+        for item in manifest.get("items", []):
+            self.previous[item_key(item)] = item
+            if item.get("texture_stat"):
+                self.texture_hashes[tuple(item["texture_stat"])] = item["texture_hash"]
+
+    def texture_hash(self, path):
+        """Hash and (path, mtime, size) stamp of a texture, hashing the file only when the stamp is new."""
+        stat = os.stat(path)
+        stamp = (os.path.normcase(os.path.abspath(path)), stat.st_mtime, stat.st_size)
+        if stamp not in self.texture_hashes:
+            self.texture_hashes[stamp] = file_hash(path)
+        return self.texture_hashes[stamp], list(stamp)
+
+    def stamp(self, item, uv_sets):
+        """Records the input hashes of an item (before it is rendered)."""
+        item["uv_hash"] = uv_hash(uv_sets)
+        item["texture_hash"] = item["texture_stat"] = None
+        if item["texture"]:
+            item["texture_hash"], item["texture_stat"] = self.texture_hash(item["texture"])
+
+    def plan(self, item):
+        """
+        :return: (render, compose): whether the enhanced PNG has to be
+                 rendered and whether the composed JPEG has to be composed.
+        """
+        previous = self.previous.get(item_key(item))
+        previews = list((item.get("previews") or {}).values())
+        render = (previous is None or previous.get("uv_hash") != item["uv_hash"]
+                  or previous.get("enhanced") != item["enhanced"] or not os.path.isfile(item["enhanced"])
+                  or previous.get("previews") != item.get("previews")
+                  or not all(os.path.isfile(path) for path in previews))
+        compose = bool(item["texture"]) and (
+            render or previous.get("texture_hash") != item["texture_hash"]
+            or previous.get("composed") != item["composed"] or not os.path.isfile(item["composed"]))
+        if not render and not compose:
+            self.cached += 1
+        return render, compose
+
+    def carried_items(self, items):
+        """
+        Items of the previous manifest that this run did not touch (other
+        meshes captured earlier into the same folder) whose files still exist.
+        """
+        current = set(item_key(item) for item in items)
+        carried = []
+        for key, item in self.previous.items():
+            if key not in current and item.get("enhanced") and os.path.isfile(item["enhanced"]):
+                carried.append(item)
+        return carried
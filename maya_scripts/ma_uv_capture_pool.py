@@ -0,0 +1,315 @@
+# -*- coding: utf-8 -*-
+# ma_uv_capture_pool.py
+# Pipeline paralelo de capturas UV: el render de cada (mesh, UV set) va a un
+# pool de procesos y la composicion sobre la textura a un segundo pool que
+# corre solapado con el primero. La sesion principal solo lee UVs de la
+# escena/bundle, encola trabajo y recoge resultados.
+#
+# La cantidad de items en vuelo esta acotada (cada uno lleva sus arrays de
+# UVs y una imagen en memoria) y cada item terminado se reporta por stdout
+# con una linea "@@PROGRESS {json}" que parsean las UIs. Las UIs cancelan
+# creando el archivo de cancelacion del job: el pipeline lo ve entre items.
+
+import os
+import sys
+import json
+import time
+import traceback
+import multiprocessing
+from array import array
+
+import ma_uv_analysis
+import ma_uv_raster
+import ma_uv_contact_sheet
+
+# Prefijo de las lineas de progreso en stdout (una linea JSON por item terminado)
+PROGRESS_PREFIX = "@@PROGRESS "
+
+# Items (render o composicion pendiente) en vuelo por worker de render
+IN_FLIGHT_PER_WORKER = 4
+
+# Los workers de composicion inicializan Maya (MImage para texturas y JPEG): pocos alcanzan
+DEFAULT_COMPOSE_WORKERS = 2
+
+
+class Cancelled(Exception):
+    """The cancel file of the job appeared: the capture stops at the next item."""
+
+
+def default_workers():
+    """Render workers: one per core, leaving one for the session that feeds them."""
+    try:
+        return max(1, multiprocessing.cpu_count() - 1)
+    except NotImplementedError:
+        return 1
+
+
+def _picklable(data):
+    # Los UV sets de un .wmesh pueden ser vistas sobre el mmap: copiar a arrays
+    return ma_uv_analysis.UVSetData(data.name, array('f', data.us), array('f', data.vs),
+                                    array('i', data.uv_counts), array('i', data.uv_ids),
+                                    array('i', data.shell_ids), data.shell_count)
+
+
+# ---------- Tareas (corren en los workers) ----------
+
+def render_task(uv_sets, resolution, output_path, tile=(0, 0), previews=None, thumbnail_size=None):
+    """
+    Renders one UV tile of a UV set group to its enhanced PNG (strip by
+    strip) and its preview PNGs ({size: path}).
+
+    :param thumbnail_size: When set, a reduced level of the same render (at
+                           least this size) is handed back for contact sheets.
+    :return: (path, seconds, thumbnail Image or None).
+    """
+    start = time.time()
+    previews = dict(previews or {})
+    size = ma_uv_contact_sheet.source_size(resolution, thumbnail_size) if thumbnail_size else None
+    if size:
+        previews.setdefault(size, None)
+    images = ma_uv_raster.write_uv_png(uv_sets, output_path, resolution, tuple(tile), previews)
+    return output_path, time.time() - start, images.get(size)
+
+
+def _init_compose_worker():
+    # MImage necesita Maya inicializado en el proceso del worker
+    try:
+        import maya.standalone
+        maya.standalone.initialize(name="python")
+    except Exception as e:
+        print("[WARNING] Compose worker could not initialize Maya: {}".format(e))
+
+
+def compose_task(enhanced_path, texture_path, output_path, resolution, thumbnail_size=None):
+    """
+    Composes an enhanced PNG over its texture.
+
+    :return: (output path or None, seconds, thumbnail Image or None, (pid,
+             texture cache stats of this process)): the composed image is
+             shrunk here, the full image never leaves the worker.
+    """
+    import ma_image_composer
+    start = time.time()
+    composed = ma_image_composer.compose_uv_image(enhanced_path, texture_path, output_path, resolution, resolution)
+    stats = (os.getpid(), ma_image_composer.texture_cache.default_cache().stats())
+    if composed is None:
+        return None, time.time() - start, None, stats
+    thumbnail = ma_uv_contact_sheet.shrink(composed, thumbnail_size) if thumbnail_size else None
+    return output_path, time.time() - start, thumbnail, stats
+
+
+# ---------- Pipeline (corre en la sesion principal) ----------
+
+class _SerialResult(object):
+    # Misma interfaz que AsyncResult para correr sin pool (workers <= 1)
+    def __init__(self, function, args):
+        try:
+            self.value, self.error = function(*args), None
+        except Exception:
+            self.value, self.error = None, traceback.format_exc()
+
+    def ready(self):
+        return True
+
+    def wait(self, timeout=None):
+        pass
+
+    def get(self):
+        if self.error:
+            raise RuntimeError(self.error)
+        return self.value
+
+
+class CapturePipeline(object):
+    """
+    Fans (mesh, UV set) items out to a render pool and, for items with a
+    texture, hands the rendered PNG to a compose pool as soon as it is ready.
+
+    Items are dicts with at least "mesh", "uv_set", "uv_sets" (list of
+    UVSetData), "enhanced" (output PNG), and optionally "tile" ((u, v) to
+    render), "previews" ({size: preview PNG}), "texture" and "composed"
+    (output JPEG). on_done(item) is called in this process for
+    every finished item, with "enhanced"/"composed" set to None on failure
+    and "error" set when a stage raised. With thumbnail_size, items also get
+    "thumbnail": a small Image of the last stage that ran (for
+    ma_uv_contact_sheet), which on_done should pop.
+
+    Progress lines report done/total against the items announced with
+    plan() (before submitting them), so the total does not grow while the
+    queue fills up.
+
+    When cancel_file exists, submit() and close() raise Cancelled; call
+    terminate() then. Items that did not finish keep their "uv_sets" key.
+    """
+
+    def __init__(self, resolution, workers=None, compose_workers=DEFAULT_COMPOSE_WORKERS,
+                 max_in_flight=None, on_done=None, cancel_file=None, thumbnail_size=None):
+        self.resolution = resolution
+        self.thumbnail_size = thumbnail_size
+        self.workers = default_workers() if workers is None else workers
+        self.compose_workers = compose_workers
+        self.max_in_flight = max_in_flight or max(1, self.workers) * IN_FLIGHT_PER_WORKER
+        self.on_done = on_done
+        self.cancel_file = cancel_file
+        self.pending = []  # [(stage, item, result)]
+        self.submitted = 0
+        self.done = 0
+        self.total = 0
+        self.planned = False
+        self.texture_stats = {}  # {pid: stats de la cache de texturas de ese proceso}
+        self.start = time.time()
+        self.render_pool = self.compose_pool = None
+        if self.workers > 1:
+            self.render_pool = multiprocessing.Pool(self.workers)
+
+    def _compose_pool(self):
+        # Se crea con la primera composicion: los batches sin textura no pagan la inicializacion de Maya
+        if self.compose_pool is None and self.render_pool is not None:
+            self.compose_pool = multiprocessing.Pool(max(1, self.compose_workers), initializer=_init_compose_worker)
+        return self.compose_pool
+
+    def _apply(self, pool, function, args):
+        if pool is None:
+            return _SerialResult(function, args)
+        return pool.apply_async(function, args)
+
+    def plan(self, count, final=False):
+        """
+        Adds `count` items (submitted or skipped later) to the progress total.
+
+        :param final: True when no more items will be planned after these:
+                      progress lines then report "planned": true.
+        """
+        self.total += count
+        self.planned = self.planned or final
+
+    def submit(self, item, render=True):
+        """
+        Queues one item, waiting first while the in-flight limit is reached.
+
+        :param render: False when item["enhanced"] is already up to date:
+                       only the composition is queued.
+        """
+        self._check_cancel()
+        while len(self.pending) >= self.max_in_flight:
+            self._collect(block=True)
+        self._count()
+        if render:
+            item["uv_sets"] = [_picklable(data) for data in item["uv_sets"]] if self.render_pool else item["uv_sets"]
+            previews = dict((int(size), path) for size, path in (item.get("previews") or {}).items())
+            args = (item["uv_sets"], self.resolution, item["enhanced"], item.get("tile", (0, 0)), previews,
+                    self.thumbnail_size)
+            result = self._apply(self.render_pool, render_task, args)
+            self.pending.append(("render", item, result))
+        else:
+            self._compose(item)
+        self._collect(block=False)
+
+    def skip(self, item):
+        """Reports an item whose outputs are all up to date (nothing is queued)."""
+        self._count()
+        item["cached"] = True
+        self._finish(item)
+
+    def _count(self):
+        # Items sin plan() previo suman al total al entrar (el total nunca queda por debajo de done)
+        self.submitted += 1
+        self.total = max(self.total, self.submitted)
+
+    def _compose(self, item):
+        args = (item["enhanced"], item["texture"], item["composed"], self.resolution, self.thumbnail_size)
+        self.pending.append(("compose", item, self._apply(self._compose_pool(), compose_task, args)))
+
+    def _check_cancel(self):
+        if self.cancel_file and os.path.exists(self.cancel_file):
+            raise Cancelled("Capture cancelled")
+
+    def _collect(self, block):
+        while True:
+            self._check_cancel()
+            finished = [entry for entry in self.pending if entry[2].ready()]
+            if finished or not block or not self.pending:
+                break
+            self.pending[0][2].wait(0.05)
+
+        for entry in finished:
+            self.pending.remove(entry)
+            stage, item, result = entry
+            try:
+                output = result.get()
+            except Exception as e:
+                output = (None, 0.0, None)
+                item["error"] = str(e)
+                print("[ERROR] {} failed for '{}' ({}): {}".format(stage.capitalize(), item["mesh"], item["uv_set"], e))
+            path, seconds, thumbnail = output[:3]
+            if stage == "compose" and len(output) > 3:
+                # Stats acumuladas del worker: la ultima de cada proceso es la vigente
+                self.texture_stats[output[3][0]] = output[3][1]
+            item["seconds"] = item.get("seconds", 0.0) + seconds
+            if thumbnail is not None:
+                item["thumbnail"] = thumbnail
+
+            if stage == "render":
+                item["enhanced"] = path
+                if path and item.get("texture"):
+                    self._compose(item)
+                    continue
+                item["composed"] = None
+            else:
+                item["composed"] = path
+            self._finish(item)
+
+    def _finish(self, item):
+        self.done += 1
+        item.pop("uv_sets", None)
+        item["seconds"] = round(item.get("seconds", 0.0), 3)
+        ok = bool(item["enhanced"]) and (not item.get("texture") or bool(item["composed"]))
+        print(PROGRESS_PREFIX + json.dumps({
+            "done": self.done, "total": self.total, "planned": self.planned, "mesh": item["mesh"],
+            "uv_set": item["uv_set"],
+            "udim": item.get("udim"),
+            "ok": ok, "cached": bool(item.get("cached")), "seconds": item["seconds"]}))
+        sys.stdout.flush()
+        if self.on_done:
+            self.on_done(item)
+
+    def texture_cache_stats(self):
+        """
+        Texture cache stats (ma_texture_cache.TextureCache.stats) summed over
+        every process that composed, or None when nothing was composed.
+        """
+        if not self.texture_stats:
+            return None
+        total = {}
+        for stats in self.texture_stats.values():
+            for key, value in stats.items():
+                total[key] = total.get(key, 0) + value
+        total["processes"] = len(self.texture_stats)
+        return total
+
+    def close(self):
+        """
+        Waits for every queued item and shuts the pools down. If waiting
+        raises (Cancelled, an interrupt...) the pools are terminated instead:
+        joining them would wait for the whole queue.
+        """
+        try:
+            while self.pending:
+                self._collect(block=True)
+        except BaseException:
+            self.terminate()
+            raise
+        for pool in (self.render_pool, self.compose_pool):
+            if pool is not None:
+                pool.close()
+                pool.join()
+        print("[INFO] {} UV image(s) processed in {:.1f}s with {} render worker(s).".format(
+            self.done, time.time() - self.start, max(1, self.workers)))
+
+    def terminate(self):
+        """Stops the pools without waiting for queued items (e.g. after an error)."""
+        for pool in (self.render_pool, self.compose_pool):
+            if pool is not None:
+                pool.terminate()
+                pool.join()
+        self.render_pool = self.compose_pool = None
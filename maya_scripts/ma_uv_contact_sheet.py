@@ -0,0 +1,242 @@
+# -*- coding: utf-8 -*-
+# ma_uv_contact_sheet.py
+# Hojas de contacto de una corrida de capturas UV: todas las capturas de cada
+# input (set de assets) en una o pocas imagenes con una miniatura rotulada
+# por (mesh, UV set, tile UDIM), para revisar sin abrir archivo por archivo.
+#
+# Las miniaturas salen de los buffers que ya estan en memoria: los workers de
+# render devuelven un nivel reducido del mismo pase de franjas y los de
+# composicion reducen la imagen compuesta antes de soltarla. Solo los items
+# al dia (que esta corrida no volvio a generar) se leen del disco.
+#
+# Los rotulos usan una fuente de mapa de bits 5x7 propia: no hay PIL en
+# mayapy 2018 y MImage no dibuja texto.
+
+import os
+import zlib
+
+import ma_image_ops as image_ops
+
+# Lado de cada miniatura (las capturas son cuadradas)
+DEFAULT_THUMBNAIL_SIZE = 256
+
+# Miniaturas por hoja: columnas x filas; un set con mas items sigue en otra hoja
+DEFAULT_COLUMNS = 8
+DEFAULT_ROWS = 8
+
+SHEET_SUFFIX = "_contact_sheet"
+
+BACKGROUND_COLOR = (48, 48, 48, 255)
+TEXT_COLOR = (230, 230, 230, 255)
+
+# Margen entre miniaturas y alrededor de la hoja
+PADDING = 8
+
+# Lineas de rotulo debajo de cada miniatura: mesh y "UV set UDIM"
+LABEL_LINES = 2
+
+# Fuente 5x7: 7 filas por glifo en hex, bit 4 = columna izquierda
+GLYPH_WIDTH = 5
+GLYPH_HEIGHT = 7
+FONT = {
+    "A": "0E11111F111111", "B": "1E11111E11111E", "C": "0E11101010110E", "D": "1E11111111111E",
+    "E": "1F10101E10101F", "F": "1F10101E101010", "G": "0E11101711110F",
+    "H": "1111111F111111", "I": "0E04040404040E", "J": "0702020202120C",
+    "K": "11121418141211", "L": "1010101010101F", "M": "111B1515111111", "N": "11111915131111",
+    "O": "0E11111111110E", "P": "1E11111E101010", "Q": "0E11111115120D", "R": "1E11111E141211",
+    "S": "0F10100E01011E", "T": "1F040404040404", "U": "1111111111110E", "V": "11111111110A04",
+    "W": "1111111515150A", "X": "11110A040A1111", "Y": "11110A04040404", "Z": "1F01020408101F",
+    "0": "0E11131519110E", "1": "040C040404040E", "2": "0E11010204081F",
+    "3": "1F02040201110E", "4": "02060A121F0202", "5": "1F101E0101110E", "6": "0608101E11110E",
+    "7": "1F010204080808", "8": "0E11110E11110E", "9": "0E11110F01020C",
+    " ": "00000000000000", "_": "0000000000001F", "-": "0000001F000000", ".": "00000000000C0C",
+    ":": "000C0C000C0C00", "(": "02040808080402", ")": "08040202020408", "/": "01010204081010",
+    "|": "04040404040404", "?": "0E110102040004",
+}
+
+
+def _glyph_rows(char):
+    glyph = FONT.get(char.upper(), FONT["?"])
+    return [int(glyph[i:i + 2], 16) for i in range(0, GLYPH_HEIGHT * 2, 2)]
+
+
+def label_scale(thumbnail_size):
+    """Pixel size of the label font for a thumbnail size (5x7 glyphs scaled 1x to 3x)."""
+    return max(1, min(3, thumbnail_size // 128))
+
+
+def source_size(resolution, thumbnail_size):
+    """
+    Smallest half, quarter... of a render resolution that is still at least
+    thumbnail_size: the in-memory level the render workers hand back.
+    """
+    size = resolution
+    while size % 2 == 0 and size // 2 >= thumbnail_size:
+        size //= 2
+    return size
+
+
+def shrink(image, thumbnail_size):
+    """Halves an Image (box filter) while it stays at least thumbnail_size on both sides."""
+    while image.width // 2 >= thumbnail_size and image.height // 2 >= thumbnail_size:
+        image = image_ops.half_size(image)
+    return image
+
+
+def _fill(width, height, color):
+    return image_ops.Image(width, height, bytearray(bytes(bytearray(color)) * (width * height)))
+
+
+def draw_text(image, text, x, y, scale, color=TEXT_COLOR, width=None):
+    """
+    Draws one line of text into an Image with the built-in 5x7 font.
+    Characters outside the font draw as "?"; text longer than `width`
+    pixels keeps its end (the most specific part of a DAG path).
+    """
+    advance = (GLYPH_WIDTH + 1) * scale
+    limit = max(1, (width or image.width - x) // advance)
+    if len(text) > limit:
+        text = ".." + text[-(limit - 2):] if limit > 2 else text[-limit:]
+    pixel = bytes(bytearray(color)) * scale
+    glyphs = [_glyph_rows(char) for char in text]
+    for glyph_row in range(GLYPH_HEIGHT):
+        bits = [glyph[glyph_row] for glyph in glyphs]
+        for repeat in range(scale):
+            row = y + glyph_row * scale + repeat
+            if not 0 <= row < image.height:
+                continue
+            base = row * image.stride
+            for index, value in enumerate(bits):
+                for column in range(GLYPH_WIDTH):
+                    if value & (0x10 >> column):
+                        left = x + index * advance + column * scale
+                        if 0 <= left and left + scale <= image.width:
+                            start = base + left * image_ops.CHANNELS
+                            image.data[start:start + len(pixel)] = pixel
+
+
+def paste(image, tile, x, y):
+    """Copies `tile` into `image` with its top-left corner at (x, y), row by row."""
+    length = tile.stride
+    for row in range(tile.height):
+        start = (y + row) * image.stride + x * image_ops.CHANNELS
+        image.data[start:start + length] = tile.data[row * length:(row + 1) * length]
+
+
+def item_labels(item):
+    """Label lines of a manifest item: mesh short name, then "UV set [UDIM]"."""
+    lines = [item["mesh"].split("|")[-1], item["uv_set"]]
+    if len(item.get("tiles") or []) > 1 and item.get("udim"):
+        lines[1] += " " + item["udim"]
+    return lines
+
+
+class ContactSheets(object):
+    """
+    Collects one thumbnail per finished capture item and writes, per job
+    input, labelled contact sheets of columns x rows thumbnails.
+
+    Thumbnails come from item["thumbnail"] (the in-memory image handed back by
+    the capture workers, see ma_uv_capture_pool); items that were up to date
+    read their smallest existing output from disk instead. Thumbnails are kept
+    zlib-compressed until write(), so a run of hundreds of items stays small.
+    """
+
+    def __init__(self, output_folder, thumbnail_size=DEFAULT_THUMBNAIL_SIZE,
+                 columns=DEFAULT_COLUMNS, rows=DEFAULT_ROWS):
+        self.output_folder = output_folder
+        self.thumbnail_size = thumbnail_size
+        self.columns = max(1, columns)
+        self.rows = max(1, rows)
+        self.scale = label_scale(thumbnail_size)
+        self.cells = {}  # input -> [(orden, rotulos, miniatura comprimida)]
+        self.background = _fill(thumbnail_size, thumbnail_size, BACKGROUND_COLOR)
+
+    def add(self, item):
+        """Adds the thumbnail of one finished item, popping item["thumbnail"]."""
+        thumbnail = item.pop("thumbnail", None)
+        if not item.get("enhanced"):
+            return
+        try:
+            if thumbnail is None:
+                thumbnail = self._read_thumbnail(item)
+            thumbnail = self._fit(thumbnail)
+        except Exception as e:
+            print("[WARNING] No contact sheet thumbnail for '{}' ({}): {}".format(item["mesh"], item["uv_set"], e))
+            return
+        tile = item.get("tile") or (0, 0)
+        order = (item["mesh"], item["uv_set"], tile[1], tile[0])
+        self.cells.setdefault(item.get("input") or "", []).append(
+            (order, item_labels(item), zlib.compress(bytes(thumbnail.data), 1)))
+
+    def _read_thumbnail(self, item):
+        # Items al dia: la salida mas chica que alcance (la compuesta es JPEG: necesita MImage)
+        size = self.thumbnail_size
+        candidates = []
+        if item.get("composed") and image_ops.om is not None:
+            candidates.append(item["composed"])
+        previews = sorted((int(level), path) for level, path in (item.get("previews") or {}).items())
+        candidates.extend(path for level, path in previews if level >= size)
+        candidates.append(item["enhanced"])
+        for path in candidates:
+            if os.path.isfile(path):
+                return image_ops.read_image(path, size=(size, size))
+        raise IOError("no output file found")
+
+    def _fit(self, image):
+        image = shrink(image, self.thumbnail_size)
+        if (image.width, image.height) != (self.thumbnail_size, self.thumbnail_size):
+            image = image_ops.resize(image, self.thumbnail_size, self.thumbnail_size)
+        # Las capturas sin componer son transparentes: aplanar sobre el fondo de la hoja
+        return image_ops.alpha_over(image, self.background)
+
+    def write(self):
+        """
+        Writes the contact sheets of every input: <input name>_contact_sheet.jpg,
+        numbered _01, _02... when an input needs more than one sheet (PNG
+        without Maya, which is needed to write JPEG).
+
+        :return: list of written sheet paths.
+        """
+        paths = []
+        per_sheet = self.columns * self.rows
+        for input_path in sorted(self.cells):
+            cells = sorted(self.cells[input_path], key=lambda cell: cell[0])
+            name = os.path.splitext(os.path.basename(input_path))[0] or "capture"
+            pages = [cells[i:i + per_sheet] for i in range(0, len(cells), per_sheet)]
+            for number, page in enumerate(pages, 1):
+                title = name if len(pages) == 1 else "{} ({}/{})".format(name, number, len(pages))
+                suffix = SHEET_SUFFIX if len(pages) == 1 else "{}_{:02d}".format(SHEET_SUFFIX, number)
+                extension = ".jpg" if image_ops.om is not None else ".png"
+                path = os.path.join(self.output_folder, name + suffix + extension)
+                try:
+                    sheet = self._render(title, page)
+                    if extension == ".jpg":
+                        image_ops.write_jpeg(sheet, path)
+                    else:
+                        image_ops.write_png(sheet, path)
+                except Exception as e:
+                    print("[ERROR] Could not write contact sheet '{}': {}".format(path, e))
+                    continue
+                print("[INFO] Contact sheet saved: {} ({} UV image(s))".format(path, len(page)))
+                paths.append(path)
+        return paths
+
+    def _render(self, title, cells):
+        size = self.thumbnail_size
+        line_height = (GLYPH_HEIGHT + 2) * self.scale
+        header = line_height + 2 * PADDING
+        cell_width = size + PADDING
+        cell_height = size + LABEL_LINES * line_height + PADDING
+        columns = min(self.columns, len(cells))
+        rows = (len(cells) + columns - 1) // columns
+        sheet = _fill(columns * cell_width + PADDING, header + rows * cell_height, BACKGROUND_COLOR)
+        draw_text(sheet, title, PADDING, PADDING, self.scale, width=sheet.width - 2 * PADDING)
+
+        for index, (_, labels, data) in enumerate(cells):
+            x = PADDING + (index % columns) * cell_width
+            y = header + (index // columns) * cell_height
+            paste(sheet, image_ops.Image(size, size, bytearray(zlib.decompress(data))), x, y)
+            for line, text in enumerate(labels):
+                draw_text(sheet, text, x, y + size + self.scale + line * line_height, self.scale, width=size)
+        return sheet
@@ -0,0 +1,392 @@
+# -*- coding: utf-8 -*-
+# ma_uv_raster.py
+# Rasterizador de UVs: dibuja los shells rellenos (semitransparentes) y las
+# aristas gruesas con antialiasing directo desde los arrays de UVs a una
+# imagen RGBA (ma_image_ops.Image), sin uvSnapshot ni ImageMagick.
+#
+# Da el mismo resultado que el uvSnapshot + enhance de antes (linea dilatada
+# con disco de 1.5 px, shells grises al 40%) con un solo render
+# por UV set. Python puro: los rellenos se escriben por tramos de fila y las
+# aristas solo recorren la banda de pixeles que tocan. En sets densos las
+# aristas se dibujan de 1 px y cada franja se dilata entera (SWAR), que sale
+# mas barato que la banda gruesa de cada arista corta.
+#
+# Resoluciones altas se renderizan por franjas de filas que van directo al
+# encoder PNG (memoria fija sin importar la resolucion), y de la misma pasada
+# salen previews a mitad, cuarto, etc. Los assets con UDIMs se renderizan un
+# tile por imagen.
+
+import math
+from collections import OrderedDict
+
+import ma_image_ops as image_ops
+
+# Color de las aristas (el verde que usaba uvSnapshot) y del relleno de shells (rgba(128,128,128,0.4))
+LINE_COLOR = (0, 255, 0)
+SHELL_FILL_COLOR = (128, 128, 128, 102)
+
+# Ancho de linea en pixeles: linea de 1 px + dilatacion con disco de radio 1.5 del enhance anterior
+LINE_WIDTH = 3.0
+
+# Largo total de las aristas (en pixeles) por pixel de imagen desde el que conviene dibujar lineas
+# de 1 px y dilatarlas por franja en vez de la banda gruesa: la banda cuesta por pixel de arista y
+# la dilatacion por pixel de imagen. Medido en mayapy 2018 con grillas de quads a 4096: con 0.012
+# la banda tarda 2.5s y las lineas finas 3.1s, con 0.024 4.9s y 4.3s, con 0.048 8.9s y 6.3s
+DENSE_LINE_DENSITY = 0.02
+
+# Filas por franja al escribir a disco: 256 filas de 8K RGBA son 8 MB (+2 MB de mascaras)
+STRIP_ROWS = 256
+
+# Tiles UDIM: 10 por fila de v, numerados desde 1001
+UDIM_COLUMNS = 10
+UDIM_BASE = 1001
+
+
+def _fill_triangle(mask, ones, width, row0, row1, ax, ay, bx, by, cx, cy):
+    # Ordenar por y: a arriba, c abajo
+    if ay > by:
+        ax, ay, bx, by = bx, by, ax, ay
+    if by > cy:
+        bx, by, cx, cy = cx, cy, bx, by
+        if ay > by:
+            ax, ay, bx, by = bx, by, ax, ay
+    if cy - ay < 1e-12:
+        return
+
+    # Filas de la franja [row0, row1) cuyo centro (y + 0.5) cae dentro del triangulo
+    y_start = max(row0, int(math.ceil(ay - 0.5)))
+    y_end = min(row1, int(math.ceil(cy - 0.5)))
+    long_slope = (cx - ax) / (cy - ay)
+    for y in range(y_start, y_end):
+        yc = y + 0.5
+        x_long = ax + (yc - ay) * long_slope
+        if yc < by:
+            x_short = ax + (yc - ay) * (bx - ax) / (by - ay)
+        elif cy > by:
+            x_short = bx + (yc - by) * (cx - bx) / (cy - by)
+        else:
+            x_short = bx
+        if x_long > x_short:
+            x_long, x_short = x_short, x_long
+        x0 = max(0, int(math.ceil(x_long - 0.5)))
+        x1 = min(width, int(math.ceil(x_short - 0.5)))
+        if x1 > x0:
+            row = (y - row0) * width
+            mask[row + x0:row + x1] = ones[:x1 - x0]
+
+
+def _draw_edge(coverage, width, row0, row1, x0, y0, x1, y1, radius):
+    # Cobertura de la banda a distancia <= radius del segmento, con 1 px de caida (antialiasing),
+    # solo en las filas de la franja [row0, row1)
+    extent = radius + 0.5
+    dx = x1 - x0
+    dy = y1 - y0
+    length2 = dx * dx + dy * dy
+    inv_length2 = 1.0 / length2 if length2 > 1e-12 else 0.0
+
+    # Recorrer el eje mayor y, en cada columna/fila, solo los pixeles de la banda
+    x_major = abs(dx) >= abs(dy)
+    if x_major:
+        m0, m1, n0, dm, dn = x0, x1, y0, dx, dy
+        m_low, m_high, n_low, n_high = 0, width - 1, row0, row1 - 1
+    else:
+        m0, m1, n0, dm, dn = y0, y1, x0, dy, dx
+        m_low, m_high, n_low, n_high = row0, row1 - 1, 0, width - 1
+    spread = extent * math.sqrt(1.0 + (dn / dm) ** 2) if abs(dm) > 1e-12 else extent
+
+    # Proyeccion sobre el segmento (t) y distancia a la recta son lineales en el eje menor
+    inv_length = math.sqrt(inv_length2)
+    t_step = dn * inv_length2
+    d_step = dm * inv_length
+    # Pixeles consecutivos del eje menor en memoria: width (columnas) o 1 (filas)
+    stride = width if x_major else 1
+
+    m_start = max(m_low, int(math.floor(min(m0, m1) - extent)))
+    m_end = min(m_high, int(math.floor(max(m0, m1) + extent)))
+    for m in range(m_start, m_end + 1):
+        center = m + 0.5
+        t = (center - m0) / dm if abs(dm) > 1e-12 else 0.0
+        t = 0.0 if t < 0.0 else (1.0 if t > 1.0 else t)
+        n_center = n0 + t * dn
+        n_start = max(n_low, int(n_center - spread))
+        n_end = min(n_high, int(n_center + spread))
+        t_base = (center - m0) * dm * inv_length2 - n0 * t_step
+        d_base = (center - m0) * dn * inv_length + n0 * d_step
+        base = m - row0 * width if x_major else (m - row0) * width
+        for n in range(n_start, n_end + 1):
+            pn = n + 0.5
+            t = t_base + pn * t_step
+            if 0.0 <= t <= 1.0:
+                distance = abs(d_base - pn * d_step)
+            else:
+                # Fuera del segmento: distancia al extremo mas cercano (punta redonda)
+                em, en = (m0, n0) if t < 0.0 else (m1, n0 + dn)
+                distance = math.sqrt((center - em) ** 2 + (pn - en) ** 2)
+            if distance < extent:
+                value = int(255 * min(1.0, extent - distance) + 0.5)
+                index = base + n * stride
+                if value > coverage[index]:
+                    coverage[index] = value
+
+
+def _draw_line(coverage, width, row0, row1, x0, y0, x1, y1):
+    # Linea de 1 px con antialiasing (Xiaolin Wu): en cada paso del eje mayor, los dos
+    # pixeles del eje menor mas cercanos a la recta, con peso segun la distancia. El peso
+    # va x1.5 (tope 255) para que, ya dilatada, una linea entre dos pixeles no se vea mas
+    # tenue que una centrada. Solo filas de la franja [row0, row1)
+    dx = x1 - x0
+    dy = y1 - y0
+    x_major = abs(dx) >= abs(dy)
+    if x_major:
+        m0, m1, n0, dm, dn = x0, x1, y0, dx, dy
+        m_low, m_high, n_low, n_high = 0, width - 1, row0, row1 - 1
+    else:
+        m0, m1, n0, dm, dn = y0, y1, x0, dy, dx
+        m_low, m_high, n_low, n_high = row0, row1 - 1, 0, width - 1
+    if m0 > m1:
+        m0, m1, n0, dm, dn = m1, m0, n0 + dn, -dm, -dn
+    slope = dn / dm if dm > 1e-12 else 0.0
+    # Pixeles consecutivos del eje menor en memoria: width (columnas) o 1 (filas)
+    stride = width if x_major else 1
+
+    m_start = max(m_low, int(math.floor(m0)))
+    m_end = min(m_high, int(math.floor(m1)))
+    for m in range(m_start, m_end + 1):
+        # Centro del pixel sobre el segmento (los extremos quedan en las puntas)
+        center = m + 0.5
+        center = m0 if center < m0 else (m1 if center > m1 else center)
+        position = n0 + (center - m0) * slope - 0.5
+        n = int(math.floor(position))
+        frac = position - n
+        near = int(min(1.0, 1.5 * (1.0 - frac)) * 255 + 0.5)
+        far = int(min(1.0, 1.5 * frac) * 255 + 0.5)
+        base = m - row0 * width if x_major else (m - row0) * width
+        if n_low <= n <= n_high:
+            index = base + n * stride
+            if near > coverage[index]:
+                coverage[index] = near
+        if n_low <= n + 1 <= n_high:
+            index = base + (n + 1) * stride
+            if far > coverage[index]:
+                coverage[index] = far
+
+
+def _primitives(uv_sets, width, height, tile, extent, strip_rows):
+    # Triangulos de relleno y aristas de todos los UV sets, repartidos por franja
+    # segun las filas que tocan: cada franja solo recorre lo suyo. Tambien el
+    # largo total de las aristas en pixeles
+    strips = (height + strip_rows - 1) // strip_rows
+    triangles = [[] for _ in range(strips)]
+    edges = [[] for _ in range(strips)]
+    edge_length = 0.0
+
+    def spread(bucket, item, top, bottom):
+        if strips == 1:
+            bucket[0].append(item)
+            return
+        first = max(0, int(top) // strip_rows)
+        last = min(strips - 1, int(bottom) // strip_rows)
+        for index in range(first, last + 1):
+            bucket[index].append(item)
+
+    for data in uv_sets:
+        xs = [(u - tile[0]) * width for u in data.us]
+        ys = [(1.0 - (v - tile[1])) * height for v in data.vs]
+
+        # Relleno de shells: triangulos en abanico de cada cara
+        unique_edges = set()
+        offset = 0
+        for count in data.uv_counts:
+            ids = data.uv_ids[offset:offset + count]
+            offset += count
+            if count < 3:
+                continue
+            a = ids[0]
+            for k in range(1, count - 1):
+                b, c = ids[k], ids[k + 1]
+                triangle = (xs[a], ys[a], xs[b], ys[b], xs[c], ys[c])
+                spread(triangles, triangle, min(ys[a], ys[b], ys[c]), max(ys[a], ys[b], ys[c]))
+            for k in range(count):
+                b, c = ids[k], ids[(k + 1) % count]
+                unique_edges.add((b, c) if b < c else (c, b))
+
+        # Aristas compartidas entre caras se dibujan una sola vez
+        for b, c in unique_edges:
+            edge = (xs[b], ys[b], xs[c], ys[c])
+            spread(edges, edge, min(ys[b], ys[c]) - extent, max(ys[b], ys[c]) + extent)
+            if max(xs[b], xs[c]) >= 0 and min(xs[b], xs[c]) < width and \
+                    max(ys[b], ys[c]) >= 0 and min(ys[b], ys[c]) < height:
+                edge_length += math.hypot(xs[c] - xs[b], ys[c] - ys[b])
+    return triangles, edges, edge_length
+
+
+def render_strips(uv_sets, resolution=1024, line_color=LINE_COLOR, fill_color=SHELL_FILL_COLOR,
+                  line_width=LINE_WIDTH, tile=(0, 0), strip_rows=None):
+    """
+    Renders the UVs of one or more UV sets strip by strip, top to bottom
+    (see render_uv_sets). Each strip is independent: only one is in memory
+    at a time, whatever the resolution.
+
+    :param strip_rows: Rows per strip (the whole image in one strip when None).
+    :return: Generator of ma_image_ops.Image strips, all `resolution` wide.
+    """
+    width = height = resolution
+    strip_rows = min(strip_rows or height, height)
+    radius = line_width * 0.5
+    triangles, edges, edge_length = _primitives(uv_sets, width, height, tile, radius + 1.0, strip_rows)
+    # Sets densos: lineas de 1 px dilatadas con un disco de radio line_width / 2 (el enhance
+    # de uvSnapshot) en vez de la banda gruesa (ver DENSE_LINE_DENSITY). La dilatacion mira
+    # `reach` filas vecinas: cada franja se dibuja con ese margen
+    thin = edge_length >= DENSE_LINE_DENSITY * width * height
+    reach = max(image_ops.disk_offsets(radius)) if thin else 0
+    ones = memoryview(b"\x01" * width)
+    color_rows = {}
+
+    for index, row0 in enumerate(range(0, height, strip_rows)):
+        row1 = min(height, row0 + strip_rows)
+        rows = row1 - row0
+        mask = bytearray(width * rows)
+        for triangle in triangles[index]:
+            _fill_triangle(mask, ones, width, row0, row1, *triangle)
+
+        top, bottom = max(0, row0 - reach), min(height, row1 + reach)
+        coverage = bytearray(width * (bottom - top))
+        for edge in edges[index]:
+            if thin:
+                _draw_line(coverage, width, top, bottom, edge[0], edge[1], edge[2], edge[3])
+            else:
+                _draw_edge(coverage, width, row0, row1, edge[0], edge[1], edge[2], edge[3], radius)
+        triangles[index] = edges[index] = None
+        if reach:
+            coverage = image_ops.dilate_mask(coverage, width, bottom - top, radius)[
+                (row0 - top) * width:(row1 - top) * width]
+
+        # Lineas (color fijo, alpha = cobertura) sobre el relleno de shells
+        shells = image_ops.recolor(mask, width, rows, {1: fill_color})
+        if rows not in color_rows:
+            color_rows[rows] = [bytearray([line_color[channel]]) * (width * rows) for channel in range(3)]
+        lines = image_ops.Image(width, rows)
+        for channel in range(3):
+            lines.data[channel::4] = color_rows[rows][channel]
+        lines.data[3::4] = coverage
+        yield image_ops.alpha_over(lines, shells)
+
+
+def render_uv_sets(uv_sets, resolution=1024, line_color=LINE_COLOR, fill_color=SHELL_FILL_COLOR,
+                   line_width=LINE_WIDTH, tile=(0, 0)):
+    """
+    Renders the UVs of one or more UV sets (e.g. the same set on every shape
+    of a transform) into one RGBA image: filled shells under antialiased edges.
+
+    :param uv_sets: list of ma_uv_analysis.UVSetData.
+    :param resolution: Width and height of the image (one UV tile).
+    :param line_color: (r, g, b) of the edges.
+    :param fill_color: (r, g, b, a) of the shell fill.
+    :param line_width: Edge width in pixels.
+    :param tile: (u, v) offset of the UV tile to render (0, 0 is the 0-1 range).
+    :return: ma_image_ops.Image
+    """
+    return next(render_strips(uv_sets, resolution, line_color, fill_color, line_width, tile))
+
+
+def preview_sizes(resolution, levels):
+    """Sizes of the preview levels of a render: half, quarter... (only the ones that divide evenly)."""
+    sizes = []
+    for level in range(1, levels + 1):
+        if resolution % (1 << level):
+            break
+        sizes.append(resolution >> level)
+    return sizes
+
+
+def write_uv_png(uv_sets, output_path, resolution=1024, tile=(0, 0), previews=None, strip_rows=STRIP_ROWS):
+    """
+    Renders UV sets (see render_uv_sets) straight to a PNG, strip by strip
+    through ma_image_ops.PngWriter, plus optional downsampled previews from
+    the same pass. Memory stays at a few strips whatever the resolution.
+
+    :param previews: {size: path} of the preview PNGs (sizes that halve the
+                     resolution evenly, e.g. from preview_sizes; a None path
+                     keeps that level in memory only).
+    :return: {size: ma_image_ops.Image} of the previews (kept in memory, they are small).
+    """
+    previews = previews or {}
+    # Cada nivel de preview divide la franja por 2: la franja tiene que ser multiplo de todos
+    step = resolution // min(previews) if previews else 1
+    strip_rows = max(step, strip_rows - strip_rows % step)
+    levels = sorted(previews, reverse=True)
+    images = dict((size, image_ops.Image(size, size)) for size in levels)
+    filled = dict((size, 0) for size in levels)
+
+    with image_ops.PngWriter(output_path, resolution, resolution) as writer:
+        for strip in render_strips(uv_sets, resolution, tile=tile, strip_rows=strip_rows):
+            writer.write(strip)
+            for size in levels:
+                while strip.width > size:
+                    strip = image_ops.half_size(strip)
+                start = filled[size] * images[size].stride
+                images[size].data[start:start + len(strip.data)] = strip.data
+                filled[size] += strip.height
+
+    for size in levels:
+        if previews[size]:
+            image_ops.write_png(images[size], previews[size])
+    return images
+
+
+def uv_tiles(uv_sets):
+    """
+    UV tiles used by the faces of UV sets (a face belongs to the tile of its
+    UV center), sorted in UDIM order.
+
+    :return: list of (u, v) tile offsets; [(0, 0)] for UVs inside 0-1.
+    """
+    tiles = set()
+    for data in uv_sets:
+        us, vs = data.us, data.vs
+        # Caso comun: todo dentro de 0-1, sin recorrer las caras
+        if len(us) and min(us) >= 0.0 and max(us) <= 1.0 and min(vs) >= 0.0 and max(vs) <= 1.0:
+            tiles.add((0, 0))
+            continue
+        offset = 0
+        for count in data.uv_counts:
+            ids = data.uv_ids[offset:offset + count]
+            offset += count
+            if count:
+                u = sum(us[i] for i in ids) / count
+                v = sum(vs[i] for i in ids) / count
+                tiles.add((int(math.floor(u)), int(math.floor(v))))
+    return sorted(tiles, key=lambda tile: (tile[1], tile[0])) or [(0, 0)]
+
+
+def udim_number(tile):
+    """UDIM number of a (u, v) tile (1001 for 0-1), or None outside the UDIM range."""
+    u, v = tile
+    if 0 <= u < UDIM_COLUMNS and v >= 0:
+        return UDIM_BASE + u + UDIM_COLUMNS * v
+    return None
+
+
+def tile_label(tile):
+    """File name label of a tile: its UDIM number, or 'u<u>_v<v>' outside the UDIM range."""
+    number = udim_number(tile)
+    return str(number) if number is not None else "u{}_v{}".format(tile[0], tile[1])
+
+
+def render_uv_set(data, resolution=1024, **kwargs):
+    """Renders one UV set (see render_uv_sets)."""
+    return render_uv_sets([data], resolution, **kwargs)
+
+
+def group_by_name(shape_uv_sets):
+    """
+    Groups the UV sets of several shapes by UV set name, in first-seen order.
+
+    :param shape_uv_sets: list of lists of UVSetData (one list per shape).
+    :return: OrderedDict {uv set name: [UVSetData]}
+    """
+    groups = OrderedDict()
+    for uv_sets in shape_uv_sets:
+        for data in uv_sets:
+            groups.setdefault(data.name, []).append(data)
+    return groups
@@ -5,151 +5,387 @@ import os
 import traceback
 import maya.standalone
 import maya.cmds as mc
-import ma_capture_uv  # Captura UV básica
-reload(ma_capture_uv)
-# Importamos el compositor con las dos funciones separadas
-import ma_image_composer  
-reload(ma_image_composer)
+import ma_capture_uv  # Render de UVs por UV set
+import ma_uv_analysis  # Metricas numericas de UVs
+import ma_uv_raster  # Render de UVs desde arrays
+import ma_mesh_container  # Bundles .wmesh: UVs sin abrir escena
+import ma_uv_capture_pool  # Render y composicion en pools de procesos
+import ma_uv_capture_cache  # Corridas incrementales: hashes de entradas en el manifest
+import ma_uv_contact_sheet  # Hojas de contacto por input para revisar la corrida
+import re
+import json
+import time
+from collections import OrderedDict
 
-# Opción para decidir si eliminar los PNG básicos después de la mejora
-DELETE_BASIC_PNG_AFTER_ENHANCE = True 
+# Manifest con todas las salidas de la carpeta de salida y los hashes de sus entradas
+MANIFEST_NAME = "uv_capture_manifest.json"
+MANIFEST_VERSION = 3
 
-def main():
-    print("[DEBUG] Script reached main()")
+DEFAULT_RESOLUTION = 1024
 
-    if len(sys.argv) < 4:
-        print("[ERROR] Expected arguments: <input_fbx_path> <output_folder> <texture_path_or_None>")
-        sys.exit(1)
+# Niveles de preview (mitad, cuarto...) que salen del mismo render
+DEFAULT_PREVIEW_LEVELS = 0
 
-    input_fbx = os.path.normpath(sys.argv[1])
-    output_folder = os.path.normpath(sys.argv[2])
-    texture_file_arg = sys.argv[3] # Puede ser una ruta o la cadena "None"
-
-    # Validar la ruta de textura SÓLO si no es "None"
-    texture_file = None
-    if texture_file_arg.lower() != "none":
-         norm_texture_path = os.path.normpath(texture_file_arg)
-         if os.path.isfile(norm_texture_path):
-              texture_file = norm_texture_path
-              print("[INFO] Valid texture file provided: {}".format(texture_file))
-         else:
-              print("[WARNING] Texture file specified but not found: {}".format(norm_texture_path))
-              print("[INFO] Composition will be skipped.")
-    else:
-         print("[INFO] No texture file provided ('None'). Composition will be skipped.")
+# Numero UDIM en el nombre de una textura (tex.1001.png, tex_1001.exr)
+UDIM_PATTERN = re.compile(r"(?<!\d)1\d{3}(?!\d)")
 
-    print("[INFO] Importing FBX: {}".format(input_fbx))
+# Valor de textura en un job: buscar la textura del shader de cada mesh en la escena
+AUTO_TEXTURE = "auto"
 
-    if not mc.pluginInfo("fbxmaya", query=True, loaded=True):
-        try:
-            mc.loadPlugin("fbxmaya")
-            print("[INFO] FBX plugin loaded.")
-        except Exception as e:
-            print("[ERROR] Could not load FBX plugin: {}".format(str(e)))
-            sys.exit(1) # Salir si no se puede cargar FBX
+SCENE_EXTENSIONS = (".ma", ".mb")
 
+def write_uv_report(mesh_transform, output_folder, descriptors, report=None):
+    """
+    Writes the numeric UV report (shells, overlaps, range, UDIMs, utilization,
+    texel density) of every mesh shape under a transform next to the snapshots.
+
+    :param descriptors: UVSetDescriptor list of the transform (UVs already read).
+    :param report: Precomputed {shape: analysis} (e.g. from a .wmesh bundle);
+                   computed from the descriptors and the scene when None.
+    """
+    if report is None:
+        # Los UVs vienen del descubrimiento: de la escena solo se leen puntos y topologia
+        shape_uv_sets = OrderedDict()
+        for descriptor in descriptors:
+            for shape, data in zip(descriptor.shapes or [], descriptor.uv_sets):
+                shape_uv_sets.setdefault(shape, []).append(data)
+        report = {}
+        for shape, uv_sets in shape_uv_sets.items():
+            try:
+                report[shape] = ma_uv_analysis.analyze_mesh(shape, uv_sets=uv_sets)
+            except Exception as e:
+                print("[WARNING] UV analysis failed for '{}': {}".format(shape, e))
+    if not report:
+        return None
+
+    safe_mesh_name = mesh_transform.replace("|", "_").replace(":", "_")
+    report_path = os.path.join(output_folder, "{}_uv_report.json".format(safe_mesh_name))
     try:
-        mc.file(input_fbx, i=True, type="FBX", ignoreVersion=True, ra=True,
+        with open(report_path, "w") as f:
+            json.dump(report, f, indent=2)
+        print("[INFO] UV report saved: {}".format(report_path))
+    except Exception as e:
+        print("[ERROR] Could not write UV report '{}': {}".format(report_path, e))
+        return None
+    return report_path
+
+def resolve_texture(value, mesh_transform=None):
+    """
+    Texture to compose with: an existing file path, the shader texture of
+    the mesh in the scene for AUTO_TEXTURE, or None ("None"/missing file).
+    """
+    if not value or value.lower() == "none":
+        return None
+    if value.lower() == AUTO_TEXTURE:
+        return ma_capture_uv.find_texture(mesh_transform) if mesh_transform else None
+    norm_texture_path = os.path.normpath(value)
+    if os.path.isfile(norm_texture_path):
+        return norm_texture_path
+    print("[WARNING] Texture file specified but not found: {}".format(norm_texture_path))
+    return None
+
+def tile_texture(texture_file, tile):
+    """
+    Texture to compose one UV tile over: the UDIM sibling of the texture
+    (tex.1001.png -> tex.1002.png) when it exists, the texture itself for the
+    0-1 tile of a non-UDIM texture, None otherwise.
+    """
+    if not texture_file:
+        return None
+    number = ma_uv_raster.udim_number(tile)
+    folder, name = os.path.split(texture_file)
+    matches = list(UDIM_PATTERN.finditer(name))
+    if matches and number is not None:
+        match = matches[-1]
+        sibling = os.path.join(folder, name[:match.start()] + str(number) + name[match.end():])
+        if os.path.isfile(sibling):
+            return sibling
+    return texture_file if tuple(tile) == (0, 0) else None
+
+def process_mesh(input_path, mesh_transform, descriptors, report, texture_file, output_folder, pipeline, cache, manifest):
+    """
+    Writes the UV report of one mesh and queues every UV tile of every UV set
+    (ma_capture_uv.UVSetDescriptor) on the capture pipeline (render, then
+    composition over the texture), skipping the outputs whose inputs did not
+    change since the last run (see ma_uv_capture_cache). Manifest items are
+    added here and filled in by the pipeline as they finish.
+    """
+    print("\n" + "-"*10 + " Processing Mesh: {}".format(mesh_transform) + "-"*10)
+
+    # --- PASO 1: Reporte numerico de UVs (JSON junto a las capturas) ---
+    report_path = write_uv_report(mesh_transform, output_folder, descriptors, report)
+
+    if not descriptors:
+        print("[WARNING] No UV sets found on object: {}".format(mesh_transform))
+        return
+    if not texture_file:
+        print("[INFO] Skipping composition for {} UV sets as no valid texture was provided.".format(len(descriptors)))
+
+    preview_sizes = ma_uv_raster.preview_sizes(cache.params["resolution"], cache.params["preview_levels"])
+
+    # --- PASO 2: Render UV mejorado (un item por tile UDIM) + composicion (condicional) en los workers ---
+    for descriptor in descriptors:
+        for tile in descriptor.tiles:
+            texture = tile_texture(texture_file, tile)
+            item = {
+                "input": input_path,
+                "mesh": mesh_transform,
+                "tile": list(tile),
+                "udim": ma_uv_raster.tile_label(tile),
+                "enhanced": descriptor.path(output_folder, ma_capture_uv.ENHANCED_SUFFIX, tile),
+                "previews": dict((str(size), descriptor.path(output_folder, ma_capture_uv.PREVIEW_SUFFIX.format(size), tile))
+                                 for size in preview_sizes),
+                "composed": descriptor.path(output_folder, ma_capture_uv.COMPOSED_SUFFIX, tile) if texture else None,
+                "texture": texture,
+                "report": report_path,
+            }
+            item.update(descriptor.info())
+            manifest["items"].append(item)
+            cache.stamp(item, descriptor.uv_sets)
+            render, compose = cache.plan(item)
+            if not render and not compose:
+                pipeline.skip(item)
+                continue
+            item["uv_sets"] = descriptor.uv_sets
+            pipeline.submit(item, render)
+
+def load_scene_input(input_path, first):
+    """
+    Brings a scene file into the standalone session: FBX is imported, .ma/.mb
+    opened. Every input after the first starts from an empty scene.
+
+    :return: Mesh transforms of the loaded scene (long names).
+    """
+    extension = os.path.splitext(input_path)[1].lower()
+    if not first:
+        mc.file(new=True, force=True)
+
+    if extension in SCENE_EXTENSIONS:
+        print("[INFO] Opening scene: {}".format(input_path))
+        mc.file(input_path, open=True, force=True, ignoreVersion=True, prompt=False)
+    else:
+        print("[INFO] Importing FBX: {}".format(input_path))
+        if not mc.pluginInfo("fbxmaya", query=True, loaded=True):
+            mc.loadPlugin("fbxmaya")
+            print("[INFO] FBX plugin loaded.")
+        mc.file(input_path, i=True, type="FBX", ignoreVersion=True, ra=True,
                 mergeNamespacesOnClash=False, options="fbx", pr=True)
         print("[INFO] FBX imported successfully.")
-    except Exception as e:
-        print("[ERROR] Failed to import FBX: {}".format(str(e)))
-        # Intentar continuar? O salir? Por ahora salimos si falla la importación.
-        sys.exit(1) 
 
-    meshes = mc.ls(type="mesh", long=True) or []
-    transforms = list(set(mc.listRelatives(meshes, parent=True, fullPath=True) or []))
+    # Escena nueva: el indice de texturas ("auto") se vuelve a armar en la primera busqueda
+    ma_capture_uv.reset_texture_index()
+    meshes = mc.ls(type="mesh", long=True, noIntermediate=True) or []
+    return sorted(set(mc.listRelatives(meshes, parent=True, fullPath=True) or []))
 
-    if not transforms:
-        print("[WARNING] No mesh transforms found in the imported FBX.")
-        # No necesariamente un error, podría ser un archivo vacío. Salir limpiamente.
-        sys.exit(0) 
+def is_bundle(job_input):
+    return job_input["path"].lower().endswith(ma_mesh_container.EXTENSION)
+
+def count_items(descriptors):
+    """Capture items of some UV sets: one per UV tile of each."""
+    return sum(len(descriptor.tiles) for descriptor in descriptors)
 
-    # --- Procesamiento por Malla ---
+def count_bundle_items(input_path):
+    """
+    Capture items of a .wmesh bundle, counted before capturing it so the
+    progress total is known up front (0 if the bundle cannot be read: the
+    capture reports the error).
+    """
+    try:
+        with ma_mesh_container.MeshContainer(os.path.normpath(input_path)) as container:
+            return sum(count_items(ma_capture_uv.describe_uv_sets(record.transform,
+                                                                  ma_uv_raster.group_by_name([record.uv_sets()])))
+                       for record in container.meshes)
+    except Exception:
+        return 0
+
+def process_input(job_input, first, output_folder, pipeline, cache, manifest, last_plan=False):
+    """
+    Captures every mesh of one job input: a .wmesh bundle (read straight from
+    the file, no scene needed) or an FBX/Maya scene loaded into the session.
+    Bundles are planned on the pipeline beforehand (count_bundle_items); the
+    items of a scene are planned once it is loaded, before submitting any.
+
+    :param job_input: {"path", "texture" (default for every mesh),
+                       "textures" ({transform: texture})}.
+    :param last_plan: True for the last scene input of the job (its plan completes the total).
+    """
+    input_path = os.path.normpath(job_input["path"])
+    default_texture = job_input.get("texture")
+    textures = job_input.get("textures") or {}
+
+    if is_bundle(job_input):
+        print("[INFO] Reading mesh bundle: {}".format(input_path))
+        with ma_mesh_container.MeshContainer(input_path) as container:
+            for record in container.meshes:
+                uv_sets = record.uv_sets()
+                points, counts, indices = record.points, record.counts, record.indices
+                report = {record.transform: dict((data.name, ma_uv_analysis.analyze_uv_set(data, points, counts, indices))
+                                                 for data in uv_sets)}
+                # Sin escena no hay shaders: "auto" no aplica a los bundles
+                texture_file = resolve_texture(textures.get(record.transform, default_texture))
+                descriptors = ma_capture_uv.describe_uv_sets(record.transform, ma_uv_raster.group_by_name([uv_sets]))
+                process_mesh(input_path, record.transform, descriptors, report,
+                             texture_file, output_folder, pipeline, cache, manifest)
+        return
+
+    transforms = load_scene_input(input_path, first)
+    if not transforms:
+        print("[WARNING] No mesh transforms found in: {}".format(input_path))
+        pipeline.plan(0, final=last_plan)
+        return
+    meshes = []
     for mesh_transform in transforms:
-        print("\n" + "-"*10 + " Processing Mesh: {}".format(mesh_transform) + "-"*10)
-        
-        # --- PASO 1: Captura UV Básica ---
-        resolution = 1024 # Definir resolución aquí
-        # ma_capture_uv ya crea la carpeta si no existe y maneja errores internos
-        ma_capture_uv.capture_all_uv_sets(mesh_transform, output_folder, resolution=resolution)
-
-        # --- PASO 2: Mejora de UV (Siempre) ---
-        # Necesitamos saber los UV sets para encontrar los PNGs básicos generados
         try:
-             uv_sets = mc.polyUVSet(mesh_transform, query=True, allUVSets=True) or []
+            meshes.append((mesh_transform, ma_capture_uv.discover_uv_sets(mesh_transform)))
         except Exception as e:
-             print("[ERROR] Could not query UV sets again for mesh '{}' to enhance. Skipping enhancement/composition. Error: {}".format(mesh_transform, e))
-             continue # Saltar al siguiente mesh
-
-        if not uv_sets:
-            print("[INFO] No UV sets found for mesh '{}' after capture. Nothing to enhance/compose.".format(mesh_transform))
-            continue # Saltar al siguiente mesh
-            
-        print("[INFO] Starting enhancement/composition phase for {} UV sets...".format(len(uv_sets)))
-
-        for uv_set in uv_sets:
-            print("--- Processing UV Set: {} ---".format(uv_set))
-            
-            # Construir nombres de archivo (coincidiendo con ma_capture_uv.py)
-            safe_mesh_name = mesh_transform.replace("|", "_").replace(":", "_")
-            safe_uv_set_name = uv_set.replace(":", "_").replace(" ", "_")
-            
-            basic_png_filename = "{}_{}_uv.png".format(safe_mesh_name, safe_uv_set_name)
-            basic_png_path = os.path.join(output_folder, basic_png_filename)
-            
-            # Definir nombre para el archivo mejorado
-            enhanced_png_filename = "{}_{}_enhanced_uv.png".format(safe_mesh_name, safe_uv_set_name)
-            enhanced_png_path = os.path.join(output_folder, enhanced_png_filename)
-
-            # Verificar si el PNG básico existe antes de intentar mejorarlo
-            if not os.path.isfile(basic_png_path):
-                 print("[WARNING] Basic UV snapshot '{}' not found. Cannot enhance/compose.".format(basic_png_path))
-                 continue # Saltar al siguiente UV set
-
-            # --- Llamada a la función de mejora (SIEMPRE) ---
-            enhancement_success = ma_image_composer.enhance_uv_snapshot(
-                basic_png_path, 
-                enhanced_png_path
-            )
-
-            if enhancement_success and DELETE_BASIC_PNG_AFTER_ENHANCE:
-                 try:
-                      os.remove(basic_png_path)
-                      print("[INFO] Deleted basic PNG: {}".format(basic_png_path))
-                 except Exception as e_del:
-                      print("[WARNING] Failed to delete basic PNG '{}': {}".format(basic_png_path, e_del))
-            elif not enhancement_success:
-                 print("[ERROR] Enhancement failed for {}. Composition will be skipped.".format(basic_png_path))
-                 continue # Saltar al siguiente UV set si la mejora falló
-
-            # --- PASO 3: Composición (Condicional) ---
-            # Comprobar si tenemos una ruta de textura válida Y la mejora fue exitosa
-            if texture_file and enhancement_success:
-                 composed_jpg_filename = "{}_{}_composed.jpg".format(safe_mesh_name, safe_uv_set_name)
-                 composed_jpg_path = os.path.join(output_folder, composed_jpg_filename)
-
-                 # --- Llamada a la función de composición ---
-                 ma_image_composer.compose_uv_over_texture(
-                      enhanced_png_path,   # Usar el PNG mejorado como entrada
-                      texture_file,
-                      composed_jpg_path,
-                      resolution,          # Pasar resolución para redimensionar textura
-                      resolution
-                 )
-            elif not texture_file:
-                print("[INFO] Skipping composition for UV set '{}' as no valid texture was provided.".format(uv_set))
-            # (El caso de enhancement_success == False ya se maneja arriba)
-
-
-    print("\n[SUCCESS] UV snapshot enhancement and optional composition completed for all meshes.")
+            print("[ERROR] Could not read UV sets for object '{}': {}".format(mesh_transform, e))
+            manifest["errors"].append({"input": input_path, "mesh": mesh_transform, "error": str(e)})
+    pipeline.plan(sum(count_items(descriptors) for _, descriptors in meshes), final=last_plan)
+    for mesh_transform, descriptors in meshes:
+        texture_file = resolve_texture(textures.get(mesh_transform, default_texture), mesh_transform)
+        process_mesh(input_path, mesh_transform, descriptors, None, texture_file, output_folder, pipeline, cache, manifest)
+
+def parse_arguments(argv):
+    """
+    Job of the run, from either form of the command line:
+
+        <input> <output_folder> <texture_path_or_None>
+        --job <job.json>
+
+    The job JSON is {"output_folder", "resolution", "preview_levels",
+    "workers", "compose_workers", "max_in_flight", "force", "cancel_file",
+    "contact_sheet", "inputs": [{"path", "texture", "textures"}]}; inputs
+    are .wmesh bundles, FBX or Maya scenes. "resolution" is per UV tile;
+    "preview_levels" adds half, quarter... size PNGs of every render. Worker
+    counts default to ma_uv_capture_pool's (workers <= 1 runs in-process);
+    "force" renders everything even if it is up to date; creating
+    "cancel_file" stops the run after the current item. "contact_sheet" is
+    {"thumbnail_size", "columns", "rows"} (ma_uv_contact_sheet defaults for
+    missing keys), or false for no contact sheets.
+    """
+    if len(argv) >= 3 and argv[1] == "--job":
+        with open(argv[2], "r") as f:
+            job = json.load(f)
+    elif len(argv) >= 4:
+        job = {"output_folder": argv[2], "inputs": [{"path": argv[1], "texture": argv[3]}]}
+    else:
+        print("[ERROR] Expected arguments: <input_path> <output_folder> <texture_path_or_None> | --job <job.json>")
+        sys.exit(1)
+    job["output_folder"] = os.path.normpath(job["output_folder"])
+    job.setdefault("resolution", DEFAULT_RESOLUTION)
+    job.setdefault("preview_levels", DEFAULT_PREVIEW_LEVELS)
+    job.setdefault("workers", ma_uv_capture_pool.default_workers())
+    job.setdefault("compose_workers", ma_uv_capture_pool.DEFAULT_COMPOSE_WORKERS)
+    job.setdefault("max_in_flight", None)
+    job.setdefault("force", False)
+    job.setdefault("cancel_file", None)
+    contact_sheet = job.get("contact_sheet", True)
+    if contact_sheet is not None and contact_sheet is not False:
+        contact_sheet = dict(contact_sheet) if isinstance(contact_sheet, dict) else {}
+        contact_sheet.setdefault("thumbnail_size", ma_uv_contact_sheet.DEFAULT_THUMBNAIL_SIZE)
+        contact_sheet.setdefault("columns", ma_uv_contact_sheet.DEFAULT_COLUMNS)
+        contact_sheet.setdefault("rows", ma_uv_contact_sheet.DEFAULT_ROWS)
+    job["contact_sheet"] = contact_sheet or None
+    return job
+
+def log_item(item):
+    # Llamado por el pipeline con cada item terminado (en este proceso)
+    # (la composicion ya reporta su propio resultado)
+    if item.get("cached"):
+        print("[INFO] Up to date, skipped: {}".format(item["enhanced"]))
+    elif item["enhanced"]:
+        print("[SUCCESS] Enhanced UV image saved: {}".format(item["enhanced"]))
+
+def write_manifest(output_folder, manifest):
+    manifest_path = os.path.join(output_folder, MANIFEST_NAME)
+    try:
+        with open(manifest_path, "w") as f:
+            json.dump(manifest, f, indent=2)
+        print("[INFO] Output manifest saved: {}".format(manifest_path))
+    except Exception as e:
+        print("[ERROR] Could not write output manifest '{}': {}".format(manifest_path, e))
+
+def main():
+    job = parse_arguments(sys.argv)
+    output_folder = job["output_folder"]
+    resolution = job["resolution"]
+    if not os.path.isdir(output_folder):
+        os.makedirs(output_folder)
+
+    params = ma_uv_capture_cache.render_params(resolution, job["preview_levels"])
+    cache = ma_uv_capture_cache.CaptureCache(os.path.join(output_folder, MANIFEST_NAME), params,
+                                             MANIFEST_VERSION, force=job["force"])
+    manifest = {"version": MANIFEST_VERSION, "created": time.time(), "resolution": resolution, "params": params,
+                "inputs": [job_input["path"] for job_input in job["inputs"]], "items": [], "errors": []}
+    start = time.time()
+
+    # --- Hojas de contacto: miniaturas de los buffers que devuelven los workers ---
+    sheets = None
+    if job["contact_sheet"]:
+        sheets = ma_uv_contact_sheet.ContactSheets(output_folder, job["contact_sheet"]["thumbnail_size"],
+                                                   job["contact_sheet"]["columns"], job["contact_sheet"]["rows"])
+
+    def on_done(item):
+        log_item(item)
+        if sheets:
+            sheets.add(item)
+
+    pipeline = ma_uv_capture_pool.CapturePipeline(resolution, job["workers"], job["compose_workers"],
+                                                  job["max_in_flight"], on_done=on_done,
+                                                  cancel_file=job["cancel_file"],
+                                                  thumbnail_size=sheets.thumbnail_size if sheets else None)
+    cancelled = False
+
+    # --- Total del progreso: los bundles se cuentan ahora, las escenas al cargarlas ---
+    scene_inputs = [index for index, job_input in enumerate(job["inputs"]) if not is_bundle(job_input)]
+    pipeline.plan(sum(count_bundle_items(job_input["path"]) for job_input in job["inputs"] if is_bundle(job_input)),
+                  final=not scene_inputs)
+
+    # --- Procesamiento por input: una sola sesion de Maya lee los UVs, los pools renderizan y componen ---
+    try:
+        for index, job_input in enumerate(job["inputs"]):
+            last_plan = bool(scene_inputs) and index == scene_inputs[-1]
+            try:
+                process_input(job_input, index == 0, output_folder, pipeline, cache, manifest, last_plan)
+            except ma_uv_capture_pool.Cancelled:
+                raise
+            except Exception as e:
+                # Un input que fallo antes de planear no deja el total abierto
+                pipeline.plan(0, final=last_plan)
+                print("[ERROR] Failed to process input '{}': {}".format(job_input.get("path"), e))
+                print(traceback.format_exc())
+                manifest["errors"].append({"input": job_input.get("path"), "error": str(e)})
+        pipeline.close()
+    except ma_uv_capture_pool.Cancelled:
+        pipeline.terminate()
+        cancelled = True
+        print("[WARNING] Capture cancelled: keeping only the UV sets that finished.")
+        # Los items sin terminar salen del manifest: la proxima corrida los rehace
+        manifest["items"] = [item for item in manifest["items"] if "uv_sets" not in item]
+    except BaseException:
+        pipeline.terminate()
+        raise
+
+    # Una corrida cancelada no reemplaza las hojas de la anterior
+    if sheets and not cancelled:
+        manifest["contact_sheets"] = sheets.write()
+
+    # Las salidas de corridas anteriores que esta no toco siguen en el manifest
+    items_count = len(manifest["items"])
+    manifest["items"].extend(cache.carried_items(manifest["items"]))
+    write_manifest(output_folder, manifest)
+    texture_stats = pipeline.texture_cache_stats()
+    if texture_stats:
+        print("[INFO] Texture cache: {}".format(texture_stats))
+
+    print("\n{}: {} UV image(s) ({} up to date) from {} input(s) in {:.1f}s ({} error(s)).".format(
+        "[WARNING] UV capture cancelled" if cancelled else "[SUCCESS] UV capture completed",
+        items_count, cache.cached, len(job["inputs"]), time.time() - start, len(manifest["errors"])))
 
 # --- Bloque main (sin cambios) ---
 if __name__ == "__main__":
     try:
-        print("[DEBUG] Initializing Maya Standalone...")
         maya.standalone.initialize(name="python")
-        print("[DEBUG] Maya Standalone Initialized.")
         main()
     except Exception as e:
         print("\n" + "="*20 + " STANDALONE SCRIPT CRASH " + "="*20)
@@ -163,9 +399,7 @@ if __name__ == "__main__":
         sys.exit(1) # Salir con código de error si el script principal falla
     finally:
         try:
-            print("[DEBUG] Uninitializing Maya Standalone...")
             maya.standalone.uninitialize()
-            print("[DEBUG] Maya Standalone Uninitialized.")
         except Exception as e_uninit:
              # Esto es menos crítico, pero bueno saberlo si falla
              print("[ERROR] Failed to uninitialize Maya Standalone: {}".format(e_uninit))
\ No newline at end of file
@@ -3,18 +3,38 @@ import sys
 import os
 import tempfile
 import uuid
-import subprocess # Necesario para llamar a mayapy
+import json
 import maya.cmds as mc
 import maya.mel as mel # Para obtener la ubicación de Maya
 from PySide2 import QtWidgets, QtGui, QtCore
 
+import ma_capture_uv # Busqueda de texturas por mesh
+import ma_mesh_container # Bundle .wmesh con todos los meshes de la seleccion
+import ma_uv_capture_pool # PROGRESS_PREFIX de las lineas de progreso del standalone
+
+# Salida del proceso: se junta y se vuelca al log cada LOG_FLUSH_INTERVAL ms
+LOG_FLUSH_INTERVAL = 100
+# Lineas que guarda el log (las mas viejas se descartan)
+LOG_MAX_LINES = 5000
+# Espera tras pedir la cancelacion antes de matar el proceso (ms)
+CANCEL_TIMEOUT = 10000
+
 class UVSnapshotTool(QtWidgets.QWidget):
     def __init__(self):
         super(UVSnapshotTool, self).__init__()
 
         # Ventana principal
         self.setWindowTitle("UV Snapshot Tool (Standalone Test Harness)")
-        self.setGeometry(300, 300, 500, 370) # Un poco más de alto para el checkbox
+        self.setGeometry(300, 300, 500, 400) # Un poco más de alto para el checkbox y el progreso
+
+        # Estado del proceso standalone en curso (QProcess, sin bloquear Maya)
+        self.process = None
+        self.job_path = None
+        self.cancel_path = None
+        self.temp_files = []
+        self.cancelled = False
+        self.output_buffer = ""   # Linea incompleta pendiente del proceso
+        self.pending_lines = []   # Lineas aun no volcadas al log
 
         # Layout
         self.layout = QtWidgets.QVBoxLayout()
@@ -24,35 +44,63 @@ class UVSnapshotTool(QtWidgets.QWidget):
         self.capture_button.clicked.connect(self.run_standalone_process)
         self.layout.addWidget(self.capture_button)
 
+        # Batch de archivos de escena (FBX/.ma/.mb) en una sola sesion standalone
+        self.scene_files_button = QtWidgets.QPushButton("Capture Scene Files...", self)
+        self.scene_files_button.clicked.connect(self.run_scene_files_process)
+        self.layout.addWidget(self.scene_files_button)
+
         # --- Checkbox Restaurado ---
         self.compose_checkbox = QtWidgets.QCheckBox("Compose with texture (if found)", self)
         self.compose_checkbox.setChecked(True) # Por defecto, intentar componer
         self.layout.addWidget(self.compose_checkbox)
         # ---------------------------
 
-        # Ventana de salida para logs
-        self.output_log = QtWidgets.QTextEdit(self)
+        # Progreso (lineas @@PROGRESS del standalone) y cancelacion
+        progress_layout = QtWidgets.QHBoxLayout()
+        self.progress_bar = QtWidgets.QProgressBar(self)
+        self.progress_bar.setRange(0, 1)
+        self.progress_bar.setValue(0)
+        self.progress_bar.setFormat("Idle")
+        progress_layout.addWidget(self.progress_bar)
+        self.cancel_button = QtWidgets.QPushButton("Cancel", self)
+        self.cancel_button.setEnabled(False)
+        self.cancel_button.clicked.connect(self.cancel_job)
+        progress_layout.addWidget(self.cancel_button)
+        self.layout.addLayout(progress_layout)
+
+        # Ventana de salida para logs: texto plano con tope de lineas
+        self.output_log = QtWidgets.QPlainTextEdit(self)
         self.output_log.setReadOnly(True)
-        self.output_log.setFontFamily("Consolas") 
+        self.output_log.setFont(QtGui.QFont("Consolas"))
+        self.output_log.setMaximumBlockCount(LOG_MAX_LINES)
         self.layout.addWidget(self.output_log)
 
+        self.flush_timer = QtCore.QTimer(self)
+        self.flush_timer.setInterval(LOG_FLUSH_INTERVAL)
+        self.flush_timer.timeout.connect(self.flush_log)
+        self.kill_timer = QtCore.QTimer(self)
+        self.kill_timer.setSingleShot(True)
+        self.kill_timer.timeout.connect(self.kill_job)
+
         self.setLayout(self.layout)
         
         # --- Búsqueda de mayapy y script (sin cambios) ---
         self.mayapy_path = self.find_mayapy()
         if not self.mayapy_path:
-             self.output_log.append("[CRITICAL ERROR] Could not find mayapy.exe. Standalone process cannot be launched.")
+             self.output_log.appendPlainText("[CRITICAL ERROR] Could not find mayapy.exe. Standalone process cannot be launched.")
              self.capture_button.setEnabled(False)
+             self.scene_files_button.setEnabled(False)
         else:
-             self.output_log.append("Found mayapy at: {}".format(self.mayapy_path))
+             self.output_log.appendPlainText("Found mayapy at: {}".format(self.mayapy_path))
              
         self.standalone_script_path = self.find_standalone_script()
         if not self.standalone_script_path:
-             self.output_log.append("[CRITICAL ERROR] Could not find ma_uvshot_capture_standalone.py.")
+             self.output_log.appendPlainText("[CRITICAL ERROR] Could not find ma_uvshot_capture_standalone.py.")
              if self.mayapy_path: 
                  self.capture_button.setEnabled(False)
+                 self.scene_files_button.setEnabled(False)
         else:
-             self.output_log.append("Found standalone script at: {}".format(self.standalone_script_path))
+             self.output_log.appendPlainText("Found standalone script at: {}".format(self.standalone_script_path))
 
 
     def find_mayapy(self):
@@ -71,8 +119,8 @@ class UVSnapshotTool(QtWidgets.QWidget):
                 mayapy = os.path.join(maya_location_mel, "bin", "mayapy.exe")
                 if os.path.isfile(mayapy): return os.path.normpath(mayapy)
         except Exception as e:
-            self.output_log.append("[ERROR] Error while searching for mayapy: {}".format(e))
-        self.output_log.append("[WARNING] Could not automatically determine mayapy.exe location.")
+            self.output_log.appendPlainText("[ERROR] Error while searching for mayapy: {}".format(e))
+        self.output_log.appendPlainText("[WARNING] Could not automatically determine mayapy.exe location.")
         return None
 
     def find_standalone_script(self):
@@ -86,7 +134,7 @@ class UVSnapshotTool(QtWidgets.QWidget):
             potential_path = os.path.join(current_script_dir, script_name)
             if os.path.isfile(potential_path): return os.path.normpath(potential_path)
         except:
-             self.output_log.append("[DEBUG] Could not determine current script directory reliably.")
+             self.output_log.appendPlainText("[DEBUG] Could not determine current script directory reliably.")
         maya_script_paths = os.environ.get('MAYA_SCRIPT_PATH', '').split(os.pathsep)
         for path in sys.path:
             if path and path not in maya_script_paths: maya_script_paths.append(path)
@@ -96,250 +144,321 @@ class UVSnapshotTool(QtWidgets.QWidget):
                 potential_path = os.path.join(path_dir, script_name)
                 if os.path.isfile(potential_path): return os.path.normpath(potential_path)
             except Exception as e: 
-                 self.output_log.append("[DEBUG] Error checking script path '{}': {}".format(path_dir, e))
-        self.output_log.append("[WARNING] Could not find '{}' in script paths.".format(script_name))
+                 self.output_log.appendPlainText("[DEBUG] Error checking script path '{}': {}".format(path_dir, e))
+        self.output_log.appendPlainText("[WARNING] Could not find '{}' in script paths.".format(script_name))
         return None
 
-    def run_standalone_process(self):
-        """
-        Prepara los argumentos y lanza ma_uvshot_capture_standalone.py 
-        usando mayapy.exe en un proceso separado.
-        """
-        self.output_log.clear()
-        
-        # Re-verificar rutas
+    def check_paths(self):
+        """Re-verifica mayapy y el script standalone. Devuelve False si falta alguno."""
         if not self.mayapy_path:
-            self.output_log.append("[ERROR] mayapy.exe path not found. Cannot proceed.")
+            self.output_log.appendPlainText("[ERROR] mayapy.exe path not found. Cannot proceed.")
             self.mayapy_path = self.find_mayapy()
-            if not self.mayapy_path: return 
-            self.output_log.append("Re-found mayapy at: {}".format(self.mayapy_path))
+            if not self.mayapy_path: return False
+            self.output_log.appendPlainText("Re-found mayapy at: {}".format(self.mayapy_path))
         if not self.standalone_script_path:
-            self.output_log.append("[ERROR] Standalone script path not found. Cannot proceed.")
+            self.output_log.appendPlainText("[ERROR] Standalone script path not found. Cannot proceed.")
             self.standalone_script_path = self.find_standalone_script()
-            if not self.standalone_script_path: return 
-            self.output_log.append("Re-found standalone script at: {}".format(self.standalone_script_path))
+            if not self.standalone_script_path: return False
+            self.output_log.appendPlainText("Re-found standalone script at: {}".format(self.standalone_script_path))
+        return True
+
+    def choose_output_folder(self):
+        output_folder_list = mc.fileDialog2(caption="Choose folder for Standalone Output", fileMode=3, okCaption="Select Folder")
+        if not output_folder_list:
+            self.output_log.appendPlainText("No folder selected. Cancelling.")
+            return None
+        output_folder = os.path.normpath(output_folder_list[0])
+        self.output_log.appendPlainText("Output folder: {}".format(output_folder))
+        return output_folder
 
-        # Selección
-        selection = mc.ls(selection=True, long=True, type='transform')
+    def selected_mesh_transforms(self):
+        """Transforms con mesh bajo la selección (objetos sueltos, grupos o jerarquías enteras)."""
+        selection = mc.ls(selection=True, long=True) or []
         if not selection:
-            self.output_log.append("[ERROR] No mesh selected. Please select one mesh object.")
+            return []
+        meshes = mc.listRelatives(selection, allDescendents=True, type='mesh', fullPath=True) or []
+        meshes += mc.ls(selection, type='mesh', long=True) or []
+        meshes = [m for m in set(meshes) if not mc.getAttr(m + ".intermediateObject")]
+        return sorted(set(mc.listRelatives(meshes, parent=True, fullPath=True) or []))
+
+    def run_standalone_process(self):
+        """
+        Exporta todos los meshes de la selección a un bundle .wmesh y lanza
+        ma_uvshot_capture_standalone.py una sola vez para todo el batch.
+        """
+        self.output_log.clear()
+        if not self.check_paths():
             return
-        mesh_transform = selection[0] 
-        shapes = mc.listRelatives(mesh_transform, shapes=True, type='mesh', fullPath=True)
-        if not shapes:
-             self.output_log.append("[ERROR] Selected object '{}' has no mesh shape.".format(mesh_transform))
-             return
 
-        # Carpeta de salida
-        output_folder_list = mc.fileDialog2(caption="Choose folder for Standalone Output", fileMode=3, okCaption="Select Folder")
-        if not output_folder_list:
-            self.output_log.append("No folder selected. Cancelling.")
+        # Selección: objetos, grupos o jerarquías; todos los meshes debajo
+        transforms = self.selected_mesh_transforms()
+        if not transforms:
+            self.output_log.appendPlainText("[ERROR] No mesh selected. Please select mesh objects or groups.")
             return
-        output_folder = os.path.normpath(output_folder_list[0])
-        self.output_log.append("Output folder: {}".format(output_folder))
+        self.output_log.appendPlainText("{} mesh(es) selected for capture.".format(len(transforms)))
 
-        # --- Exportar el mesh ---
-        self.output_log.append("Attempting to export mesh...")
-        # Cambiamos la lógica: exportamos primero, luego buscamos textura si es necesario
-        temp_fbx_path = self.export_mesh_to_fbx(mesh_transform) # Nueva función simplificada
-        
-        if not temp_fbx_path:
-            self.output_log.append("[ERROR] Failed to export mesh to temporary FBX. Aborting.")
+        output_folder = self.choose_output_folder()
+        if not output_folder:
             return
-        
-        # --- Obtener textura y decidir si pasarla ---
-        texture_path_to_pass = "None" # Valor por defecto si no se compone
-        should_compose = self.compose_checkbox.isChecked() # Leer el checkbox
-        
-        if should_compose:
-            self.output_log.append("Composition requested. Searching for texture...")
-            texture_file = self.get_texture_from_mesh(mesh_transform)
-            if texture_file:
-                 self.output_log.append("Texture found: {}".format(texture_file))
-                 texture_path_to_pass = texture_file # Usar la textura encontrada
-            else:
-                 self.output_log.append("[INFO] Composition requested, but no valid texture found. Will skip composition.")
-                 # texture_path_to_pass sigue siendo "None"
+
+        # --- Exportar todos los meshes en un solo bundle ---
+        bundle_path = self.export_bundle(transforms)
+        if not bundle_path:
+            self.output_log.appendPlainText("[ERROR] Failed to export meshes to a temporary bundle. Aborting.")
+            return
+
+        # --- Texturas por mesh (solo si se compone) ---
+        textures = {}
+        if self.compose_checkbox.isChecked():
+            self.output_log.appendPlainText("Composition requested. Searching for textures...")
+            # Indice de texturas de la escena: se arma una vez por corrida (la escena pudo cambiar desde la anterior)
+            ma_capture_uv.reset_texture_index()
+            for mesh_transform in transforms:
+                texture_file = self.get_texture_from_mesh(mesh_transform)
+                if texture_file:
+                    textures[mesh_transform] = texture_file
+            self.output_log.appendPlainText("Textures found for {} of {} mesh(es).".format(len(textures), len(transforms)))
         else:
-            self.output_log.append("Composition NOT requested.")
-            # texture_path_to_pass sigue siendo "None"
+            self.output_log.appendPlainText("Composition NOT requested.")
+
+        job = {"output_folder": output_folder,
+               "inputs": [{"path": bundle_path, "texture": "None", "textures": textures}]}
+        self.launch_job(job, [bundle_path])
+
+    def run_scene_files_process(self):
+        """
+        Captura los UVs de una lista de archivos de escena (FBX/.ma/.mb) en una
+        sola sesión standalone; las texturas se buscan en cada escena.
+        """
+        self.output_log.clear()
+        if not self.check_paths():
+            return
+
+        scene_files = mc.fileDialog2(caption="Choose scene files to capture", fileMode=4, okCaption="Capture",
+                                     fileFilter="Scenes (*.fbx *.ma *.mb);;All Files (*.*)")
+        if not scene_files:
+            self.output_log.appendPlainText("No scene files selected. Cancelling.")
+            return
+        output_folder = self.choose_output_folder()
+        if not output_folder:
+            return
+
+        texture = "auto" if self.compose_checkbox.isChecked() else "None"
+        job = {"output_folder": output_folder,
+               "inputs": [{"path": os.path.normpath(path), "texture": texture} for path in scene_files]}
+        self.launch_job(job, [])
+
+    def launch_job(self, job, temp_files):
+        """
+        Escribe el job JSON y lanza ma_uvshot_capture_standalone.py --job con
+        mayapy en un QProcess: la salida llega por señales, Maya sigue
+        respondiendo y el job se puede cancelar. Los temporales se borran al
+        terminar.
+        """
+        if self.process is not None:
+            self.output_log.appendPlainText("[WARNING] A capture is already running.")
+            for temp_file in temp_files:
+                self.remove_temp_file(temp_file)
+            return
+
+        unique_id = uuid.uuid4().hex
+        temp_dir = tempfile.gettempdir()
+        self.job_path = os.path.normpath(os.path.join(temp_dir, "uvshot_job_{}.json".format(unique_id)))
+        # El standalone se detiene en el siguiente UV set cuando aparece este archivo
+        self.cancel_path = os.path.normpath(os.path.join(temp_dir, "uvshot_cancel_{}".format(unique_id)))
+        self.temp_files = list(temp_files) + [self.job_path, self.cancel_path]
+        job["cancel_file"] = self.cancel_path
+        try:
+            with open(self.job_path, "w") as f:
+                json.dump(job, f, indent=2)
+        except Exception as e:
+            self.output_log.appendPlainText("[ERROR] Could not write job file '{}': {}".format(self.job_path, e))
+            self.cleanup_temp_files()
+            return
 
         # --- Preparar y ejecutar el proceso standalone ---
-        self.output_log.append("\n--- Starting Standalone Process ---")
-        self.output_log.append("Using script: {}".format(self.standalone_script_path))
-        self.output_log.append("FBX Input: {}".format(temp_fbx_path))
-        self.output_log.append("Output Folder: {}".format(output_folder))
-        self.output_log.append("Texture Input (to standalone): {}".format(texture_path_to_pass)) # Mostrar lo que se pasa
+        self.output_log.appendPlainText("\n--- Starting Standalone Process ---")
+        self.output_log.appendPlainText("Using script: {}".format(self.standalone_script_path))
+        self.output_log.appendPlainText("Inputs: {}".format(len(job["inputs"])))
+        self.output_log.appendPlainText("Output Folder: {}".format(job["output_folder"]))
 
         # Construir el comando
-        command = [
-            self.mayapy_path,
-            self.standalone_script_path,
-            temp_fbx_path,
-            output_folder,
-            texture_path_to_pass # Pasar la ruta o "None"
-        ]
+        arguments = [self.standalone_script_path, "--job", self.job_path]
+        formatted_command = " ".join(['"{}"'.format(c) if ' ' in c else c for c in [self.mayapy_path] + arguments])
+        self.output_log.appendPlainText("Executing command: {}".format(formatted_command))
+        self.output_log.appendPlainText("\n--- Standalone Script Output ---")
+
+        self.process = QtCore.QProcess(self)
+        self.process.setProcessChannelMode(QtCore.QProcess.MergedChannels)
+        # Sin buffer en el hijo: las lineas de progreso llegan en cuanto se imprimen
+        environment = QtCore.QProcessEnvironment.systemEnvironment()
+        environment.insert("PYTHONUNBUFFERED", "1")
+        self.process.setProcessEnvironment(environment)
+        self.process.readyReadStandardOutput.connect(self.read_process_output)
+        self.process.finished.connect(self.process_finished)
+        self.process.errorOccurred.connect(self.process_error)
+
+        self.cancelled = False
+        self.output_buffer = ""
+        self.pending_lines = []
+        self.progress_bar.setRange(0, 0)  # Indeterminado hasta el primer @@PROGRESS
+        self.progress_bar.setFormat("Starting...")
+        self.set_running(True)
+        self.flush_timer.start()
+        self.process.start(self.mayapy_path, arguments)
+
+    def read_process_output(self):
+        data = self.process.readAllStandardOutput().data()
+        lines = (self.output_buffer + data.decode("utf-8", "replace")).split("\n")
+        self.output_buffer = lines.pop()
+        for line in lines:
+            self.handle_output_line(line.rstrip("\r"))
 
-        formatted_command = " ".join(['"{}"'.format(c) if ' ' in c else c for c in command])
-        self.output_log.append("Executing command: {}".format(formatted_command))
+    def handle_output_line(self, line):
+        # Las lineas de progreso van a la barra, no al log
+        if line.startswith(ma_uv_capture_pool.PROGRESS_PREFIX):
+            try:
+                progress = json.loads(line[len(ma_uv_capture_pool.PROGRESS_PREFIX):])
+            except ValueError:
+                self.pending_lines.append(line)
+                return
+            # Hasta que el standalone cargo todas las escenas el total no es final: barra indeterminada
+            planned = progress.get("planned", True)
+            self.progress_bar.setRange(0, progress["total"] if planned else 0)
+            self.progress_bar.setValue(progress["done"])
+            uv_set = progress["uv_set"] if not progress.get("udim") else "{} {}".format(progress["uv_set"], progress["udim"])
+            self.progress_bar.setFormat("{}/{}{} {} ({}){}".format(
+                progress["done"], progress["total"], "" if planned else "+", progress["mesh"].split("|")[-1], uv_set,
+                " cached" if progress.get("cached") else ""))
+            return
+        self.pending_lines.append(line)
 
+    def flush_log(self):
+        # Un solo bloque de texto por intervalo, y nunca mas lineas de las que el log guarda
+        if not self.pending_lines:
+            return
+        lines = self.pending_lines[-LOG_MAX_LINES:]
+        self.pending_lines = []
+        self.output_log.appendPlainText("\n".join(lines))
+
+    def cancel_job(self):
+        """Pide al standalone que se detenga; si no termina a tiempo se mata el proceso."""
+        if self.process is None or self.cancelled:
+            return
+        self.cancelled = True
+        self.cancel_button.setEnabled(False)
+        self.progress_bar.setFormat("Cancelling...")
         try:
-            # --- Ejecución de subprocess (sin cambios) ---
-            startupinfo = None
-            if os.name == 'nt': 
-                 startupinfo = subprocess.STARTUPINFO()
-                 startupinfo.dwFlags |= subprocess.STARTF_USESHOWWINDOW
-                 startupinfo.wShowWindow = subprocess.SW_HIDE 
-            process = subprocess.Popen(
-                command, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, 
-                startupinfo=startupinfo, bufsize=1, universal_newlines=True 
-            )
-            self.output_log.append("\n--- Standalone Script Output ---")
-            while True:
-                line = process.stdout.readline()
-                if not line: break
-                self.output_log.insertPlainText(line) 
-                self.output_log.moveCursor(QtGui.QTextCursor.End) 
-                QtWidgets.QApplication.processEvents() 
-            process.wait() 
-            self.output_log.append("------------------------------")
-            if process.returncode == 0:
-                self.output_log.append("--- Standalone Process Completed Successfully ---")
-            else:
-                self.output_log.append("\n[ERROR] --- Standalone Process Failed (Return Code: {}) ---".format(process.returncode))
+            open(self.cancel_path, "w").close()
         except Exception as e:
-            self.output_log.append("\n[CRITICAL ERROR] Failed to execute standalone process:")
-            import traceback
-            self.output_log.append(traceback.format_exc())
-        finally:
-            # --- Limpieza del FBX temporal (sin cambios) ---
-            if temp_fbx_path and os.path.exists(temp_fbx_path):
-                try:
-                    os.remove(temp_fbx_path)
-                    self.output_log.append("Cleaned up temporary FBX: {}".format(temp_fbx_path))
-                except Exception as e:
-                    self.output_log.append("[WARNING] Could not delete temporary FBX file '{}': {}".format(temp_fbx_path, e))
-
-    # --- Función de Exportación Simplificada ---
-    def export_mesh_to_fbx(self, mesh_transform):
+            self.output_log.appendPlainText("[WARNING] Could not write cancel file '{}': {}".format(self.cancel_path, e))
+            self.kill_job()
+            return
+        self.kill_timer.start(CANCEL_TIMEOUT)
+
+    def kill_job(self):
+        if self.process is not None and self.process.state() != QtCore.QProcess.NotRunning:
+            self.pending_lines.append("[WARNING] Standalone process did not stop in time. Killing it.")
+            self.process.kill()
+
+    def process_error(self, error):
+        # FailedToStart no emite finished: cerrar aca; el resto lo cierra process_finished
+        if error == QtCore.QProcess.FailedToStart:
+            self.pending_lines.append("\n[CRITICAL ERROR] Failed to start standalone process: {}".format(
+                self.process.errorString()))
+            self.finish_job("Failed to start")
+
+    def process_finished(self, exit_code, exit_status=QtCore.QProcess.NormalExit):
+        if self.output_buffer:
+            self.handle_output_line(self.output_buffer)
+            self.output_buffer = ""
+        self.pending_lines.append("------------------------------")
+        if self.cancelled:
+            self.pending_lines.append("--- Standalone Process Cancelled ---")
+            status = "Cancelled"
+        elif exit_status == QtCore.QProcess.NormalExit and exit_code == 0:
+            self.pending_lines.append("--- Standalone Process Completed Successfully ---")
+            status = "Done"
+        else:
+            self.pending_lines.append("\n[ERROR] --- Standalone Process Failed (Return Code: {}) ---".format(exit_code))
+            status = "Failed"
+        self.finish_job(status)
+
+    def finish_job(self, status):
+        self.kill_timer.stop()
+        self.flush_timer.stop()
+        self.flush_log()
+        if self.process is not None:
+            self.process.deleteLater()
+            self.process = None
+        # Salir del modo indeterminado si nunca llego un @@PROGRESS
+        if self.progress_bar.maximum() == 0:
+            self.progress_bar.setRange(0, 1)
+        self.progress_bar.setFormat("{}: %v/%m UV image(s)".format(status))
+        self.cleanup_temp_files()
+        self.set_running(False)
+
+    def cleanup_temp_files(self):
+        # --- Limpieza de temporales (bundle, job y archivo de cancelacion) ---
+        for temp_file in self.temp_files:
+            self.remove_temp_file(temp_file)
+        self.temp_files = []
+
+    def remove_temp_file(self, temp_file):
+        if temp_file and os.path.exists(temp_file):
+            try:
+                os.remove(temp_file)
+                self.output_log.appendPlainText("Cleaned up temporary file: {}".format(temp_file))
+            except Exception as e:
+                self.output_log.appendPlainText("[WARNING] Could not delete temporary file '{}': {}".format(temp_file, e))
+
+    def set_running(self, running):
+        self.capture_button.setEnabled(not running)
+        self.scene_files_button.setEnabled(not running)
+        self.cancel_button.setEnabled(running)
+
+    def closeEvent(self, event):
+        # Cerrar la ventana no deja un mayapy huerfano
+        if self.process is not None:
+            self.cancelled = True
+            self.process.kill()
+            self.process.waitForFinished(CANCEL_TIMEOUT)
+        super(UVSnapshotTool, self).closeEvent(event)
+
+    # --- Exportación del bundle ---
+    def export_bundle(self, transforms):
         """
-        Exporta el mesh seleccionado a un archivo FBX temporal.
-        Devuelve ruta_fbx_temporal o None en caso de fallo.
+        Exporta los meshes a un único .wmesh temporal (geometría y UVs, sin
+        FBX). Devuelve la ruta del bundle o None en caso de fallo.
         """
         unique_id = uuid.uuid4().hex
         temp_dir = tempfile.gettempdir()
-        temp_fbx_path = os.path.normpath(os.path.join(temp_dir, "temp_uvshot_export_{}.fbx".format(unique_id)))
-        
-        self.output_log.append("Exporting selected mesh '{}' to temporary FBX...".format(mesh_transform))
-        self.output_log.append("Target FBX: {}".format(temp_fbx_path))
-        
+        bundle_path = os.path.normpath(os.path.join(temp_dir, "temp_uvshot_export_{}{}".format(unique_id, ma_mesh_container.EXTENSION)))
+
+        self.output_log.appendPlainText("Exporting {} mesh(es) to temporary bundle...".format(len(transforms)))
+        self.output_log.appendPlainText("Target bundle: {}".format(bundle_path))
+
         try:
-            if not mc.pluginInfo("fbxmaya", query=True, loaded=True):
-                self.output_log.append("[INFO] Loading fbxmaya plugin...")
-                mc.loadPlugin("fbxmaya")
-                self.output_log.append("[INFO] fbxmaya plugin loaded.")
-
-            mc.select(mesh_transform, replace=True) 
-            
-            mc.file(
-                temp_fbx_path, force=True, options="v=0;", 
-                type="FBX export", preserveReferences=True, exportSelected=True 
-            )
-            
-            if os.path.exists(temp_fbx_path):
-                self.output_log.append("Temporary FBX export successful.")
-                return temp_fbx_path # Solo devolver la ruta del FBX
+            count = ma_mesh_container.export_container(bundle_path, transforms)
+            if os.path.exists(bundle_path):
+                self.output_log.appendPlainText("Temporary bundle export successful ({} mesh(es)).".format(count))
+                return bundle_path
             else:
-                 self.output_log.append("[ERROR] FBX export command ran but file not found at destination!")
+                 self.output_log.appendPlainText("[ERROR] Bundle export ran but file not found at destination!")
                  return None
         except Exception as e:
-            self.output_log.append("[ERROR] FBX export failed:")
+            self.output_log.appendPlainText("[ERROR] Bundle export failed:")
             import traceback
-            self.output_log.append(traceback.format_exc())
-            if os.path.exists(temp_fbx_path):
-                try: os.remove(temp_fbx_path)
+            self.output_log.appendPlainText(traceback.format_exc())
+            if os.path.exists(bundle_path):
+                try: os.remove(bundle_path)
                 except: pass
             return None
 
-    # --- Función para obtener textura (sin cambios significativos) ---
+    # --- Función para obtener textura ---
     def get_texture_from_mesh(self, mesh):
         """Obtiene la ruta de la textura asociada a un mesh"""
-        # --- (Esta función es idéntica a la versión anterior, no necesita cambios) ---
-        shapes = mc.listRelatives(mesh, shapes=True, fullPath=True, type='mesh') 
-        if not shapes:
-            self.output_log.append("[WARNING] No mesh shape found for transform: {}".format(mesh))
-            return None
-        for s in shapes:
-            shading_groups = mc.listConnections(s, type='shadingEngine') or []
-            if not shading_groups:
-                self.output_log.append("[INFO] No shading groups found for shape: {}".format(s))
-                continue 
-            for sg in shading_groups:
-                shader_connections = mc.listConnections(sg + ".surfaceShader", source=True, destination=False) or []
-                if not shader_connections:
-                     self.output_log.append("[INFO] No surface shader connected to SG: {}".format(sg))
-                     continue
-                shader = shader_connections[0]
-                self.output_log.append("[DEBUG] Checking shader: {}".format(shader))
-                color_attrs_to_check = ['baseColor', 'color', 'TEX_color_map', 'diffuseColor', 'diffuse_color'] 
-                found_file_node = None
-                for attr in color_attrs_to_check:
-                    if mc.attributeQuery(attr, node=shader, exists=True):
-                        connection = "{}.{}".format(shader, attr)
-                        if mc.connectionInfo(connection, isDestination=True):
-                            connected_nodes = mc.listConnections(connection, s=True, d=False, type='file')
-                            if connected_nodes:
-                                current_file_node = connected_nodes[0] 
-                                node_type = mc.nodeType(shader, inherited=True)
-                                if 'StingrayPBS' in node_type and attr == 'TEX_color_map':
-                                    try: 
-                                        if not mc.getAttr(shader + '.use_color_map'):
-                                            self.output_log.append("[DEBUG] Found connection to TEX_color_map on '{}' but use_color_map is OFF.".format(shader))
-                                            continue 
-                                    except Exception as e:
-                                         self.output_log.append("[DEBUG] Could not check use_color_map for shader '{}': {}".format(shader, e))
-                                         pass 
-                                found_file_node = current_file_node
-                                self.output_log.append("[DEBUG] Found file node '{}' connected to attribute '{}' on shader '{}'".format(found_file_node, attr, shader))
-                                break 
-                if found_file_node:
-                    try:
-                        texture_file = mc.getAttr(found_file_node + ".fileTextureName")
-                        try:
-                             expanded_path = mc.workspace(expandName=texture_file)
-                             if expanded_path: texture_file = expanded_path
-                        except Exception as we:
-                             self.output_log.append("[DEBUG] Could not expand workspace path for '{}': {}".format(texture_file, we))
-                        texture_file_norm = os.path.normpath(texture_file)
-                        if texture_file_norm and os.path.isfile(texture_file_norm):
-                            self.output_log.append("[DEBUG] Texture file path validated: {}".format(texture_file_norm))
-                            return texture_file_norm 
-                        else:
-                            self.output_log.append("[WARNING] File path '{}' from node '{}' (normalized: '{}') does not exist or path is empty.".format(texture_file, found_file_node, texture_file_norm))
-                    except Exception as e:
-                         self.output_log.append("[WARNING] Could not get 'fileTextureName' from node '{}': {}".format(found_file_node, e))
-                if not found_file_node: 
-                    all_file_nodes = mc.listConnections(shader, type='file', source=True, destination=False) or []
-                    if all_file_nodes:
-                        fallback_node = all_file_nodes[0]
-                        self.output_log.append("[DEBUG] Trying fallback: Found file node '{}' via general search on shader '{}'.".format(fallback_node, shader))
-                        try:
-                            texture_file = mc.getAttr(fallback_node + ".fileTextureName")
-                            try:
-                                expanded_path = mc.workspace(expandName=texture_file)
-                                if expanded_path: texture_file = expanded_path
-                            except Exception as we:
-                                 self.output_log.append("[DEBUG] Could not expand workspace path for fallback '{}': {}".format(texture_file, we))
-                            texture_file_norm = os.path.normpath(texture_file)
-                            if texture_file_norm and os.path.isfile(texture_file_norm):
-                                self.output_log.append("[DEBUG] Fallback texture file path validated: {}".format(texture_file_norm))
-                                return texture_file_norm 
-                            else:
-                                self.output_log.append("[WARNING] Fallback file path '{}' from node '{}' (normalized: '{}') does not exist.".format(texture_file, fallback_node, texture_file_norm))
-                        except Exception as e:
-                             self.output_log.append("[WARNING] Could not get 'fileTextureName' from fallback node '{}': {}".format(fallback_node, e))
-        self.output_log.append("[INFO] No validated texture file path found for mesh: {}".format(mesh))
-        return None 
+        return ma_capture_uv.find_texture(mesh, log=self.output_log.appendPlainText)
 
 
 # --- Bloque para Ejecutar la UI (sin cambios) ---
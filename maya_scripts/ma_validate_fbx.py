@@ -7,8 +7,30 @@ import maya.cmds as mc
 import os
 import sys
 import json
+import tempfile
 
 import ma_model_profiler as profiler
+import ma_mesh_container as mesh_container
+import ma_validation_history as validation_history
+import ma_polygon_budget as polygon_budget
+from ma_profiler_cache import ValidationCache
+
+# Cache de resultados por mesh compartido entre corridas standalone
+CACHE_PATH = os.path.join(tempfile.gettempdir(), "waur_validation_cache.json")
+
+# Prefijo de las lineas de stdout con el resultado de cada check (una linea JSON por check)
+STREAM_PREFIX = "@@CHECK "
+
+# Token del tercer argumento (junto al perfil o la lista de checks) que corta en el primer error bloqueante
+FAIL_FAST_TOKEN = "failfast"
+
+def stream_result(name, result, seconds, index, total):
+    line = {"check": name, "passed": result[0], "message": result[1],
+            "seconds": round(seconds, 6), "index": index, "total": total}
+    if name in profiler.CHECKS:
+        line["severity"] = profiler.CHECKS[name].severity
+    print(STREAM_PREFIX + json.dumps(line))
+    sys.stdout.flush()
 
 def import_fbx(fbx_path):
     if not mc.pluginInfo("fbxmaya", query=True, loaded=True):
@@ -28,6 +50,17 @@ def import_fbx(fbx_path):
         print("[ERROR] Failed to import FBX:", e)
         return False
 
+def load_mesh_container(container_path):
+    # Sin plugin FBX: los meshes se crean directo desde los arrays del contenedor
+    try:
+        transforms = mesh_container.load_into_scene(container_path)
+    except Exception as e:
+        print("[ERROR] Failed to load mesh container:", e)
+        return False
+    if transforms:
+        mc.select(transforms, replace=True)
+    return True
+
 def select_imported_meshes():
     all_meshes = mc.ls(type="mesh", long=True)
     if not all_meshes:
@@ -40,35 +73,96 @@ def select_imported_meshes():
         else:
             print("[WARNING] No transforms found for meshes.")
 
-def save_results_to_json(results, output_json_path):
-    output = {k: {"passed": v[0], "message": v[1]} for k, v in results.items()}
+def save_results_to_json(results, output_json_path, timings=None, run=None):
+    timings = timings or {}
+    units = run["units"] if run else {}
+    cache_stats = run["cache"] if run else {}
+    output = {}
+    for k, v in results.items():
+        output[k] = {"passed": v[0], "message": v[1]}
+        if k in timings:
+            output[k]["seconds"] = round(timings[k], 6)
+        if k in profiler.CHECKS:
+            output[k]["severity"] = profiler.CHECKS[k].severity
+            output[k]["scope"] = profiler.CHECKS[k].scope
+        if k in cache_stats:
+            output[k]["cache_hits"] = cache_stats[k]["hits"]
+            output[k]["cache_misses"] = cache_stats[k]["misses"]
+        if k in units:
+            # Desglose por mesh/nodo para que el cliente pueda cachear por objeto
+            output[k]["units"] = dict(
+                (unit, dict(zip(("passed", "message"), profiler.unit_result(k, partial, run["config"]))))
+                for unit, partial in units[k].items())
     with open(output_json_path, "w") as f:
         json.dump(output, f, indent=4)
+    return output
 
 def main(args):
-    if len(args) != 2:
-        print("[ERROR] ma_validate_fbx.py requires exactly 2 arguments: <input_fbx> <output_json>")
+    if len(args) not in (2, 3, 4, 5):
+        print("[ERROR] ma_validate_fbx.py requires 2 to 5 arguments: <input_fbx|input_wmesh> <output_json> "
+              "[quick|full|check1,check2,...][,failfast] [asset] [project]")
         sys.exit(1)
 
     fbx_path = args[0]
     output_json_path = args[1]
+    profile = args[2] if len(args) >= 3 else "full"
+    # Con nombre de asset la corrida tambien queda en el historial de validaciones
+    asset = args[3] if len(args) >= 4 else None
+    project = args[4] if len(args) == 5 else None
+
+    # El tercer argumento es un perfil o una lista de checks separada por comas, mas "failfast" opcional
+    tokens = [n for n in profile.split(",") if n]
+    fail_fast = FAIL_FAST_TOKEN in tokens
+    tokens = [n for n in tokens if n != FAIL_FAST_TOKEN]
+    profile = ",".join(tokens) or "full"
+    names = None
+    if profile not in profiler.PROFILES:
+        names = tokens
+        unknown = [n for n in names if n not in profiler.CHECKS]
+        if unknown or not names:
+            print("[ERROR] Unknown validation profile or checks:", profile)
+            sys.exit(1)
+        profile = "full"
 
     if not os.path.exists(fbx_path):
         print("[ERROR] FBX file does not exist:", fbx_path)
         sys.exit(1)
 
-    if import_fbx(fbx_path):
-        select_imported_meshes()
+    if fbx_path.lower().endswith(mesh_container.EXTENSION):
+        loaded = load_mesh_container(fbx_path)
+    else:
+        loaded = import_fbx(fbx_path)
+        if loaded:
+            select_imported_meshes()
+
+    if loaded:
 
-        results = profiler.run_all_checks()
+        cache = ValidationCache(CACHE_PATH)
+        # El presupuesto de poligonos depende de la categoria del asset (reglas por ruta)
+        config = None
+        if asset:
+            config = {"polycount": {"category": polygon_budget.category_for(asset, polygon_budget.load_budgets())}}
+        run = profiler.run_checks(profile=profile, names=names, fail_fast=fail_fast, config=config, cache=cache,
+                                  on_result=stream_result)
+        results = run["results"]
 
         if "error" in results:
             passed, message = results["error"]
             print("[ERROR] Validation error:", message)
             sys.exit(1)
 
-        save_results_to_json(results, output_json_path)
+        for check_name, seconds in run["timings"].items():
+            print("[INFO] {:<20} {:8.3f}s".format(check_name, seconds))
+        if run["stopped_at"]:
+            print("[WARNING] Stopped at the first blocking error: {}".format(run["stopped_at"]))
+        hits, misses = profiler.cache_totals(run)
+        print("[INFO] Cache: {} hits, {} recomputed".format(hits, misses))
+        cache.save()
+        output = save_results_to_json(results, output_json_path, run["timings"], run)
+        if asset:
+            validation_history.record_run(asset, output, project=project, profile=profile,
+                                          backend="maya", digests=run["digests"])
         print("[SUCCESS] Validation completed successfully.")
     else:
-        print("[ERROR] FBX import failed.")
+        print("[ERROR] Input import failed.")
         sys.exit(2)
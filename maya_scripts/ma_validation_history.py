@@ -0,0 +1,247 @@
+# -*- coding: utf-8 -*-
+# ma_validation_history.py
+# Historial de validaciones en SQLite: cada corrida queda guardada por asset,
+# hash de mesh, check y fecha, con los tiempos por check.
+#
+# No depende de Maya: lo usan ma_validate_fbx (backend standalone), la UI del
+# profiler y el bridge de Blender, y se puede consultar desde cualquier Python
+# para responder preguntas de toda la libreria sin volver a validar.
+
+import os
+import re
+import time
+import sqlite3
+import tempfile
+
+import ma_polygon_budget as polygon_budget
+
+SCHEMA_VERSION = 1
+
+# Base compartida por defecto; WAUR_VALIDATION_HISTORY la reemplaza (ej. una ruta de red: por eso
+# el journal es el de rollback por defecto y no WAL, que no funciona sobre sistemas de archivos de red)
+DEFAULT_PATH = os.environ.get("WAUR_VALIDATION_HISTORY",
+                              os.path.join(tempfile.gettempdir(), "waur_validation_history.db"))
+
+DEFAULT_PROJECT = os.environ.get("WAUR_PROJECT", "default")
+
+# Mensaje del check polycount en ambos backends
+POLYCOUNT_PATTERN = re.compile(r"Polygons: (\d+), Triangles: (\d+)")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    asset TEXT NOT NULL,
+    project TEXT NOT NULL,
+    profile TEXT,
+    backend TEXT,
+    timestamp REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS results (
+    run_id INTEGER NOT NULL REFERENCES runs(id) ON DELETE CASCADE,
+    unit TEXT NOT NULL,
+    mesh_hash TEXT,
+    check_name TEXT NOT NULL,
+    passed INTEGER NOT NULL,
+    severity TEXT,
+    message TEXT,
+    seconds REAL
+);
+CREATE TABLE IF NOT EXISTS metrics (
+    run_id INTEGER NOT NULL REFERENCES runs(id) ON DELETE CASCADE,
+    unit TEXT NOT NULL,
+    name TEXT NOT NULL,
+    value REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS latest (
+    asset TEXT PRIMARY KEY,
+    run_id INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS runs_asset ON runs(asset, timestamp);
+CREATE INDEX IF NOT EXISTS runs_project ON runs(project);
+CREATE INDEX IF NOT EXISTS results_run ON results(run_id, check_name);
+CREATE INDEX IF NOT EXISTS results_failing ON results(check_name, passed);
+CREATE INDEX IF NOT EXISTS results_hash ON results(mesh_hash);
+CREATE INDEX IF NOT EXISTS metrics_run ON metrics(run_id, name);
+"""
+
+# Unidad de las filas con el resultado total del check (no de un mesh/nodo)
+TOTAL = ""
+
+
+class ValidationHistory(object):
+    """
+    SQLite store of validation runs. Every run keeps the total result of each
+    check plus the per-unit (mesh/node) results and polycount metrics; the
+    `latest` table points at the last run of each asset so library-wide
+    queries only touch current data.
+    """
+
+    def __init__(self, path=None):
+        self.path = path or DEFAULT_PATH
+        self.conn = sqlite3.connect(self.path, timeout=30)
+        self.conn.execute("PRAGMA foreign_keys = ON")
+        # Explicito: una base creada en modo WAL queda en WAL hasta que se cambia
+        self.conn.execute("PRAGMA journal_mode = DELETE")
+        self.conn.executescript(_SCHEMA)
+        self.conn.execute("PRAGMA user_version = {}".format(SCHEMA_VERSION))
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def record_run(self, asset, results, project=None, profile=None, backend="maya", digests=None,
+                   timestamp=None):
+        """
+        Stores one validation run.
+
+        :param asset: Asset name or file the run validated.
+        :param results: {check: {"passed", "message", "seconds", "severity",
+                        "units": {unit: {"passed", "message"}}}}, the JSON of
+                        ma_validate_fbx or bl_native_checks.run_checks.
+        :param project: Project of the asset (DEFAULT_PROJECT if None).
+        :param digests: {check: {unit: content hash}} of the data each check
+                        read per mesh/node (ma_model_profiler run["digests"]).
+        :return: Run id.
+        """
+        digests = digests or {}
+        with self.conn:
+            cursor = self.conn.execute(
+                "INSERT INTO runs (asset, project, profile, backend, timestamp) VALUES (?, ?, ?, ?, ?)",
+                (asset, project or DEFAULT_PROJECT, profile, backend, timestamp or time.time()))
+            run_id = cursor.lastrowid
+
+            rows = []
+            metrics = []
+            for check, info in results.items():
+                rows.append((run_id, TOTAL, None, check, int(bool(info.get("passed"))), info.get("severity"),
+                             info.get("message", ""), info.get("seconds")))
+                for unit, unit_info in (info.get("units") or {}).items():
+                    digest = digests.get(check, {}).get(unit)
+                    rows.append((run_id, unit, digest, check, int(bool(unit_info.get("passed"))),
+                                 info.get("severity"), unit_info.get("message", ""), None))
+                if check == "polycount":
+                    units = [(TOTAL, info)] + list((info.get("units") or {}).items())
+                    for unit, unit_info in units:
+                        match = POLYCOUNT_PATTERN.search(unit_info.get("message", ""))
+                        if match:
+                            metrics.append((run_id, unit, "faces", int(match.group(1))))
+                            metrics.append((run_id, unit, "triangles", int(match.group(2))))
+
+            self.conn.executemany("INSERT INTO results VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows)
+            self.conn.executemany("INSERT INTO metrics VALUES (?, ?, ?, ?)", metrics)
+            self.conn.execute("INSERT OR REPLACE INTO latest (asset, run_id) VALUES (?, ?)", (asset, run_id))
+        return run_id
+
+    def runs(self, asset, limit=20):
+        """Last runs of an asset: [(run id, timestamp, profile, backend)], newest first."""
+        return self.conn.execute(
+            "SELECT id, timestamp, profile, backend FROM runs WHERE asset = ? ORDER BY timestamp DESC, id DESC LIMIT ?",
+            (asset, limit)).fetchall()
+
+    def failing_assets(self, project=None, severity=None, check=None):
+        """
+        Assets whose latest run has failing checks.
+
+        :return: [(asset, project, [failing checks])] sorted by asset.
+        """
+        query = ("SELECT r.asset, r.project, res.check_name FROM latest l "
+                 "JOIN runs r ON r.id = l.run_id "
+                 "JOIN results res ON res.run_id = l.run_id AND res.unit = '' AND res.passed = 0 ")
+        where, args = [], []
+        for column, value in (("r.project", project), ("res.severity", severity), ("res.check_name", check)):
+            if value is not None:
+                where.append("{} = ?".format(column))
+                args.append(value)
+        if where:
+            query += "WHERE " + " AND ".join(where) + " "
+        query += "ORDER BY r.asset, res.check_name"
+
+        assets = []
+        for asset, asset_project, check_name in self.conn.execute(query, args):
+            if assets and assets[-1][0] == asset:
+                assets[-1][2].append(check_name)
+            else:
+                assets.append((asset, asset_project, [check_name]))
+        return assets
+
+    def polycounts(self, project=None, metric="triangles"):
+        """Latest total `metric` ("faces" or "triangles") per asset: [(asset, project, value)], heaviest first."""
+        query = ("SELECT r.asset, r.project, m.value FROM latest l "
+                 "JOIN runs r ON r.id = l.run_id "
+                 "JOIN metrics m ON m.run_id = l.run_id AND m.unit = '' AND m.name = ? ")
+        args = [metric]
+        if project is not None:
+            query += "WHERE r.project = ? "
+            args.append(project)
+        query += "ORDER BY m.value DESC"
+        return [(asset, asset_project, int(value)) for asset, asset_project, value in self.conn.execute(query, args)]
+
+    def polycount_over_budget(self, config=None, metric="triangles"):
+        """
+        Assets whose latest polycount exceeds the budget of their category
+        (ma_polygon_budget: same budgets as the polycount check).
+
+        :param config: Budget config (ma_polygon_budget.load_budgets() if None).
+        :return: {project: [(asset, category, value, budget)]}, worst overrun first.
+        """
+        config = config or polygon_budget.load_budgets()
+        over = {}
+        for asset, project, value in self.polycounts(metric=metric):
+            category = polygon_budget.category_for(asset, config)
+            budget = polygon_budget.budget_for(category, config).get(metric)
+            if budget is not None and value > budget:
+                over.setdefault(project, []).append((asset, category, value, budget))
+        for rows in over.values():
+            rows.sort(key=lambda row: row[3] - row[2])
+        return over
+
+    def regressions(self, old_run, new_run):
+        """
+        Checks (totals and units) that passed in `old_run` and fail in `new_run`.
+
+        :return: [(check, unit, old message, new message)]; unit is "" for the check total.
+        """
+        return self.conn.execute(
+            "SELECT new.check_name, new.unit, old.message, new.message FROM results new "
+            "JOIN results old ON old.run_id = ? AND old.check_name = new.check_name AND old.unit = new.unit "
+            "WHERE new.run_id = ? AND new.passed = 0 AND old.passed = 1 "
+            "ORDER BY new.check_name, new.unit", (old_run, new_run)).fetchall()
+
+    def latest_regressions(self, asset):
+        """Regressions between the two most recent runs of an asset."""
+        runs = self.runs(asset, limit=2)
+        if len(runs) < 2:
+            return []
+        return self.regressions(runs[1][0], runs[0][0])
+
+    def check_timings(self, project=None):
+        """Average and max seconds per check over all stored runs: [(check, runs, avg, max)], slowest first."""
+        query = ("SELECT res.check_name, COUNT(*), AVG(res.seconds), MAX(res.seconds) FROM results res "
+                 "JOIN runs r ON r.id = res.run_id WHERE res.unit = '' AND res.seconds IS NOT NULL ")
+        args = []
+        if project is not None:
+            query += "AND r.project = ? "
+            args.append(project)
+        query += "GROUP BY res.check_name ORDER BY AVG(res.seconds) DESC"
+        return self.conn.execute(query, args).fetchall()
+
+
+def record_run(asset, results, path=None, **kwargs):
+    """Opens the history, stores one run (see ValidationHistory.record_run) and closes it."""
+    try:
+        history = ValidationHistory(path)
+    except sqlite3.Error as e:
+        print("[WARNING] Could not open validation history '{}': {}".format(path or DEFAULT_PATH, e))
+        return None
+    try:
+        return history.record_run(asset, results, **kwargs)
+    except sqlite3.Error as e:
+        print("[WARNING] Could not record validation run: {}".format(e))
+        return None
+    finally:
+        history.close()
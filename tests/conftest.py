@@ -0,0 +1,10 @@
+# -*- coding: utf-8 -*-
+# Los tests importan los scripts de Maya como modulos sueltos, igual que mayapy.
+
+import os
+import sys
+
+MAYA_SCRIPTS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "maya_scripts")
+
+if MAYA_SCRIPTS_DIR not in sys.path:
+    sys.path.insert(0, MAYA_SCRIPTS_DIR)
@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+# Duplicados "similares" de ma_geometry_fingerprint sobre copias transformadas en float32 (Python puro, sin Maya).
+
+import math
+import random
+from array import array
+
+import ma_geometry_fingerprint as geometry_fingerprint
+
+
+def bumpy_grid(columns, rows, seed=7):
+    """Conteos, indices y puntos de una grilla de quads con relieve irregular (sin simetrias)."""
+    rng = random.Random(seed)
+    points = array('d')
+    for y in range(rows):
+        for x in range(columns):
+            points.extend((x * 0.1 + rng.uniform(-0.02, 0.02), y * 0.13, rng.uniform(-0.3, 0.3)))
+    indices = array('i')
+    for y in range(rows - 1):
+        for x in range(columns - 1):
+            corner = y * columns + x
+            indices.extend((corner, corner + 1, corner + columns + 1, corner + columns))
+    return array('i', [4]) * ((columns - 1) * (rows - 1)), indices, points
+
+
+def transformed(points, angles, offset, scale=1.0, mirror=False):
+    """Puntos rotados (x, y, z en radianes), escalados y trasladados, redondeados a float32 como en la escena."""
+    ax, ay, az = angles
+    out = array('f')
+    for i in range(0, len(points), 3):
+        x, y, z = points[i], points[i + 1], points[i + 2]
+        if mirror:
+            x = -x
+        y, z = y * math.cos(ax) - z * math.sin(ax), y * math.sin(ax) + z * math.cos(ax)
+        x, z = x * math.cos(ay) + z * math.sin(ay), -x * math.sin(ay) + z * math.cos(ay)
+        x, y = x * math.cos(az) - y * math.sin(az), x * math.sin(az) + y * math.cos(az)
+        out.extend((x * scale + offset[0], y * scale + offset[1], z * scale + offset[2]))
+    return out
+
+
+def test_rotated_float32_copies_are_always_similar():
+    counts, indices, points = bumpy_grid(61, 80)   # 4880 vertices
+    original = geometry_fingerprint.fingerprint(counts, indices, points)
+    rng = random.Random(3)
+    for _ in range(20):
+        angles = [rng.uniform(0.0, 2.0 * math.pi) for _ in range(3)]
+        offset = [rng.uniform(-500.0, 500.0) for _ in range(3)]
+        copy = geometry_fingerprint.fingerprint(counts, indices, transformed(points, angles, offset, 2.5))
+        assert geometry_fingerprint.same_shape(original, copy)
+
+
+def test_mirrored_and_reshaped_copies_are_not_similar():
+    counts, indices, points = bumpy_grid(20, 20)
+    fingerprints = {
+        "original": geometry_fingerprint.fingerprint(counts, indices, points),
+        "moved": geometry_fingerprint.fingerprint(counts, indices, transformed(points, (0.3, 1.1, 2.0), (4, 5, 6))),
+        "mirrored": geometry_fingerprint.fingerprint(counts, indices, transformed(points, (0, 0, 0), (0, 0, 0),
+                                                                                 mirror=True)),
+        "reshaped": geometry_fingerprint.fingerprint(counts, indices, bumpy_grid(20, 20, seed=8)[2]),
+    }
+    groups = geometry_fingerprint.group_duplicates(fingerprints)
+    assert [(group["kind"], sorted(group["meshes"])) for group in groups] == [("similar", ["moved", "original"])]
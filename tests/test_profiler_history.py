@@ -0,0 +1,45 @@
+# -*- coding: utf-8 -*-
+# Check "history" de ma_model_profiler sobre una escena real: necesita mayapy
+# (maya.standalone); con otro interprete el modulo se salta.
+
+import pytest
+
+standalone = pytest.importorskip("maya.standalone")
+
+
+@pytest.fixture(scope="module")
+def mc():
+    standalone.initialize(name='python')
+    import maya.cmds
+    return maya.cmds
+
+
+@pytest.fixture
+def scene(mc):
+    mc.file(new=True, force=True)
+    return mc
+
+
+def _history(mc, node):
+    import ma_model_profiler as profiler
+    run = profiler.run_checks(names=['history'], selection=mc.ls(node, long=True))
+    return run["results"]["history"]
+
+
+def test_display_layer_is_not_history(scene):
+    cube = scene.polyCube(name="geo_cube_geo", constructionHistory=False)[0]
+    scene.select(cube)
+    scene.createDisplayLayer(name="layer_geo", noRecurse=True)
+
+    assert _history(scene, cube) == (True, "OK Passed")
+
+
+def test_history_behind_display_layer_is_reported(scene):
+    cube = scene.polyCube(name="geo_cube_geo")[0]
+    scene.select(cube)
+    scene.createDisplayLayer(name="layer_geo", noRecurse=True)
+
+    passed, message = _history(scene, cube)
+    assert not passed
+    assert "polyCube" in message
+    assert "displayLayer" not in message
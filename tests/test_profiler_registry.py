@@ -0,0 +1,17 @@
+# -*- coding: utf-8 -*-
+# El add-on de Blender viaja con su propia copia del registro de checks: tiene que ser la de Maya.
+
+import os
+import json
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _load(*parts):
+    with open(os.path.join(ROOT, *parts), "r") as f:
+        return json.load(f)
+
+
+def test_addon_registry_matches_maya_registry():
+    assert _load("blender_addon", "modules", "ma_profiler_checks.json") == \
+        _load("maya_scripts", "ma_profiler_checks.json")
@@ -0,0 +1,50 @@
+# -*- coding: utf-8 -*-
+# Solapes de ma_uv_analysis sobre UVs armados a mano (Python puro, sin Maya).
+
+from array import array
+
+import ma_uv_analysis as uv_analysis
+
+
+def quad_grid(columns, rows, u0, v0, width, height):
+    """UVs, UVs por cara e ids de UV de una grilla de quads que cubre el rectangulo dado."""
+    us, vs = array('f'), array('f')
+    for y in range(rows + 1):
+        for x in range(columns + 1):
+            us.append(u0 + width * x / columns)
+            vs.append(v0 + height * y / rows)
+    uv_ids = array('i')
+    for y in range(rows):
+        for x in range(columns):
+            corner = y * (columns + 1) + x
+            uv_ids.extend((corner, corner + 1, corner + columns + 2, corner + columns + 1))
+    return us, vs, array('i', [4]) * (columns * rows), uv_ids
+
+
+def uv_set(*grids):
+    """UVSetData con un shell por grilla."""
+    us, vs, uv_counts, uv_ids = array('f'), array('f'), array('i'), array('i')
+    shell_ids = array('i')
+    for shell, (g_us, g_vs, g_counts, g_ids) in enumerate(grids):
+        uv_ids.extend(i + len(us) for i in g_ids)
+        us.extend(g_us)
+        vs.extend(g_vs)
+        uv_counts.extend(g_counts)
+        shell_ids.extend([shell] * len(g_us))
+    return uv_analysis.UVSetData("map1", us, vs, uv_counts, uv_ids, shell_ids, len(grids))
+
+
+def test_dense_shells_a_hair_apart_do_not_overlap():
+    # Caras mucho menores que una celda de cobertura y un hueco de 0.002 UV dentro
+    # de una misma celda (la 127 de 256 va de 0.4961 a 0.5)
+    data = uv_set(quad_grid(600, 600, 0.0, 0.0, 0.497, 1.0),
+                  quad_grid(600, 600, 0.499, 0.0, 0.501, 1.0))
+    report = uv_analysis.analyze_uv_set(data)
+    assert report["overlapping_shells"] == []
+    assert report["utilization"] > 99.0
+
+
+def test_dense_shells_that_overlap_are_reported():
+    data = uv_set(quad_grid(200, 200, 0.0, 0.0, 0.6, 1.0),
+                  quad_grid(200, 200, 0.4, 0.0, 0.6, 1.0))
+    assert uv_analysis.analyze_uv_set(data)["overlapping_shells"] == [[0, 1]]
@@ -0,0 +1,34 @@
+# -*- coding: utf-8 -*-
+# Aristas de ma_uv_raster: banda gruesa y lineas finas dilatadas (Python puro, sin Maya).
+
+import pytest
+
+import ma_uv_raster as uv_raster
+from test_uv_analysis import quad_grid, uv_set
+
+NO_FILL = (0, 0, 0, 0)
+
+
+def line_alpha(data, resolution=256, strip_rows=None):
+    strips = uv_raster.render_strips([data], resolution, fill_color=NO_FILL, strip_rows=strip_rows)
+    return b"".join(bytes(strip.data[3::4]) for strip in strips)
+
+
+@pytest.fixture
+def grid():
+    return uv_set(quad_grid(13, 13, 0.013, 0.021, 0.95, 0.93))
+
+
+def test_thin_lines_match_the_thick_band(grid, monkeypatch):
+    monkeypatch.setattr(uv_raster, "DENSE_LINE_DENSITY", float("inf"))
+    thick = line_alpha(grid)
+    monkeypatch.setattr(uv_raster, "DENSE_LINE_DENSITY", 0.0)
+    thin = line_alpha(grid)
+    # Misma tinta total (+-10%) y casi todos los pixeles iguales
+    assert abs(sum(bytearray(thin)) - sum(bytearray(thick))) < 0.1 * sum(bytearray(thick))
+    assert sum(abs(a - b) > 128 for a, b in zip(bytearray(thin), bytearray(thick))) < 0.01 * len(thick)
+
+
+def test_thin_lines_do_not_seam_between_strips(grid, monkeypatch):
+    monkeypatch.setattr(uv_raster, "DENSE_LINE_DENSITY", 0.0)
+    assert line_alpha(grid, strip_rows=32) == line_alpha(grid)